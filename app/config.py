@@ -6,7 +6,118 @@ from dotenv import load_dotenv
 dotenv_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=dotenv_path)
 
+# "whisper-1" uses the API; "local:<name>" or a bare openai-whisper model name (e.g. "small") runs locally
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-1")
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", str(os.cpu_count() or 1)))
+# Copies of a local model, and so files transcribed at once; torch's CPU threads are shared by all copies
+WHISPER_INSTANCES = int(os.getenv("WHISPER_INSTANCES", "2"))
 SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "o1")
 VISION_MODEL = os.getenv("VISION_MODEL", "gpt-4o")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Long recordings are split into overlapping chunks and transcribed concurrently
+# (set TRANSCRIBE_CHUNK_SECONDS=0 to upload the whole file in one request)
+TRANSCRIBE_CHUNK_SECONDS = int(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+TRANSCRIBE_CHUNK_OVERLAP = int(os.getenv("TRANSCRIBE_CHUNK_OVERLAP", "5"))
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("TRANSCRIBE_MAX_WORKERS", "4"))
+
+# Trim silence with local voice activity detection before uploading audio
+VAD_ENABLED = os.getenv("VAD_ENABLED", "false").lower() == "true"
+
+# Transcode audio to 16 kHz mono at a low speech bitrate before upload
+AUDIO_TRANSCODE = os.getenv("AUDIO_TRANSCODE", "true").lower() == "true"
+AUDIO_UPLOAD_CODEC = os.getenv("AUDIO_UPLOAD_CODEC", "opus")
+AUDIO_UPLOAD_BITRATE = os.getenv("AUDIO_UPLOAD_BITRATE", "24k")
+CACHE_DIR = Path(os.getenv("CACHE_DIR", "outputs/.cache"))
+
+# Sample slide keyframes from video lectures into the document pipeline
+VIDEO_SLIDE_FRAMES = os.getenv("VIDEO_SLIDE_FRAMES", "false").lower() == "true"
+VIDEO_SCENE_THRESHOLD = float(os.getenv("VIDEO_SCENE_THRESHOLD", "0.3"))
+
+# Long transcripts are summarized map-reduce style in token-budgeted chunks
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "12000"))
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+# Request important content and summary in one structured call per artifact
+COMBINED_ANALYSIS = os.getenv("COMBINED_ANALYSIS", "true").lower() == "true"
+
+# Persistent API response cache (SQLite under CACHE_DIR, least recently used entries evicted over the cap)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+
+# Concurrent processing: files in flight and API requests in flight per endpoint
+PROCESSING_ENGINE = os.getenv("PROCESSING_ENGINE", "pipeline")
+MAX_CONCURRENT_FILES = int(os.getenv("MAX_CONCURRENT_FILES", "4"))
+# Pipeline engine worker pools: CPU stages (0 = one per CPU) and I/O stages (API calls)
+PIPELINE_CPU_WORKERS = int(os.getenv("PIPELINE_CPU_WORKERS", "0"))
+PIPELINE_IO_WORKERS = int(os.getenv("PIPELINE_IO_WORKERS", "8"))
+# Worker processes for CPU-bound work: rendering, image encoding, audio decoding (0 = one per CPU)
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", "0"))
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+VISION_MAX_CONCURRENCY = int(os.getenv("VISION_MAX_CONCURRENCY", "8"))
+TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "4"))
+
+# Concurrent vision analyses per PDF
+VISION_MAX_WORKERS = int(os.getenv("VISION_MAX_WORKERS", "8"))
+
+# Per-model request scheduling: default budgets until rate-limit headers are seen, retries on 429s and timeouts
+RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "500"))
+RATE_LIMIT_TPM = int(os.getenv("RATE_LIMIT_TPM", "200000"))
+RATE_LIMIT_CONCURRENCY = int(os.getenv("RATE_LIMIT_CONCURRENCY", "16"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "6"))
+
+# Shared HTTP connection pool and per-stage API endpoints (empty = OPENAI_BASE_URL or the default endpoint)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+TRANSCRIBE_BASE_URL = os.getenv("TRANSCRIBE_BASE_URL") or None
+SUMMARY_BASE_URL = os.getenv("SUMMARY_BASE_URL") or None
+VISION_BASE_URL = os.getenv("VISION_BASE_URL") or None
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "32"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "600"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# PDF pages are rendered and analyzed a window at a time to bound memory
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "200"))
+PDF_RENDER_WINDOW = int(os.getenv("PDF_RENDER_WINDOW", "8"))
+# Page ranges rendered at once in the CPU pool (0 = one per worker, capped by PDF_RENDER_MEMORY_MB or half the
+# available memory)
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", "0"))
+PDF_RENDER_MEMORY_MB = int(os.getenv("PDF_RENDER_MEMORY_MB", "0"))
+# PDF engine: auto or pdfium (pypdfium2, the default), or pypdf (PyPDF2 text + poppler rendering)
+PDF_ENGINE = os.getenv("PDF_ENGINE", "auto").lower()
+# Pages per text extraction job in the CPU pool
+PDF_TEXT_RANGE_PAGES = int(os.getenv("PDF_TEXT_RANGE_PAGES", "16"))
+# Render pages for vision analysis (false = text-only runs that never rasterize)
+PDF_VISION_ANALYSIS = os.getenv("PDF_VISION_ANALYSIS", "true").lower() == "true"
+
+# Vision images are downscaled and encoded in memory (jpeg, webp or png); page PNGs on disk are optional
+VISION_IMAGE_FORMAT = os.getenv("VISION_IMAGE_FORMAT", "jpeg").lower()
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", "80"))
+VISION_IMAGE_MAX_SIDE = int(os.getenv("VISION_IMAGE_MAX_SIDE", "2048"))
+VISION_IMAGE_SHORT_SIDE = int(os.getenv("VISION_IMAGE_SHORT_SIDE", "768"))
+VISION_IMAGE_DETAIL = os.getenv("VISION_IMAGE_DETAIL", "high")
+PDF_SAVE_PAGE_IMAGES = os.getenv("PDF_SAVE_PAGE_IMAGES", "true").lower() == "true"
+
+# Route PDF pages to the vision model only when the extracted text is not enough
+PAGE_ROUTING = os.getenv("PAGE_ROUTING", "true").lower() == "true"
+PAGE_MIN_TEXT_CHARS = int(os.getenv("PAGE_MIN_TEXT_CHARS", "20"))
+PAGE_VECTOR_OPS_THRESHOLD = int(os.getenv("PAGE_VECTOR_OPS_THRESHOLD", "100"))
+PAGE_TEXT_MAX_INK = float(os.getenv("PAGE_TEXT_MAX_INK", "0.15"))
+PAGE_BLANK_INK = float(os.getenv("PAGE_BLANK_INK", "0.002"))
+
+# Reuse vision analyses of near-duplicate slides (perceptual hash distance out of 64 bits)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_DHASH_DISTANCE = int(os.getenv("DEDUP_DHASH_DISTANCE", "6"))
+DEDUP_PHASH_DISTANCE = int(os.getenv("DEDUP_PHASH_DISTANCE", "12"))
+
+# Vision preprocessing: skip blank pages and images, crop uniform borders, send colourless images as grayscale
+VISION_DROP_BLANK = os.getenv("VISION_DROP_BLANK", "true").lower() == "true"
+VISION_TRIM_BORDERS = os.getenv("VISION_TRIM_BORDERS", "true").lower() == "true"
+VISION_GRAYSCALE = os.getenv("VISION_GRAYSCALE", "true").lower() == "true"
+
+# Multi-image vision batching: consecutive pages and lecture images share one request,
+# up to this many images and image tokens per request (1 image disables batching)
+VISION_BATCH_MAX_IMAGES = int(os.getenv("VISION_BATCH_MAX_IMAGES", "6"))
+VISION_BATCH_MAX_TOKENS = int(os.getenv("VISION_BATCH_MAX_TOKENS", "6000"))
@@ -3,7 +3,13 @@
 import argparse
 from pathlib import Path
 
+from app.config import PROCESSING_ENGINE
+from app.processors.async_processor import AsyncContentProcessor
 from app.processors.content_processor import ContentProcessor
+from app.processors.pipeline_processor import PipelineContentProcessor
+from app.utils.cpu_pool import cpu_stats, start_cpu_pool
+from app.utils.llm_cache import get_cache
+from app.utils.rate_limiter import get_scheduler
 
 # Constants
 DATA_DIR = Path("data")
@@ -15,13 +21,40 @@ def main():
     parser = argparse.ArgumentParser(description="TLDL - Process audio and document files")
     parser.add_argument("--mode", choices=["audio", "documents", "all"], default="all",
                         help="Processing mode: audio, documents, or all (default)")
+    parser.add_argument("--force", action="store_true",
+                        help="Reprocess all files even if unchanged since the last run")
+    parser.add_argument("--engine", choices=["pipeline", "async", "sequential"], default=PROCESSING_ENGINE,
+                        help="Process files as a stage pipeline (pipeline, default), concurrently per file (async) "
+                             "or one at a time (sequential)")
     args = parser.parse_args()
 
     print("TLDL (Too Long; Didn't Listen) starting...")
-
-    processor = ContentProcessor(str(OUTPUT_DIR))
+    # Worker processes start before any HTTP, cache or scheduler threads exist
+    start_cpu_pool()
+
+    if args.engine == "pipeline":
+        processor = PipelineContentProcessor(str(OUTPUT_DIR), force=args.force)
+    elif args.engine == "async":
+        processor = AsyncContentProcessor(str(OUTPUT_DIR), force=args.force)
+    else:
+        processor = ContentProcessor(str(OUTPUT_DIR), force=args.force)
     processor.process_all(str(DATA_DIR), args.mode)
 
+    cache = get_cache()
+    if cache:
+        stats = cache.stats()
+        print(f"\nAPI response cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+
+    stats = cpu_stats()
+    if stats["tasks"]:
+        print(f"CPU pool: {stats['tasks']} tasks, {stats['worker_seconds']:.1f}s of rendering, encoding and "
+              f"decoding in {stats['workers']} worker processes")
+
+    for model, stats in get_scheduler().stats().items():
+        print(f"Rate limiting ({model}): {stats['throttled_requests']} requests throttled for "
+              f"{stats['throttle_seconds']:.1f}s, {stats['retries']} retries, concurrency {stats['concurrency']}")
+
     print("\nTLDL processing completed")
 
 
@@ -1,5 +1,8 @@
+from app.processors.async_processor import AsyncContentProcessor
 from app.processors.audio_processor import AudioProcessor
 from app.processors.content_processor import ContentProcessor
 from app.processors.document_processor import DocumentProcessor
+from app.processors.pipeline_processor import PipelineContentProcessor
 
-__all__ = ['AudioProcessor', 'DocumentProcessor', 'ContentProcessor']
+__all__ = ['AudioProcessor', 'DocumentProcessor', 'ContentProcessor', 'AsyncContentProcessor',
+           'PipelineContentProcessor']
@@ -0,0 +1,120 @@
+import asyncio
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.config import MAX_CONCURRENT_FILES
+from app.processors.audio_processor import AudioProcessor
+from app.processors.document_processor import DocumentProcessor
+from app.services.audio.file_utils import get_audio_files, get_video_files
+
+
+class AsyncContentProcessor:
+    """Processes many files at once with bounded concurrency
+
+    Audio files, PDFs and images are processed concurrently with at most
+    max_concurrent_files in flight. The services stay synchronous and run in
+    worker threads; API requests are additionally limited per endpoint in
+    app.utils.openai_api. Results and output layout match ContentProcessor.
+    """
+
+    def __init__(self, output_dir: str = "outputs", force: bool = False,
+                 max_concurrent_files: int = MAX_CONCURRENT_FILES):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.max_concurrent_files = max_concurrent_files
+
+        self.audio_processor = AudioProcessor(output_dir, force=force)
+        self.document_processor = DocumentProcessor(output_dir, force=force)
+
+    def process_all(self, directory: str = "data", mode: str = "all") -> Dict[str, List[Dict[str, Any]]]:
+        """Process all content in a directory
+
+        Args:
+            directory: Directory containing files to process
+            mode: Processing mode ('audio', 'documents', or 'all')
+
+        Returns:
+            Dict containing processing results by type
+        """
+        return asyncio.run(self._process_all(Path(directory), mode))
+
+    async def _process_all(self, directory: Path, mode: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Schedule every file, then the consolidation steps that depend on them"""
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+
+        semaphore = asyncio.Semaphore(self.max_concurrent_files)
+        audio_tasks = []
+        document_tasks = []
+
+        if mode in ["audio", "all"]:
+            audio_files = get_audio_files(directory)
+            print(f"Processing {len(audio_files)} audio files.")
+            audio_tasks = [
+                self._run(semaphore, self.audio_processor.process_audio, audio_file, "audio file")
+                for audio_file in audio_files
+            ]
+
+        if mode in ["documents", "all"]:
+            document_tasks = [
+                self._run(semaphore, self.document_processor.process_pdf, pdf_file, "PDF")
+                for pdf_file in self.document_processor.get_pdf_files(directory)
+            ]
+            # Images of one lecture are processed together so their vision requests can be batched
+            document_tasks += [
+                self._run(semaphore, self.document_processor.process_images, image_files, "lecture images")
+                for image_files in self.document_processor.get_image_groups(directory)
+            ]
+            if self.document_processor.slide_frames:
+                document_tasks += [
+                    self._run(semaphore, self.document_processor.process_video_slides, video_file, "video slides")
+                    for video_file in get_video_files(directory)
+                ]
+
+        print(f"\n=== Processing {len(audio_tasks) + len(document_tasks)} files concurrently "
+              f"(up to {self.max_concurrent_files} at once) ===")
+        outcomes = await asyncio.gather(*audio_tasks, *document_tasks)
+        audio_results = outcomes[:len(audio_tasks)]
+        document_results = []
+        for outcome in outcomes[len(audio_tasks):]:
+            # Lecture images and video slides yield one result per image
+            if isinstance(outcome, list):
+                document_results.extend(outcome)
+            elif outcome is not None:
+                document_results.append(outcome)
+
+        if mode in ["documents", "all"]:
+            # Consolidation reads the per-file outputs, so it starts once all files are done
+            consolidation_tasks = [
+                self._run(semaphore, self.document_processor.consolidate_pdf_content, pdf_name, "PDF consolidation")
+                for pdf_name in self.document_processor.get_pdf_names()
+            ]
+            consolidation_tasks += [
+                self._run(semaphore, self.document_processor.consolidate_lecture_content, lecture_name,
+                          "lecture consolidation")
+                for lecture_name in self.document_processor.get_lecture_names()
+            ]
+            document_results.extend(outcome for outcome in await asyncio.gather(*consolidation_tasks) if outcome)
+
+        results = {
+            "audio": [result for result in audio_results if result is not None],
+            "documents": document_results
+        }
+        print(f"All files processed. Audio: {len(results['audio'])}, documents: {len(results['documents'])}.")
+        return results
+
+    @staticmethod
+    async def _run(semaphore: asyncio.Semaphore, func, item, label: str):
+        """Run one blocking processing step in a worker thread under the global limit
+
+        Errors are reported and turned into None so one failing file does not stop the others.
+        """
+        async with semaphore:
+            name = ", ".join(path.name for path in item) if isinstance(item, list) else getattr(item, "name", item)
+            try:
+                result = await asyncio.to_thread(func, item)
+                print(f"Processing completed ({label}): {name}")
+                return result
+            except Exception as e:
+                print(f"Error processing {label} {name}: {str(e)}")
+                return None
@@ -2,21 +2,27 @@ from pathlib import Path
 from typing import List, Dict, Any
 
 from app.services.audio.file_utils import get_audio_files
+from app.services.audio.transcoder import transcode_for_upload
 from app.services.audio.transcriber import AudioTranscriber
 from app.services.text.analyzer import TextAnalyzer
+from app.services.text.prompts import PROMPT_VERSION
 from app.utils.file_handler import FileHandler
+from app.utils.hashing import file_hash
+from app.utils.manifest import get_manifest
 
 
 class AudioProcessor:
     """Main class for processing audio files"""
 
-    def __init__(self, output_dir: str = "outputs"):
+    def __init__(self, output_dir: str = "outputs", force: bool = False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.force = force
 
         self.transcriber = AudioTranscriber()
         self.text_analyzer = TextAnalyzer()
         self.file_handler = FileHandler(output_dir)
+        self.manifest = get_manifest(self.output_dir)
 
     def process_audio(self, audio_file: str) -> Dict[str, Any]:
         """Process a single audio file
@@ -27,18 +33,78 @@ class AudioProcessor:
         Returns:
             Dict containing processing results
         """
+        return self.summarize_audio(self.transcribe_audio(audio_file))
+
+    def transcode_audio(self, audio_file: str) -> Dict[str, Any]:
+        """Transcode an audio file for upload ahead of transcription
+
+        The transcoded file lands in the upload cache, where transcription
+        picks it up, so CPU-bound transcoding can run apart from the upload.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            Dict with audio_file and upload_file (None when nothing had to be transcoded)
+        """
+        audio_file = Path(audio_file)
+        if not (self.transcriber.transcode and self.transcriber.backend.uploads):
+            return {"audio_file": audio_file, "upload_file": None}
+        if not self.force and self.manifest.is_current("audio", audio_file, self._fingerprint(audio_file)[2]):
+            return {"audio_file": audio_file, "upload_file": None}
+        return {"audio_file": audio_file, "upload_file": transcode_for_upload(audio_file)}
+
+    def transcribe_audio(self, audio_file: str) -> Dict[str, Any]:
+        """Transcribe an audio file unless it is unchanged since the last run
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            Dict with audio_file, transcripts (text, SRT) and the manifest fields,
+            or the final result with skipped=True for unchanged files
+        """
         audio_file = Path(audio_file)
 
         if not audio_file.exists():
             raise FileNotFoundError(f"Audio file not found: {audio_file}")
 
+        # Skip inputs whose content, models and prompts are unchanged since the last run
+        input_hash, model, fingerprint = self._fingerprint(audio_file)
+        if not self.force and self.manifest.is_current("audio", audio_file, fingerprint):
+            print(f"Skipping unchanged audio file: {audio_file.name}")
+            return {
+                "audio_file": audio_file,
+                "output_files": tuple(Path(path) for path in self.manifest.get("audio", audio_file)["outputs"]),
+                "skipped": True
+            }
+
         # 1. Transcribe audio
-        transcripts = self.transcriber.transcribe(audio_file)
+        return {
+            "audio_file": audio_file,
+            "transcripts": self.transcriber.transcribe(audio_file),
+            "input_hash": input_hash,
+            "model": model,
+            "fingerprint": fingerprint
+        }
+
+    def summarize_audio(self, transcribed: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze and save a transcription (see transcribe_audio)
+
+        Args:
+            transcribed: Result of transcribe_audio
+
+        Returns:
+            Dict containing processing results
+        """
+        if transcribed.get("skipped"):
+            return transcribed
+        audio_file = transcribed["audio_file"]
+        transcripts = transcribed["transcripts"]
 
         # 2. Analyze text
-        text_transcript = transcripts[0]
-        important_content = self.text_analyzer.extract_important_content(text_transcript)
-        summary = self.text_analyzer.summarize_text(text_transcript)
+        text_transcript, srt_transcript = transcripts
+        important_content, summary = self.text_analyzer.analyze(text_transcript, srt_transcript)
 
         # 3. Save files
         output_files = self.file_handler.save_transcription(
@@ -47,11 +113,25 @@ class AudioProcessor:
             analysis_results=(important_content, summary)
         )
 
+        self.manifest.record("audio", audio_file, transcribed["fingerprint"], output_files,
+                             input_hash=transcribed["input_hash"], model=transcribed["model"],
+                             prompt_version=PROMPT_VERSION)
+
         return {
             "audio_file": audio_file,
             "output_files": output_files
         }
 
+    def _fingerprint(self, audio_file: Path):
+        """Input hash, model label and build fingerprint of an audio file"""
+        input_hash = file_hash(audio_file)
+        model = f"{self.transcriber.model}+{self.text_analyzer.model}"
+        fingerprint = self.manifest.fingerprint(
+            input_hash, model, PROMPT_VERSION,
+            combined=self.text_analyzer.combined, vad=self.transcriber.vad
+        )
+        return input_hash, model, fingerprint
+
     def process_all_files(self, directory: str = "data") -> List[Dict[str, Any]]:
         """Process all audio files in a directory
         
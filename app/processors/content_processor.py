@@ -8,12 +8,12 @@ from app.processors.document_processor import DocumentProcessor
 class ContentProcessor:
     """Main class for processing and integrating all content types"""
 
-    def __init__(self, output_dir: str = "outputs"):
+    def __init__(self, output_dir: str = "outputs", force: bool = False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
 
-        self.audio_processor = AudioProcessor(output_dir)
-        self.document_processor = DocumentProcessor(output_dir)
+        self.audio_processor = AudioProcessor(output_dir, force=force)
+        self.document_processor = DocumentProcessor(output_dir, force=force)
 
     def process_all(self, directory: str = "data", mode: str = "all") -> Dict[str, List[Dict[str, Any]]]:
         """Process all content in a directory
@@ -1,22 +1,39 @@
 import re
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-from app.services.document.pdf_processor import PDFProcessor
-from app.services.image.image_analyzer import ImageAnalyzer
-from app.utils.integrator import ContentIntegrator
+from app.config import DEDUP_ENABLED, VIDEO_SCENE_THRESHOLD, VIDEO_SLIDE_FRAMES
+from app.services.audio.file_utils import get_video_files
+from app.services.audio.video import extract_scene_frames
+from app.services.document.engine import ENGINE as PDF_ENGINE_NAME
+from app.services.document.page_classifier import routing_settings
+from app.services.document.pdf_processor import PROMPT_VERSION as PDF_PROMPT_VERSION, PDFProcessor
+from app.services.image.image_analyzer import PROMPT_VERSION as IMAGE_PROMPT_VERSION, ImageAnalyzer
+from app.utils.hashing import content_hash, file_hash
+from app.utils.images import encoding_settings
+from app.utils.integrator import PROMPT_VERSION as INTEGRATOR_PROMPT_VERSION, ContentIntegrator
+from app.utils.manifest import get_manifest
+from app.utils.phash import HashIndex, dedup_settings
+
+# Supported image file extensions
+SUPPORTED_IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
 
 
 class DocumentProcessor:
     """Main class for processing documents (PDFs and images)"""
 
-    def __init__(self, output_dir: str = "outputs"):
+    def __init__(self, output_dir: str = "outputs", slide_frames: bool = VIDEO_SLIDE_FRAMES, force: bool = False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.slide_frames = slide_frames
+        self.force = force
 
-        self.pdf_processor = PDFProcessor()
-        self.image_analyzer = ImageAnalyzer()
+        # Decks and images processed by this instance reuse each other's analyses of near-duplicates
+        self.hash_index = HashIndex() if DEDUP_ENABLED else None
+        self.pdf_processor = PDFProcessor(hash_index=self.hash_index)
+        self.image_analyzer = ImageAnalyzer(hash_index=self.hash_index)
         self.integrator = ContentIntegrator()
+        self.manifest = get_manifest(self.output_dir)
 
     def process_file(self, file_path: str) -> Dict[str, Any]:
         """Process a file (PDF or image)
@@ -35,7 +52,7 @@ class DocumentProcessor:
         # Determine file type
         if file_path.suffix.lower() in ['.pdf']:
             return self.process_pdf(file_path)
-        elif file_path.suffix.lower() in ['.png', '.jpg', '.jpeg', '.gif', '.bmp']:
+        elif file_path.suffix.lower() in SUPPORTED_IMAGE_EXTENSIONS:
             return self.process_image(file_path)
         else:
             raise ValueError(f"Unsupported file type: {file_path.suffix}")
@@ -49,7 +66,55 @@ class DocumentProcessor:
         Returns:
             Dict containing processing results
         """
-        return self.pdf_processor.process_pdf(pdf_path, self.output_dir)
+        return self.summarize_pdf(self.analyze_pdf(pdf_path))
+
+    def analyze_pdf(self, pdf_path: str) -> Dict[str, Any]:
+        """Extract and analyze the pages of a PDF unless it is unchanged since the last run
+
+        Args:
+            pdf_path: Path to the PDF file
+
+        Returns:
+            Dict with the page analyses for summarize_pdf, or the final result with skipped=True
+        """
+        pdf_path = Path(pdf_path)
+        input_hash = file_hash(pdf_path)
+        model = f"{self.pdf_processor.vision_model}+{self.pdf_processor.summary_model}"
+        fingerprint = self.manifest.fingerprint(input_hash, model, PDF_PROMPT_VERSION,
+                                                combined=self.pdf_processor.combined,
+                                                vision=self.pdf_processor.vision and encoding_settings(),
+                                                routing=self.pdf_processor.routing and routing_settings(),
+                                                dedup=DEDUP_ENABLED and dedup_settings(), engine=PDF_ENGINE_NAME)
+        if not self.force and self.manifest.is_current("pdf", pdf_path, fingerprint):
+            print(f"Skipping unchanged PDF: {pdf_path.name}")
+            return {"file_name": pdf_path.stem, "output_dir": self.output_dir / f"pdf-{pdf_path.stem}",
+                    "skipped": True}
+
+        # Unchanged pages of a re-uploaded deck keep their analyses unless reprocessing is forced
+        analyzed = self.pdf_processor.analyze_pdf_pages(pdf_path, self.output_dir, reuse_pages=not self.force)
+        analyzed.update(pdf_path=pdf_path, input_hash=input_hash, model=model, fingerprint=fingerprint)
+        return analyzed
+
+    def summarize_pdf(self, analyzed: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize an analyzed PDF and record it in the build manifest (see analyze_pdf)
+
+        Args:
+            analyzed: Result of analyze_pdf
+
+        Returns:
+            Dict containing processing results
+        """
+        if analyzed.get("skipped"):
+            return analyzed
+
+        result = self.pdf_processor.summarize_pdf(analyzed)
+
+        outputs = [result["text_file"], result["important_file"], result["summary_file"],
+                   result["output_dir"] / "metadata.json", *result["analysis_files"]]
+        self.manifest.record("pdf", analyzed["pdf_path"], analyzed["fingerprint"], outputs,
+                             input_hash=analyzed["input_hash"], model=analyzed["model"],
+                             prompt_version=PDF_PROMPT_VERSION)
+        return result
 
     def process_image(self, image_path: str) -> Dict[str, Any]:
         """Process an image file
@@ -60,7 +125,90 @@ class DocumentProcessor:
         Returns:
             Dict containing processing results
         """
-        return self.image_analyzer.process_image(image_path, self.output_dir)
+        image_path = Path(image_path)
+        input_hash, model, fingerprint = self._image_fingerprint(image_path)
+        if not self.force and self.manifest.is_current("image", image_path, fingerprint):
+            print(f"Skipping unchanged image: {image_path.name}")
+            return {"file_name": image_path.stem, "output_dir": self.output_dir / image_path.stem, "skipped": True}
+
+        result = self.image_analyzer.process_image(image_path, self.output_dir)
+        self._record_image(image_path, result, input_hash, model, fingerprint)
+        return result
+
+    def process_images(self, image_paths: List[Path]) -> List[Dict[str, Any]]:
+        """Process consecutive images of a lecture, batching their vision requests
+
+        Unchanged images are skipped; the others are analyzed together
+        (see ImageAnalyzer.process_images).
+
+        Args:
+            image_paths: Image files, in lecture order
+
+        Returns:
+            List of processing results in order
+        """
+        results = {}
+        stale = []
+        for image_path in map(Path, image_paths):
+            input_hash, model, fingerprint = self._image_fingerprint(image_path)
+            if not self.force and self.manifest.is_current("image", image_path, fingerprint):
+                print(f"Skipping unchanged image: {image_path.name}")
+                results[image_path] = {"file_name": image_path.stem, "output_dir": self.output_dir / image_path.stem,
+                                       "skipped": True}
+            else:
+                stale.append((image_path, input_hash, model, fingerprint))
+
+        processed = self.image_analyzer.process_images([item[0] for item in stale], self.output_dir)
+        for (image_path, input_hash, model, fingerprint), result in zip(stale, processed):
+            self._record_image(image_path, result, input_hash, model, fingerprint)
+            results[image_path] = result
+        return [results[Path(image_path)] for image_path in image_paths]
+
+    def _image_fingerprint(self, image_path: Path):
+        """Input hash, model label and build fingerprint of an image"""
+        input_hash = file_hash(image_path)
+        model = f"{self.image_analyzer.vision_model}+{self.image_analyzer.summary_model}"
+        fingerprint = self.manifest.fingerprint(input_hash, model, IMAGE_PROMPT_VERSION,
+                                                combined=self.image_analyzer.combined, vision=encoding_settings(),
+                                                dedup=DEDUP_ENABLED and dedup_settings())
+        return input_hash, model, fingerprint
+
+    def _record_image(self, image_path: Path, result: Dict[str, Any], input_hash: str, model: str,
+                      fingerprint: str):
+        """Record the outputs of a processed image in the build manifest"""
+        outputs = [result["analysis_file"], result["important_file"], result["summary_file"],
+                   result["output_dir"] / "metadata.json"]
+        self.manifest.record("image", image_path, fingerprint, outputs,
+                             input_hash=input_hash, model=model, prompt_version=IMAGE_PROMPT_VERSION)
+
+    def process_video_slides(self, video_path: str) -> List[Dict[str, Any]]:
+        """Sample slide keyframes from a video lecture and process them as images
+
+        Frames are saved as video-<name>/frames/<name>-N.png, so their results are
+        consolidated as one lecture.
+
+        Args:
+            video_path: Path to the video file
+
+        Returns:
+            List of image processing results
+        """
+        return self.process_images(self.extract_video_slides(video_path))
+
+    def extract_video_slides(self, video_path: str) -> List[Path]:
+        """Sample slide keyframes from a video lecture into video-<name>/frames
+
+        Args:
+            video_path: Path to the video file
+
+        Returns:
+            Frame image paths in slide order
+        """
+        video_path = Path(video_path)
+        frames_dir = self.output_dir / f"video-{video_path.stem}" / "frames"
+        frames = extract_scene_frames(video_path, frames_dir, VIDEO_SCENE_THRESHOLD)
+        print(f"Sampled {len(frames)} slide frames: {video_path.name}")
+        return frames
 
     def consolidate_pdf_content(self, pdf_name: str) -> Dict[str, Any]:
         """Consolidate content from a processed PDF
@@ -76,7 +224,12 @@ class DocumentProcessor:
         if not pdf_dir.exists():
             raise FileNotFoundError(f"PDF directory not found: {pdf_dir}")
 
-        return self.integrator.process_pdf_directory(pdf_dir, self.output_dir)
+        # revision.json is left out: consolidation deletes it, and any revision also changes these files
+        inputs = [pdf_dir / "important_content.txt", *sorted((pdf_dir / "analysis").glob("page_*_analysis.txt"))]
+        return self._consolidate_if_changed(
+            "pdf_consolidation", pdf_name, inputs, self.output_dir / f"{pdf_name}.md",
+            lambda: self.integrator.process_pdf_directory(pdf_dir, self.output_dir)
+        )
 
     def consolidate_lecture_content(self, lecture_name: str) -> Dict[str, Any]:
         """Consolidate content from lecture images
@@ -87,7 +240,97 @@ class DocumentProcessor:
         Returns:
             Dict containing consolidation results
         """
-        return self.integrator.process_lecture_images(lecture_name, self.output_dir, self.output_dir)
+        lecture_pattern = re.compile(f"{re.escape(lecture_name)}-\\d+")
+        inputs = sorted(
+            path
+            for item in self.output_dir.iterdir() if item.is_dir() and lecture_pattern.fullmatch(item.name)
+            for path in (item / "important_content.txt", item / "analysis.txt")
+        )
+        return self._consolidate_if_changed(
+            "lecture_consolidation", lecture_name, inputs, self.output_dir / f"{lecture_name}.md",
+            lambda: self.integrator.process_lecture_images(lecture_name, self.output_dir, self.output_dir)
+        )
+
+    def _consolidate_if_changed(self, stage: str, name: str, inputs: List[Path], markdown_file: Path,
+                                consolidate) -> Dict[str, Any]:
+        """Run a consolidation step unless its input files are unchanged since the last run
+
+        Args:
+            stage: Manifest stage name
+            name: PDF or lecture name
+            inputs: Candidate input files (missing files are ignored)
+            markdown_file: Consolidated markdown output
+            consolidate: Callable that runs the consolidation
+
+        Returns:
+            Dict containing consolidation results
+        """
+        input_hash = content_hash([(path.parent.name, path.name, file_hash(path)) for path in inputs if path.exists()])
+        model = self.integrator.summary_model
+        fingerprint = self.manifest.fingerprint(input_hash, model, INTEGRATOR_PROMPT_VERSION)
+        if not self.force and self.manifest.is_current(stage, name, fingerprint):
+            print(f"Skipping unchanged consolidation: {name}")
+            return {"file_name": name, "markdown_file": markdown_file, "skipped": True}
+
+        result = consolidate()
+        self.manifest.record(stage, name, fingerprint, [result["markdown_file"]],
+                             input_hash=input_hash, model=model, prompt_version=INTEGRATOR_PROMPT_VERSION)
+        return result
+
+    def get_pdf_files(self, directory: Path) -> List[Path]:
+        """Find PDF files in a directory"""
+        return list(Path(directory).glob("*.pdf"))
+
+    def get_image_files(self, directory: Path) -> List[Path]:
+        """Find image files in a directory"""
+        image_files = []
+        for ext in SUPPORTED_IMAGE_EXTENSIONS:
+            image_files.extend(Path(directory).glob(f"*{ext}"))
+        return image_files
+
+    def get_image_groups(self, directory: Path) -> List[List[Path]]:
+        """Find image files grouped by lecture (<lecture>-N), each group in slide order
+
+        Images that do not follow the <lecture>-N naming form groups of their own.
+        """
+        lecture_pattern = re.compile(r"(.+)-(\d+)")
+        lectures = {}
+        groups = []
+        for image_file in sorted(self.get_image_files(directory)):
+            match = lecture_pattern.fullmatch(image_file.stem)
+            if match:
+                lectures.setdefault(match.group(1), []).append((int(match.group(2)), image_file))
+            else:
+                groups.append([image_file])
+        groups.extend([image_file for _, image_file in sorted(slides)] for slides in lectures.values())
+        return groups
+
+    @staticmethod
+    def get_lecture_name(image_file: Path) -> Optional[str]:
+        """Lecture an image belongs to (<lecture>-N), or None for standalone images"""
+        match = re.fullmatch(r"(.+)-\d+", Path(image_file).stem)
+        return match.group(1) if match else None
+
+    def get_pdf_names(self) -> List[str]:
+        """Find processed PDFs (pdf-* output directories) to consolidate"""
+        return [d.name[4:] for d in self.output_dir.iterdir() if d.is_dir() and d.name.startswith("pdf-")]
+
+    def get_lecture_names(self) -> List[str]:
+        """Find lecture prefixes (<lecture>-N output directories) to consolidate
+
+        PDF outputs (pdf-*) and video frame directories (video-*) are not
+        lecture images, even when their names end in -N.
+        """
+        lecture_prefixes = set()
+        lecture_pattern = re.compile(r"(.+)-\d+")
+
+        for item in self.output_dir.iterdir():
+            if item.is_dir() and not item.name.startswith(("pdf-", "video-")):
+                match = lecture_pattern.fullmatch(item.name)
+                if match:
+                    lecture_prefixes.add(match.group(1))
+
+        return sorted(lecture_prefixes)
 
     def process_all_files(self, directory: str = "data") -> List[Dict[str, Any]]:
         """Process all files in a directory
@@ -106,7 +349,7 @@ class DocumentProcessor:
         results = []
 
         # Process all PDF files
-        for pdf_file in directory.glob("*.pdf"):
+        for pdf_file in self.get_pdf_files(directory):
             try:
                 result = self.process_pdf(pdf_file)
                 results.append(result)
@@ -114,39 +357,34 @@ class DocumentProcessor:
             except Exception as e:
                 print(f"Error processing PDF {pdf_file.name}: {str(e)}")
 
-        # Process all image files
-        for ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp']:
-            for image_file in directory.glob(f"*{ext}"):
+        # Process image files, one lecture at a time so their vision requests can be batched
+        for image_files in self.get_image_groups(directory):
+            try:
+                results.extend(self.process_images(image_files))
+                print(f"Processed images: {', '.join(image_file.name for image_file in image_files)}")
+            except Exception as e:
+                print(f"Error processing images {image_files[0].name}: {str(e)}")
+
+        # Process slide keyframes from video lectures
+        if self.slide_frames:
+            for video_file in get_video_files(directory):
                 try:
-                    result = self.process_image(image_file)
-                    results.append(result)
-                    print(f"Processed image: {image_file.name}")
+                    results.extend(self.process_video_slides(video_file))
+                    print(f"Processed video slides: {video_file.name}")
                 except Exception as e:
-                    print(f"Error processing image {image_file.name}: {str(e)}")
+                    print(f"Error processing video slides {video_file.name}: {str(e)}")
 
         # Consolidate PDF content
-        pdf_dirs = [d for d in self.output_dir.iterdir() if d.is_dir() and d.name.startswith("pdf-")]
-        for pdf_dir in pdf_dirs:
+        for pdf_name in self.get_pdf_names():
             try:
-                pdf_name = pdf_dir.name[4:]  # Remove 'pdf-' prefix
                 result = self.consolidate_pdf_content(pdf_name)
                 results.append(result)
                 print(f"Consolidated PDF content: {pdf_name}")
             except Exception as e:
-                print(f"Error consolidating PDF content {pdf_dir.name}: {str(e)}")
+                print(f"Error consolidating PDF content pdf-{pdf_name}: {str(e)}")
 
         # Consolidate lecture content
-        # Find all lecture prefixes
-        lecture_prefixes = set()
-        lecture_pattern = re.compile(r"(.+)-\d+")
-
-        for item in self.output_dir.iterdir():
-            if item.is_dir():
-                match = lecture_pattern.match(item.name)
-                if match:
-                    lecture_prefixes.add(match.group(1))
-
-        for lecture_name in lecture_prefixes:
+        for lecture_name in self.get_lecture_names():
             try:
                 result = self.consolidate_lecture_content(lecture_name)
                 results.append(result)
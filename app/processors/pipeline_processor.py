@@ -0,0 +1,143 @@
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.processors.audio_processor import AudioProcessor
+from app.processors.document_processor import DocumentProcessor
+from app.services.audio.file_utils import get_audio_files, get_video_files
+from app.utils.pipeline import (
+    STAGE_ANALYZE_PAGE, STAGE_CONSOLIDATE, STAGE_DISCOVER, STAGE_RASTERIZE, STAGE_SUMMARIZE, STAGE_TRANSCODE,
+    STAGE_TRANSCRIBE, Pipeline, Task
+)
+
+
+class PipelineContentProcessor:
+    """Processes many files as one graph of stage tasks
+
+    Every file is split into stages (transcode, transcribe, analyze,
+    summarize, consolidate) that run as soon as their own inputs are ready:
+    CPU stages and API-bound stages use separate worker pools, so local work
+    overlaps uploads and model calls, and each PDF or lecture is consolidated
+    as soon as its own files are done. Results and output layout match
+    ContentProcessor.
+    """
+
+    def __init__(self, output_dir: str = "outputs", force: bool = False):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+
+        self.audio_processor = AudioProcessor(output_dir, force=force)
+        self.document_processor = DocumentProcessor(output_dir, force=force)
+
+    def process_all(self, directory: str = "data", mode: str = "all") -> Dict[str, List[Dict[str, Any]]]:
+        """Process all content in a directory
+
+        Args:
+            directory: Directory containing files to process
+            mode: Processing mode ('audio', 'documents', or 'all')
+
+        Returns:
+            Dict containing processing results by type
+        """
+        directory = Path(directory)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory}")
+
+        pipeline = Pipeline()
+        audio_tasks = []
+        document_tasks = []
+        print(f"\n=== Processing files as a pipeline ({pipeline.workers['cpu']} CPU workers, "
+              f"{pipeline.workers['io']} I/O workers) ===")
+        if mode in ["audio", "all"]:
+            pipeline.add(STAGE_DISCOVER, "audio files", self._add_audio_tasks, pipeline, directory, audio_tasks)
+        if mode in ["documents", "all"]:
+            pipeline.add(STAGE_DISCOVER, "documents", self._add_document_tasks, pipeline, directory, document_tasks)
+        pipeline.run()
+
+        document_results = []
+        for task in document_tasks:
+            # Lecture images and video slides yield one result per image
+            if isinstance(task.result, list):
+                document_results.extend(task.result)
+            elif task.result is not None:
+                document_results.append(task.result)
+
+        results = {
+            "audio": [task.result for task in audio_tasks if task.result is not None],
+            "documents": document_results
+        }
+        print(f"All files processed. Audio: {len(results['audio'])}, documents: {len(results['documents'])}.")
+        return results
+
+    def _add_audio_tasks(self, pipeline: Pipeline, directory: Path, result_tasks: List[Task]) -> int:
+        """Add transcode -> transcribe -> summarize for every audio file
+
+        Args:
+            pipeline: Running pipeline
+            directory: Directory containing files to process
+            result_tasks: Receives the tasks whose results are reported
+
+        Returns:
+            Number of audio files
+        """
+        audio_files = get_audio_files(directory)
+        print(f"Processing {len(audio_files)} audio files.")
+        for audio_file in audio_files:
+            transcoded = pipeline.add(STAGE_TRANSCODE, audio_file.name, self.audio_processor.transcode_audio,
+                                      audio_file)
+            # Transcription finds the transcoded file in the upload cache, and falls back to transcoding itself
+            transcribed = pipeline.add(STAGE_TRANSCRIBE, audio_file.name, self.audio_processor.transcribe_audio,
+                                       audio_file, after=[transcoded])
+            result_tasks.append(pipeline.add(STAGE_SUMMARIZE, audio_file.name,
+                                             self.audio_processor.summarize_audio, transcribed))
+        return len(audio_files)
+
+    def _add_document_tasks(self, pipeline: Pipeline, directory: Path, result_tasks: List[Task]) -> int:
+        """Add the PDF, lecture image and video slide tasks, each followed by its own consolidation
+
+        Args:
+            pipeline: Running pipeline
+            directory: Directory containing files to process
+            result_tasks: Receives the tasks whose results are reported
+
+        Returns:
+            Number of PDFs, image groups and videos
+        """
+        processor = self.document_processor
+        pdf_files = processor.get_pdf_files(directory)
+        for pdf_file in pdf_files:
+            analyzed = pipeline.add(STAGE_ANALYZE_PAGE, pdf_file.name, processor.analyze_pdf, pdf_file)
+            summarized = pipeline.add(STAGE_SUMMARIZE, pdf_file.name, processor.summarize_pdf, analyzed)
+            result_tasks.append(summarized)
+            result_tasks.append(pipeline.add(STAGE_CONSOLIDATE, pdf_file.stem, processor.consolidate_pdf_content,
+                                             pdf_file.stem, after=[summarized]))
+
+        # A lecture is consolidated once all of its image groups and video slides are processed
+        lectures = {}
+        image_groups = processor.get_image_groups(directory)
+        for image_files in image_groups:
+            task = pipeline.add(STAGE_ANALYZE_PAGE, ", ".join(path.name for path in image_files),
+                                processor.process_images, image_files)
+            result_tasks.append(task)
+            lecture_name = processor.get_lecture_name(image_files[0])
+            if lecture_name:
+                lectures.setdefault(lecture_name, []).append(task)
+
+        video_files = get_video_files(directory) if processor.slide_frames else []
+        for video_file in video_files:
+            frames = pipeline.add(STAGE_RASTERIZE, video_file.name, processor.extract_video_slides, video_file)
+            task = pipeline.add(STAGE_ANALYZE_PAGE, video_file.name, processor.process_images, frames)
+            result_tasks.append(task)
+            lectures.setdefault(video_file.stem, []).append(task)
+
+        # Outputs of earlier runs whose inputs are not in the directory anymore are consolidated right away
+        pdf_names = {pdf_file.stem for pdf_file in pdf_files}
+        for pdf_name in processor.get_pdf_names():
+            if pdf_name not in pdf_names:
+                result_tasks.append(pipeline.add(STAGE_CONSOLIDATE, pdf_name, processor.consolidate_pdf_content,
+                                                 pdf_name))
+        for lecture_name in processor.get_lecture_names():
+            lectures.setdefault(lecture_name, [])
+        for lecture_name, tasks in lectures.items():
+            result_tasks.append(pipeline.add(STAGE_CONSOLIDATE, lecture_name, processor.consolidate_lecture_content,
+                                             lecture_name, after=tasks))
+        return len(pdf_files) + len(image_groups) + len(video_files)
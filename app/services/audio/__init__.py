@@ -1,4 +1,4 @@
-from app.services.audio.file_utils import get_audio_files, SUPPORTED_AUDIO_EXTENSIONS
+from app.services.audio.file_utils import get_audio_files, get_video_files, SUPPORTED_AUDIO_EXTENSIONS, VIDEO_EXTENSIONS
 from app.services.audio.transcriber import AudioTranscriber
 
-__all__ = ['AudioTranscriber', 'get_audio_files', 'SUPPORTED_AUDIO_EXTENSIONS']
+__all__ = ['AudioTranscriber', 'get_audio_files', 'get_video_files', 'SUPPORTED_AUDIO_EXTENSIONS', 'VIDEO_EXTENSIONS']
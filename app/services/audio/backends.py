@@ -0,0 +1,154 @@
+"""
+Transcription backends.
+A backend turns an audio file into a transcription result dict:
+{"text", "language", "duration", "segments": [{"start", "end", "text"}]}
+"""
+
+import queue
+import threading
+from abc import ABC, abstractmethod
+
+from app.config import OPENAI_API_KEY, WHISPER_INSTANCES, WHISPER_MODEL, WHISPER_THREADS
+from app.utils.clients import get_client
+from app.utils.openai_api import create_transcription
+
+# Model names served by the local openai-whisper package
+LOCAL_WHISPER_MODELS = {
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en", "medium", "medium.en",
+    "large", "large-v1", "large-v2", "large-v3", "large-v3-turbo", "turbo",
+}
+
+
+class TranscriptionBackend(ABC):
+    """Base interface for transcription backends"""
+
+    # Whether audio is uploaded over the network (enables transcoding and chunked uploads)
+    uploads = True
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, audio_file):
+        """Transcribe an audio file to a result dict with segment timestamps"""
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """Hosted transcription through the OpenAI API"""
+
+    uploads = True
+    name = "openai"
+
+    def __init__(self, model=WHISPER_MODEL, api_key=OPENAI_API_KEY):
+        self.model = model
+        self.client = get_client("transcription", api_key)
+
+    def transcribe(self, audio_file):
+        """Transcribe with one verbose_json request"""
+        response = create_transcription(
+            self.client,
+            audio_file,
+            model=self.model,
+            timestamp_granularities=["segment"]
+        )
+        return self._to_result(response)
+
+    @staticmethod
+    def _to_result(response):
+        """Convert a verbose_json transcription response to a plain dict"""
+        segments = [
+            {"start": float(segment.start), "end": float(segment.end), "text": segment.text}
+            for segment in (response.segments or [])
+        ]
+        return {
+            "text": response.text,
+            "language": getattr(response, "language", None),
+            "duration": float(getattr(response, "duration", 0) or 0),
+            "segments": segments
+        }
+
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """Offline CPU transcription with the openai-whisper package
+
+    Files are transcribed with model.transcribe, which slides its 30-second
+    window to the last decoded timestamp, conditions each window on the
+    text before it and retries repetitive or low-confidence windows at
+    higher temperatures. Models are loaded once per process and kept warm
+    across files. Decoding installs kv-cache hooks on the model, so each
+    file borrows a copy of its own: up to WHISPER_INSTANCES files are
+    transcribed at once.
+    """
+
+    uploads = False
+    name = "local"
+
+    _models = {}
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model_name, threads=WHISPER_THREADS, instances=WHISPER_INSTANCES):
+        self.model_name = model_name
+        self.threads = threads
+        self.instances = max(instances, 1)
+
+    def _acquire_model(self):
+        """Borrow an idle copy of the model, loading another while fewer than instances exist"""
+        import torch
+        import whisper
+
+        with self._lock:
+            idle = self._models.setdefault(self.model_name, queue.LifoQueue())
+            if idle.empty() and self._loaded.get(self.model_name, 0) < self.instances:
+                torch.set_num_threads(self.threads)
+                print(f"Loading local Whisper model: {self.model_name} ({self.threads} CPU threads)")
+                model = whisper.load_model(self.model_name, device="cpu")
+                self._loaded[self.model_name] = self._loaded.get(self.model_name, 0) + 1
+                return model
+        # Every copy is in use: wait for one to be returned
+        return idle.get()
+
+    def _release_model(self, model):
+        """Return a borrowed copy for the next file"""
+        self._models[self.model_name].put(model)
+
+    def transcribe(self, audio_file):
+        """Transcribe a whole file with Whisper's sliding-window decoding"""
+        import whisper
+
+        audio = whisper.load_audio(str(audio_file))
+        model = self._acquire_model()
+        try:
+            result = model.transcribe(audio, fp16=False, condition_on_previous_text=True)
+        finally:
+            self._release_model(model)
+
+        segments = [
+            {"start": float(segment["start"]), "end": float(segment["end"]), "text": segment["text"]}
+            for segment in result["segments"]
+            if segment["text"].strip()
+        ]
+        return {
+            "text": result["text"].strip(),
+            "language": result.get("language"),
+            "duration": len(audio) / whisper.audio.SAMPLE_RATE,
+            "segments": segments
+        }
+
+
+def get_backend(model=WHISPER_MODEL, api_key=OPENAI_API_KEY):
+    """Select a transcription backend from the model name
+
+    "local:<name>" or a bare openai-whisper model name (e.g. "small", "large-v3")
+    selects the local backend; anything else (e.g. "whisper-1") uses the API.
+
+    Args:
+        model (str): Model name from WHISPER_MODEL
+        api_key (str): OpenAI API key for the hosted backend
+
+    Returns:
+        TranscriptionBackend: Backend instance
+    """
+    if model.startswith("local:"):
+        return LocalWhisperBackend(model.split(":", 1)[1])
+    if model in LOCAL_WHISPER_MODELS:
+        return LocalWhisperBackend(model)
+    return OpenAITranscriptionBackend(model, api_key)
@@ -1,8 +1,13 @@
 from pathlib import Path
 
+from app.services.audio.video import is_video
+
 # Supported audio file extensions
 SUPPORTED_AUDIO_EXTENSIONS = [".mp3", ".mp4", ".mpeg", ".mpga", ".m4a", ".wav", ".webm"]
 
+# Extensions that may contain a video stream (screen-recorded lectures)
+VIDEO_EXTENSIONS = [".mp4", ".mpeg", ".webm"]
+
 
 def get_audio_files(directory):
     """Find audio files in the directory
@@ -17,3 +22,18 @@ def get_audio_files(directory):
     for ext in SUPPORTED_AUDIO_EXTENSIONS:
         audio_files.extend(list(directory.glob(f"*{ext}")))
     return audio_files
+
+
+def get_video_files(directory):
+    """Find video files in the directory
+
+    Args:
+        directory (Path): Directory to search for video files
+
+    Returns:
+        list[Path]: List of found video file paths
+    """
+    video_files = []
+    for ext in VIDEO_EXTENSIONS:
+        video_files.extend(path for path in directory.glob(f"*{ext}") if is_video(path))
+    return video_files
@@ -0,0 +1,100 @@
+import json
+
+
+def format_timestamp(seconds, separator=","):
+    """Format seconds as an HH:MM:SS,mmm timestamp
+
+    Args:
+        seconds (float): Time offset in seconds
+        separator (str): Separator between seconds and milliseconds ("," for SRT, "." for VTT)
+
+    Returns:
+        str: Formatted timestamp
+    """
+    milliseconds = max(0, int(round(seconds * 1000)))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{milliseconds:03d}"
+
+
+def render_text(result):
+    """Render a transcription result as plain text
+
+    Args:
+        result (dict): Transcription result with "text" and "segments"
+
+    Returns:
+        str: Plain text transcript
+    """
+    text = result.get("text") or " ".join(segment["text"].strip() for segment in result["segments"])
+    return text.strip() + "\n"
+
+
+def render_srt(result):
+    """Render a transcription result as SRT subtitles
+
+    Args:
+        result (dict): Transcription result with "segments"
+
+    Returns:
+        str: SRT format transcript
+    """
+    blocks = []
+    for index, segment in enumerate(result["segments"], start=1):
+        start = format_timestamp(segment["start"])
+        end = format_timestamp(segment["end"])
+        blocks.append(f"{index}\n{start} --> {end}\n{segment['text'].strip()}\n")
+    return "\n".join(blocks) + "\n" if blocks else ""
+
+
+def render_vtt(result):
+    """Render a transcription result as WebVTT subtitles
+
+    Args:
+        result (dict): Transcription result with "segments"
+
+    Returns:
+        str: WebVTT format transcript
+    """
+    blocks = ["WEBVTT\n"]
+    for segment in result["segments"]:
+        start = format_timestamp(segment["start"], separator=".")
+        end = format_timestamp(segment["end"], separator=".")
+        blocks.append(f"{start} --> {end}\n{segment['text'].strip()}\n")
+    return "\n".join(blocks) + "\n"
+
+
+def render_json(result):
+    """Render a transcription result as JSON segments
+
+    Args:
+        result (dict): Transcription result with "segments"
+
+    Returns:
+        str: JSON document with the text, language, duration and segments
+    """
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+
+RENDERERS = {
+    "text": render_text,
+    "srt": render_srt,
+    "vtt": render_vtt,
+    "json": render_json,
+}
+
+
+def render(result, response_format):
+    """Render a transcription result in the given format
+
+    Args:
+        result (dict): Transcription result with "text" and "segments"
+        response_format (str): One of "text", "srt", "vtt" or "json"
+
+    Returns:
+        str: Rendered transcript
+    """
+    if response_format not in RENDERERS:
+        raise ValueError(f"Unsupported transcript format: {response_format}")
+    return RENDERERS[response_format](result)
@@ -0,0 +1,111 @@
+import json
+import subprocess
+from pathlib import Path
+
+from app.services.audio.transcoder import encoder_args
+
+
+def get_duration(audio_file):
+    """Get the duration of an audio file with ffprobe
+
+    Args:
+        audio_file (Path): Audio file path
+
+    Returns:
+        float: Duration in seconds
+    """
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", str(audio_file)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return float(json.loads(output)["format"]["duration"])
+
+
+def plan_chunks(duration, chunk_seconds, overlap_seconds):
+    """Plan overlapping chunk windows covering the whole recording
+
+    Each chunk keeps the segments whose midpoint falls between the midpoints of
+    its overlaps with the neighbouring chunks, so overlapped speech is kept once.
+
+    Args:
+        duration (float): Total duration in seconds
+        chunk_seconds (float): Length of each chunk
+        overlap_seconds (float): Overlap between consecutive chunks
+
+    Returns:
+        list[dict]: Chunks with "index", "start", "length", "keep_start" and "keep_end"
+    """
+    step = chunk_seconds - overlap_seconds
+    if step <= 0:
+        raise ValueError("Chunk length must be greater than the overlap")
+
+    chunks = []
+    start = 0.0
+    while True:
+        length = min(chunk_seconds, duration - start)
+        chunks.append({"index": len(chunks), "start": start, "length": length})
+        if start + length >= duration:
+            break
+        start += step
+
+    for i, chunk in enumerate(chunks):
+        chunk["keep_start"] = 0.0 if i == 0 else chunk["start"] + overlap_seconds / 2
+        chunk["keep_end"] = duration if i == len(chunks) - 1 else chunks[i + 1]["start"] + overlap_seconds / 2
+    return chunks
+
+
+def extract_chunk(audio_file, chunk, output_dir):
+    """Cut one chunk out of the recording with ffmpeg
+
+    The chunk is re-encoded with the upload encoder settings so that its start
+    is sample accurate and segment offsets can be corrected exactly.
+
+    Args:
+        audio_file (Path): Source audio file
+        chunk (dict): Chunk planned by plan_chunks
+        output_dir (Path): Directory for chunk files
+
+    Returns:
+        Path: Chunk file path
+    """
+    args, extension = encoder_args()
+    chunk_file = Path(output_dir) / f"chunk_{chunk['index']:04d}{extension}"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y",
+         "-ss", f"{chunk['start']:.3f}", "-t", f"{chunk['length']:.3f}",
+         "-i", str(audio_file), *args, str(chunk_file)],
+        check=True, capture_output=True
+    )
+    return chunk_file
+
+
+def merge_chunk_results(chunks, results):
+    """Merge per-chunk transcription results into one result
+
+    Segment timestamps are shifted by the chunk offset and segments outside the
+    chunk's keep window are dropped so overlapped speech appears only once.
+
+    Args:
+        chunks (list[dict]): Chunks planned by plan_chunks
+        results (list[dict]): Transcription results in the same order as chunks
+
+    Returns:
+        dict: Merged transcription result
+    """
+    segments = []
+    language = None
+    for chunk, result in zip(chunks, results):
+        language = language or result.get("language")
+        for segment in result["segments"]:
+            start = segment["start"] + chunk["start"]
+            end = segment["end"] + chunk["start"]
+            midpoint = (start + end) / 2
+            if chunk["keep_start"] <= midpoint < chunk["keep_end"]:
+                segments.append({"start": start, "end": end, "text": segment["text"]})
+
+    return {
+        "text": " ".join(segment["text"].strip() for segment in segments),
+        "language": language,
+        "duration": chunks[-1]["start"] + chunks[-1]["length"] if chunks else 0.0,
+        "segments": segments
+    }
@@ -0,0 +1,66 @@
+import os
+import subprocess
+from pathlib import Path
+
+from app.config import AUDIO_UPLOAD_BITRATE, AUDIO_UPLOAD_CODEC, CACHE_DIR
+from app.utils.hashing import file_hash
+
+# Speech-oriented encoders accepted by the transcription endpoint
+UPLOAD_CODECS = {
+    "opus": {"args": ["-c:a", "libopus", "-application", "voip"], "extension": ".ogg"},
+    "mp3": {"args": ["-c:a", "libmp3lame"], "extension": ".mp3"},
+}
+
+
+def encoder_args(codec=AUDIO_UPLOAD_CODEC, bitrate=AUDIO_UPLOAD_BITRATE):
+    """Get ffmpeg output arguments for upload-optimized audio
+
+    Args:
+        codec (str): "opus" or "mp3"
+        bitrate (str): Target bitrate (e.g. "24k")
+
+    Returns:
+        tuple[list[str], str]: (ffmpeg output arguments, file extension)
+    """
+    if codec not in UPLOAD_CODECS:
+        raise ValueError(f"Unsupported upload codec: {codec}")
+    settings = UPLOAD_CODECS[codec]
+    return ["-vn", "-ac", "1", "-ar", "16000", *settings["args"], "-b:a", bitrate], settings["extension"]
+
+
+def transcode_for_upload(audio_file, cache_dir=CACHE_DIR, codec=AUDIO_UPLOAD_CODEC, bitrate=AUDIO_UPLOAD_BITRATE):
+    """Transcode an audio file to 16 kHz mono at a low speech bitrate
+
+    Results are cached by the source content hash, so re-runs over the same
+    recording reuse the transcoded file.
+
+    Args:
+        audio_file (Path): Source audio file
+        cache_dir (Path): Cache directory for transcoded files
+        codec (str): "opus" or "mp3"
+        bitrate (str): Target bitrate (e.g. "24k")
+
+    Returns:
+        Path: Transcoded file path
+    """
+    args, extension = encoder_args(codec, bitrate)
+    cache_dir = Path(cache_dir) / "audio"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    cached_file = cache_dir / f"{file_hash(audio_file)}-{codec}-{bitrate}{extension}"
+    if cached_file.exists():
+        print(f"Using cached upload audio: {Path(audio_file).name}")
+        return cached_file
+
+    # Write to a temporary name first so an interrupted run never leaves a partial cache entry
+    partial_file = cached_file.with_name(f".{cached_file.stem}.{os.getpid()}{extension}")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", str(audio_file), *args, str(partial_file)],
+        check=True, capture_output=True
+    )
+    partial_file.replace(cached_file)
+
+    source_size = Path(audio_file).stat().st_size
+    print(f"Transcoded for upload: {Path(audio_file).name} "
+          f"({source_size:,} -> {cached_file.stat().st_size:,} bytes)")
+    return cached_file
@@ -1,44 +1,114 @@
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from openai import OpenAI
-
-from app.config import OPENAI_API_KEY, WHISPER_MODEL
+from app.config import (
+    AUDIO_TRANSCODE,
+    OPENAI_API_KEY,
+    TRANSCRIBE_CHUNK_OVERLAP,
+    TRANSCRIBE_CHUNK_SECONDS,
+    TRANSCRIBE_MAX_WORKERS,
+    VAD_ENABLED,
+    WHISPER_MODEL,
+)
+from app.services.audio.backends import get_backend
+from app.services.audio.formats import render_srt, render_text
+from app.services.audio.segmenter import extract_chunk, get_duration, merge_chunk_results, plan_chunks
+from app.services.audio.transcoder import transcode_for_upload
+from app.services.audio.vad import remap_result, trim_silence
+from app.services.audio.video import extract_audio_track, is_video
+from app.utils.cpu_pool import run_cpu
 
 
 class AudioTranscriber:
     """Class for transcribing audio files to text"""
 
-    def __init__(self, model=WHISPER_MODEL, api_key=OPENAI_API_KEY):
+    def __init__(self, model=WHISPER_MODEL, api_key=OPENAI_API_KEY,
+                 chunk_seconds=TRANSCRIBE_CHUNK_SECONDS, chunk_overlap=TRANSCRIBE_CHUNK_OVERLAP,
+                 max_workers=TRANSCRIBE_MAX_WORKERS, vad=VAD_ENABLED,
+                 transcode=AUDIO_TRANSCODE):
         self.model = model
-        self.client = OpenAI(api_key=api_key)
+        self.backend = get_backend(model, api_key)
+        self.chunk_seconds = chunk_seconds
+        self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers
+        self.vad = vad
+        self.transcode = transcode
 
     def transcribe(self, audio_file):
         """Transcribe audio file to text and SRT format"""
+        result = self.transcribe_segments(audio_file)
+        return render_text(result), render_srt(result)
+
+    def transcribe_segments(self, audio_file):
+        """Transcribe audio file once and return the text with segment timestamps
+
+        Other formats (text, SRT, VTT, JSON) are rendered locally from this result
+        with the helpers in app.services.audio.formats.
+
+        Returns:
+            dict: {"text", "language", "duration", "segments": [{"start", "end", "text"}]}
+        """
         print(f"Processing audio file: {Path(audio_file).name}")
+        started = time.perf_counter()
+
+        with tempfile.TemporaryDirectory(prefix="tldl-audio-") as work_dir:
+            upload_file = Path(audio_file)
+            # Local models decode the original file (including video containers) directly
+            if self.backend.uploads:
+                if self.transcode:
+                    # Transcoding drops any video stream as well
+                    upload_file = transcode_for_upload(upload_file)
+                elif is_video(upload_file):
+                    upload_file = extract_audio_track(upload_file, work_dir)
+
+            trimmed = None
+            if self.vad:
+                # Decoding and speech detection run in the CPU pool, off the request threads
+                trimmed = run_cpu(trim_silence, upload_file, work_dir)
+                upload_file = trimmed["path"]
+                print(f"Silence trimmed: {trimmed['seconds_saved']:.1f}s and "
+                      f"{trimmed['bytes_saved']:,} bytes saved ({Path(audio_file).name})")
+
+            result = self._transcribe_file(upload_file, work_dir)
+
+        if trimmed:
+            result = remap_result(result, trimmed["time_map"], trimmed["duration"])
+            result["vad"] = {
+                "speech_seconds": trimmed["speech_seconds"],
+                "seconds_saved": trimmed["seconds_saved"],
+                "bytes_saved": trimmed["bytes_saved"]
+            }
+
+        elapsed = time.perf_counter() - started
+        speed = result["duration"] / elapsed if elapsed > 0 else 0.0
+        print(f"Audio file processing completed: {Path(audio_file).name} "
+              f"({elapsed:.1f}s, {speed:.1f}x realtime, {self.backend.name} backend)")
+        return result
+
+    def _transcribe_file(self, audio_file, work_dir):
+        """Transcribe a file in one request, or in chunks when it is long"""
+        chunking = self.chunk_seconds > 0 and self.backend.uploads
+        duration = get_duration(audio_file) if chunking else 0.0
+        if chunking and duration > self.chunk_seconds:
+            return self._transcribe_chunked(audio_file, duration, work_dir)
+        return self._get_verbose_transcript(audio_file)
+
+    def _transcribe_chunked(self, audio_file, duration, work_dir):
+        """Split a long recording into overlapping chunks and transcribe them concurrently"""
+        chunks = plan_chunks(duration, self.chunk_seconds, self.chunk_overlap)
+        print(f"Transcribing {len(chunks)} chunks with {self.max_workers} workers: {Path(audio_file).name}")
+
+        def transcribe_chunk(chunk):
+            chunk_file = extract_chunk(audio_file, chunk, work_dir)
+            return self._get_verbose_transcript(chunk_file)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(transcribe_chunk, chunks))
+
+        return merge_chunk_results(chunks, results)
 
-        # Get text transcript
-        text_transcript = self._get_text_transcript(audio_file)
-
-        # Get SRT format
-        srt_transcript = self._get_srt_transcript(audio_file)
-
-        print(f"Audio file processing completed: {Path(audio_file).name}")
-        return text_transcript, srt_transcript
-
-    def _get_text_transcript(self, audio_file):
-        """Get transcript in text format"""
-        with open(audio_file, "rb") as audio:
-            return self.client.audio.transcriptions.create(
-                model=self.model,
-                file=audio,
-                response_format="text"
-            )
-
-    def _get_srt_transcript(self, audio_file):
-        """Get transcript in SRT format"""
-        with open(audio_file, "rb") as audio:
-            return self.client.audio.transcriptions.create(
-                model=self.model,
-                file=audio,
-                response_format="srt"
-            )
+    def _get_verbose_transcript(self, audio_file):
+        """Get transcript with segment timestamps from the backend"""
+        return self.backend.transcribe(audio_file)
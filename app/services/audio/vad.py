@@ -0,0 +1,215 @@
+import subprocess
+from bisect import bisect_right
+from pathlib import Path
+
+import numpy as np
+
+from app.services.audio.transcoder import encoder_args
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Frames are analysed in blocks so a 3-hour recording never needs a float copy of all samples
+BLOCK_FRAMES = 20000
+# Silence inserted between speech spans so the recognizer still sees sentence boundaries
+JOIN_GAP_SECONDS = 0.3
+
+
+def decode_audio(audio_file, sample_rate=SAMPLE_RATE):
+    """Decode an audio file to 16-bit mono PCM with ffmpeg
+
+    Args:
+        audio_file (Path): Audio file path
+        sample_rate (int): Target sample rate
+
+    Returns:
+        np.ndarray: int16 samples
+    """
+    pcm = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", str(audio_file),
+         "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+        check=True, capture_output=True
+    ).stdout
+    return np.frombuffer(pcm, dtype=np.int16)
+
+
+def frame_features(samples, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    """Compute per-frame energy (dBFS) and zero-crossing rate
+
+    Args:
+        samples (np.ndarray): int16 samples
+        sample_rate (int): Sample rate of the samples
+        frame_ms (int): Frame length in milliseconds
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (energy_db, zcr) per frame
+    """
+    frame_length = sample_rate * frame_ms // 1000
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+
+    energy_db = np.empty(frame_count, dtype=np.float32)
+    zcr = np.empty(frame_count, dtype=np.float32)
+    for start in range(0, frame_count, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES].astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(block * block, axis=1))
+        energy_db[start:start + len(block)] = 20 * np.log10(np.maximum(rms, 1e-6))
+        signs = np.signbit(block)
+        zcr[start:start + len(block)] = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy_db, zcr
+
+
+def _runs(mask):
+    """Return (start, end) frame index pairs of consecutive True runs"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[0::2], edges[1::2]))
+
+
+def detect_speech(samples, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, threshold_db=12.0,
+                  min_speech=0.25, min_silence=1.0, padding=0.2):
+    """Find speech regions with energy and zero-crossing analysis
+
+    A frame is speech when its energy is threshold_db above the estimated noise
+    floor, or when it is moderately loud with a fricative-like zero-crossing
+    rate. Short pauses are bridged and regions are padded on both sides.
+
+    Args:
+        samples (np.ndarray): int16 samples
+        sample_rate (int): Sample rate of the samples
+        frame_ms (int): Frame length in milliseconds
+        threshold_db (float): Energy above the noise floor that counts as speech
+        min_speech (float): Shortest region kept, in seconds
+        min_silence (float): Shortest pause that splits two regions, in seconds
+        padding (float): Padding added around each region, in seconds
+
+    Returns:
+        list[tuple[float, float]]: Speech regions as (start, end) in seconds
+    """
+    energy_db, zcr = frame_features(samples, sample_rate, frame_ms)
+    if len(energy_db) == 0:
+        return []
+
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(noise_floor + threshold_db, -55.0)
+    voiced = energy_db > threshold
+    fricative = (energy_db > threshold - threshold_db / 2) & (zcr > 0.25) & (zcr < 0.6)
+    speech = voiced | fricative
+
+    frame_seconds = frame_ms / 1000
+    # Bridge pauses shorter than min_silence
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and (end - start) * frame_seconds < min_silence:
+            speech[start:end] = True
+
+    duration = len(samples) / sample_rate
+    regions = []
+    for start, end in _runs(speech):
+        if (end - start) * frame_seconds < min_speech:
+            continue
+        region_start = max(0.0, float(start * frame_seconds - padding))
+        region_end = min(duration, float(end * frame_seconds + padding))
+        if regions and region_start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region_end)
+        else:
+            regions.append((region_start, region_end))
+    return regions
+
+
+def build_time_map(regions, gap=JOIN_GAP_SECONDS):
+    """Build the map from trimmed-audio time to original-recording time
+
+    Args:
+        regions (list[tuple[float, float]]): Speech regions in the original recording
+        gap (float): Silence inserted between regions in the trimmed audio
+
+    Returns:
+        list[tuple[float, float, float]]: (trimmed_start, original_start, length) per region
+    """
+    time_map = []
+    position = 0.0
+    for start, end in regions:
+        time_map.append((position, start, end - start))
+        position += end - start + gap
+    return time_map
+
+
+def map_time(seconds, time_map):
+    """Map a timestamp in the trimmed audio back to the original recording
+
+    Args:
+        seconds (float): Timestamp in the trimmed audio
+        time_map (list[tuple[float, float, float]]): Map built by build_time_map
+
+    Returns:
+        float: Timestamp in the original recording
+    """
+    if not time_map:
+        return seconds
+    index = max(0, bisect_right([entry[0] for entry in time_map], seconds) - 1)
+    trimmed_start, original_start, length = time_map[index]
+    return original_start + min(max(seconds - trimmed_start, 0.0), length)
+
+
+def remap_result(result, time_map, duration):
+    """Rewrite segment timestamps of a transcription result to original-recording time
+
+    Args:
+        result (dict): Transcription result on the trimmed audio
+        time_map (list[tuple[float, float, float]]): Map built by build_time_map
+        duration (float): Duration of the original recording
+
+    Returns:
+        dict: The result with remapped segments
+    """
+    for segment in result["segments"]:
+        start = map_time(segment["start"], time_map)
+        segment["end"] = max(start, map_time(segment["end"], time_map))
+        segment["start"] = start
+    result["duration"] = duration
+    return result
+
+
+def trim_silence(audio_file, output_dir, sample_rate=SAMPLE_RATE):
+    """Write a speech-only copy of a recording
+
+    The audio is decoded once; speech spans are joined with a short gap and
+    encoded with the upload encoder settings.
+
+    Args:
+        audio_file (Path): Source audio file
+        output_dir (Path): Directory for the trimmed file
+        sample_rate (int): Analysis and output sample rate
+
+    Returns:
+        dict: {"path", "time_map", "duration", "speech_seconds", "seconds_saved", "bytes_saved"}
+    """
+    audio_file = Path(audio_file)
+    samples = decode_audio(audio_file, sample_rate)
+    duration = len(samples) / sample_rate
+    regions = detect_speech(samples, sample_rate)
+
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=np.int16)
+    pieces = []
+    for start, end in regions:
+        if pieces:
+            pieces.append(gap)
+        pieces.append(samples[int(start * sample_rate):int(end * sample_rate)])
+    speech = np.concatenate(pieces) if pieces else np.zeros(sample_rate // 10, dtype=np.int16)
+
+    args, extension = encoder_args()
+    trimmed_file = Path(output_dir) / f"{audio_file.stem}_speech{extension}"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "-",
+         *args, str(trimmed_file)],
+        input=speech.tobytes(), check=True, capture_output=True
+    )
+
+    speech_seconds = sum(end - start for start, end in regions)
+    return {
+        "path": trimmed_file,
+        "time_map": build_time_map(regions),
+        "duration": duration,
+        "speech_seconds": speech_seconds,
+        "seconds_saved": duration - speech_seconds,
+        "bytes_saved": audio_file.stat().st_size - trimmed_file.stat().st_size
+    }
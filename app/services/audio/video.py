@@ -0,0 +1,122 @@
+import json
+import subprocess
+from pathlib import Path
+
+from app.services.audio.transcoder import encoder_args
+
+# Containers that can hold an audio stream copied out of a video without re-encoding
+STREAM_COPY_CONTAINERS = {
+    "aac": ".m4a",
+    "alac": ".m4a",
+    "mp3": ".mp3",
+    "opus": ".ogg",
+    "vorbis": ".ogg",
+    "flac": ".flac",
+}
+
+
+def probe_streams(media_file):
+    """List the streams of a media file with ffprobe
+
+    Args:
+        media_file (Path): Media file path
+
+    Returns:
+        list[dict]: ffprobe stream descriptions
+    """
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "stream=index,codec_type,codec_name:stream_disposition=attached_pic",
+         "-of", "json", str(media_file)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output).get("streams", [])
+
+
+def is_video(media_file):
+    """Check whether a media file contains a real video stream
+
+    Cover art embedded in audio files (attached pictures) is not counted.
+    Files ffprobe cannot read are reported and treated as not video.
+
+    Args:
+        media_file (Path): Media file path
+
+    Returns:
+        bool: True if the file has a video stream
+    """
+    try:
+        streams = probe_streams(media_file)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        print(f"Could not probe {Path(media_file).name}: {str(e)}")
+        return False
+    return any(
+        stream.get("codec_type") == "video" and not stream.get("disposition", {}).get("attached_pic")
+        for stream in streams
+    )
+
+
+def extract_audio_track(video_file, output_dir):
+    """Extract the audio track of a video file
+
+    The audio stream is copied without re-encoding when its codec fits an
+    upload-friendly container; otherwise it is transcoded with the upload
+    encoder settings.
+
+    Args:
+        video_file (Path): Video file path
+        output_dir (Path): Directory for the extracted audio
+
+    Returns:
+        Path: Extracted audio file path
+    """
+    video_file = Path(video_file)
+    audio_streams = [stream for stream in probe_streams(video_file) if stream.get("codec_type") == "audio"]
+    if not audio_streams:
+        raise ValueError(f"No audio track found in video: {video_file.name}")
+
+    extension = STREAM_COPY_CONTAINERS.get(audio_streams[0].get("codec_name"))
+    if extension:
+        args = ["-vn", "-map", "0:a:0", "-c:a", "copy"]
+    else:
+        args, extension = encoder_args()
+        args = ["-map", "0:a:0", *args]
+
+    audio_file = Path(output_dir) / f"{video_file.stem}_audio{extension}"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", str(video_file), *args, str(audio_file)],
+        check=True, capture_output=True
+    )
+
+    print(f"Extracted audio track: {video_file.name} "
+          f"({video_file.stat().st_size:,} -> {audio_file.stat().st_size:,} bytes)")
+    return audio_file
+
+
+def extract_scene_frames(video_file, output_dir, threshold=0.3):
+    """Sample slide keyframes at scene changes of a video
+
+    Frames are named "<video stem>-<n>.png" so they are grouped as one
+    lecture by the document pipeline.
+
+    Args:
+        video_file (Path): Video file path
+        output_dir (Path): Directory for the frames
+        threshold (float): ffmpeg scene change score that starts a new slide
+
+    Returns:
+        list[Path]: Frame image paths in playback order
+    """
+    video_file = Path(video_file)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", str(video_file),
+         "-an", "-vf", f"select='eq(n,0)+gt(scene,{threshold})'", "-vsync", "vfr",
+         str(output_dir / f"{video_file.stem}-%d.png")],
+        check=True, capture_output=True
+    )
+
+    frames = list(output_dir.glob(f"{video_file.stem}-*.png"))
+    frames.sort(key=lambda path: int(path.stem.split('-')[-1]))
+    return frames
@@ -0,0 +1,199 @@
+"""
+Single-parse PDF document engine.
+A PDF is opened once and read page by page: each page record carries its
+number, text and structural features, and renders its bitmap only when
+asked for, so text-only runs never rasterize. The pdfium engine (pypdfium2,
+the default) gives text, structure and bitmaps from one parse; the pypdf
+engine (PDF_ENGINE=pypdf) parses the text layer with PyPDF2 and renders
+with poppler.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import PyPDF2
+from PIL import Image
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from app.config import PDF_ENGINE, PDF_RENDER_DPI
+from app.services.document.page_classifier import page_structure
+
+try:
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pdfium = None
+
+ENGINE_PDFIUM = "pdfium"
+ENGINE_PYPDF = "pypdf"
+
+# pdfium is not thread-safe, not even across documents, so every call in this process goes through one lock
+_pdfium_lock = threading.RLock()
+
+
+def _select_engine(requested: str) -> str:
+    """Resolve PDF_ENGINE (auto, pdfium or pypdf) against the installed packages"""
+    if requested == ENGINE_PYPDF:
+        return ENGINE_PYPDF
+    if pdfium is None:
+        print("pypdfium2 is required (see requirements.txt) but not installed, falling back to PyPDF2 and poppler")
+        return ENGINE_PYPDF
+    return ENGINE_PDFIUM
+
+
+ENGINE = _select_engine(PDF_ENGINE)
+
+
+class PageRecord:
+    """One page of an open PdfDocument; the bitmap is rendered on demand"""
+
+    def __init__(self, document: "PdfDocument", page: int, text: str, structure: Dict[str, Any]):
+        self.document = document
+        self.page = page
+        self.text = text
+        self.structure = structure
+
+    def render(self, dpi: int = PDF_RENDER_DPI) -> Image.Image:
+        """Render the page"""
+        return self.document.render(self.page, dpi)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Page number, text and structure as a plain (picklable) dict"""
+        return {"page": self.page, "text": self.text, "structure": self.structure}
+
+
+class PdfDocument:
+    """A PDF opened once for text extraction, structure and rendering
+
+    With the pypdf engine, a file PyPDF2 cannot read is still counted and
+    rendered by poppler; text extraction then fails on its own. Pool workers
+    pass the page_count of the caller's document, so the pypdf engine only
+    parses the file when text is actually read.
+    """
+
+    def __init__(self, pdf_path: Path, engine: str = ENGINE, page_count: Optional[int] = None):
+        self.path = Path(pdf_path)
+        self.engine = engine
+        self._file = None
+        self._reader = None
+        self._pdf = None
+
+        if engine == ENGINE_PDFIUM:
+            with _pdfium_lock:
+                self._pdf = pdfium.PdfDocument(str(self.path))
+                self.page_count = len(self._pdf)
+        elif page_count is not None:
+            # Known from the caller: poppler renders without PyPDF2 parsing the file
+            self.page_count = page_count
+        else:
+            try:
+                self.page_count = len(self._pypdf_reader().pages)
+            except Exception as e:
+                print(f"Could not parse {self.path.name} with PyPDF2, counting pages with poppler: {str(e)}")
+                self.page_count = int(pdfinfo_from_path(str(self.path))["Pages"])
+
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the parsed document"""
+        if self._pdf is not None:
+            with _pdfium_lock:
+                self._pdf.close()
+            self._pdf = None
+        if self._file is not None:
+            self._file.close()
+            self._file = self._reader = None
+
+    def _pypdf_reader(self) -> PyPDF2.PdfReader:
+        """PyPDF2 reader, opened on first use"""
+        if self._reader is None:
+            self._file = open(self.path, "rb")
+            self._reader = PyPDF2.PdfReader(self._file)
+        return self._reader
+
+    def read_page(self, page: int) -> PageRecord:
+        """Extract the text and structural features of a page (1-based)"""
+        if self.engine == ENGINE_PDFIUM:
+            with _pdfium_lock:
+                pdf_page = self._pdf[page - 1]
+                try:
+                    text_page = pdf_page.get_textpage()
+                    text = text_page.get_text_range().replace("\r\n", "\n")
+                    text_page.close()
+                    structure = _pdfium_structure(pdf_page, text)
+                finally:
+                    pdf_page.close()
+            return PageRecord(self, page, text, structure)
+
+        pypdf_page = self._pypdf_reader().pages[page - 1]
+        text = pypdf_page.extract_text() or ""
+        return PageRecord(self, page, text, page_structure(pypdf_page, text))
+
+    def pages(self, first_page: int = 1, last_page: Optional[int] = None) -> Iterator[PageRecord]:
+        """Page records in page order, one page parsed at a time"""
+        for page in range(first_page, min(last_page or self.page_count, self.page_count) + 1):
+            yield self.read_page(page)
+
+    def render(self, page: int, dpi: int = PDF_RENDER_DPI) -> Image.Image:
+        """Render one page (1-based)"""
+        for _, image in self.render_range(page, page, dpi):
+            return image
+        raise ValueError(f"Page {page} could not be rendered: {self.path.name}")
+
+    def render_range(self, first_page: int, last_page: int,
+                     dpi: int = PDF_RENDER_DPI) -> Iterator[Tuple[int, Image.Image]]:
+        """Render a page range
+
+        Yields:
+            (page_number, image) tuples in page order
+        """
+        if self.engine == ENGINE_PDFIUM:
+            for page in range(first_page, last_page + 1):
+                with _pdfium_lock:
+                    pdf_page = self._pdf[page - 1]
+                    try:
+                        image = pdf_page.render(scale=dpi / 72).to_pil()
+                    finally:
+                        pdf_page.close()
+                yield page, image
+            return
+
+        images = convert_from_path(str(self.path), dpi=dpi, first_page=first_page, last_page=last_page)
+        # Drop each page from the list as it is handed out so memory is released as soon as the caller is done
+        for page in range(first_page, first_page + len(images)):
+            yield page, images.pop(0)
+
+
+def _pdfium_structure(pdf_page, text: str) -> Dict[str, Any]:
+    """page_structure features from pdfium page objects
+
+    Path segments stand in for path operators; a rectangle is one operator
+    but four segments, so drawn pages score somewhat higher than with PyPDF2.
+    """
+    structure = {"text_chars": len("".join(text.split())), "image_count": 0, "vector_ops": 0, "parsed": True}
+    try:
+        for page_object in pdf_page.get_objects(max_depth=3):
+            if page_object.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                structure["image_count"] += 1
+            elif page_object.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+                structure["vector_ops"] += max(pdfium_c.FPDFPath_CountSegments(page_object.raw), 0)
+    except Exception as e:
+        print(f"Could not parse page structure: {str(e)}")
+        structure["parsed"] = False
+    return structure
+
+
+def extract_page_range(pdf_path: str, first_page: int, last_page: int,
+                       page_count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Extract the text and structure of a page range (CPU pool worker)
+
+    Returns:
+        Page dicts (see PageRecord.as_dict) in page order
+    """
+    with PdfDocument(pdf_path, page_count=page_count) as document:
+        return [record.as_dict() for record in document.pages(first_page, last_page)]
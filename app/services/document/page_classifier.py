@@ -0,0 +1,110 @@
+"""
+Cheap local page classification.
+Decides per PDF page whether the extracted text already carries the content
+("text"), the page needs the vision model ("vision"), or it is empty ("blank"),
+from the page's text density, embedded images and vector drawing operations
+(PyPDF2) and pixel statistics of the rendered page (NumPy).
+"""
+
+from typing import Any, Dict, Optional
+
+from PIL import Image
+from PyPDF2.generic import ContentStream
+
+from app.config import PAGE_BLANK_INK, PAGE_MIN_TEXT_CHARS, PAGE_TEXT_MAX_INK, PAGE_VECTOR_OPS_THRESHOLD
+from app.utils.images import ink_ratio
+
+ROUTE_TEXT = "text"
+ROUTE_VISION = "vision"
+ROUTE_BLANK = "blank"
+
+# Path construction operators; their count approximates how much a page is drawn rather than typeset
+PATH_OPERATORS = {b"m", b"l", b"c", b"v", b"y", b"re"}
+
+
+def routing_settings() -> Dict[str, Any]:
+    """Thresholds that change which pages reach the vision model (for build fingerprints)"""
+    return {
+        "min_text_chars": PAGE_MIN_TEXT_CHARS,
+        "vector_ops": PAGE_VECTOR_OPS_THRESHOLD,
+        "text_max_ink": PAGE_TEXT_MAX_INK,
+        "blank_ink": PAGE_BLANK_INK
+    }
+
+
+def _count_images(resources, depth: int = 0) -> int:
+    """Count image XObjects in a resource dictionary, including nested forms"""
+    if resources is None or depth > 2:
+        return 0
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return 0
+
+    count = 0
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Image":
+            count += 1
+        elif xobject.get("/Subtype") == "/Form":
+            count += _count_images(xobject.get("/Resources"), depth + 1)
+    return count
+
+
+def page_structure(page, text: str) -> Dict[str, Any]:
+    """Structural features of a PyPDF2 page
+
+    Args:
+        page: PyPDF2 PageObject
+        text: Text extracted from the page
+
+    Returns:
+        Dict with text_chars, image_count, vector_ops and parsed (False when the content stream could not be read)
+    """
+    structure = {"text_chars": len("".join(text.split())), "image_count": 0, "vector_ops": 0, "parsed": True}
+    try:
+        structure["image_count"] = _count_images(page.get("/Resources"))
+        contents = page.get_contents()
+        if contents is not None:
+            for _, operator in ContentStream(contents, page.pdf).operations:
+                if operator in PATH_OPERATORS:
+                    structure["vector_ops"] += 1
+                elif operator == b"INLINE IMAGE":
+                    structure["image_count"] += 1
+    except Exception as e:
+        print(f"Could not parse page structure: {str(e)}")
+        structure["parsed"] = False
+    return structure
+
+
+def pixel_stats(image: Image.Image) -> Dict[str, float]:
+    """Ink coverage of a rendered page
+
+    Returns:
+        Dict with ink_ratio, the fraction of pixels that differ from the dominant grey level
+    """
+    return {"ink_ratio": ink_ratio(image)}
+
+
+def classify_page(structure: Optional[Dict[str, Any]], pixels: Dict[str, float]) -> str:
+    """Route a page to "text", "vision" or "blank"
+
+    Args:
+        structure: page_structure features, or None when text extraction failed
+        pixels: pixel_stats of the rendered page
+
+    Returns:
+        Route name
+    """
+    structure = structure or {"text_chars": 0, "image_count": 0, "vector_ops": 0, "parsed": False}
+
+    if structure["text_chars"] < PAGE_MIN_TEXT_CHARS:
+        # Little or no text layer: either an empty page or a scan/figure only the vision model can read
+        return ROUTE_BLANK if pixels["ink_ratio"] < PAGE_BLANK_INK else ROUTE_VISION
+
+    if (not structure["parsed"]
+            or structure["image_count"] > 0
+            or structure["vector_ops"] > PAGE_VECTOR_OPS_THRESHOLD
+            or pixels["ink_ratio"] > PAGE_TEXT_MAX_INK):
+        return ROUTE_VISION
+
+    return ROUTE_TEXT
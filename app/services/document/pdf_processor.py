@@ -1,34 +1,97 @@
-import base64
 import json
+from contextlib import nullcontext
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple, Union
 
-import PyPDF2
 from PIL import Image
-from openai import OpenAI
-from pdf2image import convert_from_path
 
-from app.config import OPENAI_API_KEY, SUMMARY_MODEL, VISION_MODEL
+from app.config import (
+    COMBINED_ANALYSIS, DEDUP_ENABLED, OPENAI_API_KEY, PAGE_ROUTING, PDF_RENDER_DPI, PDF_RENDER_WINDOW, PDF_SAVE_PAGE_IMAGES, PDF_TEXT_RANGE_PAGES,
+    PDF_VISION_ANALYSIS, SUMMARY_MODEL, VISION_BATCH_MAX_IMAGES, VISION_MAX_WORKERS, VISION_MODEL
+)
+from app.services.document.engine import ENGINE, PdfDocument, extract_page_range
+from app.services.document.page_classifier import ROUTE_BLANK, ROUTE_TEXT, ROUTE_VISION, routing_settings
+from app.services.document.rasterizer import render_pages_parallel
+from app.utils.clients import get_client
+from app.utils.hashing import content_hash
+from app.utils.cpu_pool import submit_cpu
+from app.utils.images import batch_fits, encode_image, encoding_settings, image_content
+from app.utils.openai_api import chat_completion
+from app.utils.phash import HashIndex, adds_content, dedup_settings, normalize_text
+from app.utils.revisions import build_revision, load_previous_pages, page_fingerprint, save_revision
+from app.utils.structured import request_analysis, request_image_batch
+
+# Bump when prompts change so the build manifest reprocesses affected inputs
+PROMPT_VERSION = "2"
+
+# Instructions shared by the single-page and batched vision requests, and by the
+# combined and separate important content and summary requests
+ANALYSIS_INSTRUCTIONS = (
+    "Identify and explain key concepts, formulas, diagrams, and their significance. If there are any important "
+    "points that would be relevant for exams or assignments, highlight them."
+)
+IMPORTANT_CONTENT_INSTRUCTIONS = """the most important content, focusing on:
+1. Key concepts and definitions
+2. Important formulas and equations
+3. Critical information for exams or assignments
+4. Significant diagrams or visual elements and their meaning"""
+SUMMARY_INSTRUCTIONS = """a comprehensive summary that:
+1. Outlines the main topics and concepts covered
+2. Explains key ideas in a clear, structured manner
+3. Preserves the logical flow of the lecture material
+4. Includes important formulas, diagrams, and their significance"""
 
 
 class PDFProcessor:
     """Class for processing PDF files"""
 
-    def __init__(self, api_key=OPENAI_API_KEY):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key=OPENAI_API_KEY, combined=COMBINED_ANALYSIS, max_workers=VISION_MAX_WORKERS,
+                 render_window=PDF_RENDER_WINDOW, save_images=PDF_SAVE_PAGE_IMAGES, routing=PAGE_ROUTING,
+                 batch_images=VISION_BATCH_MAX_IMAGES, vision=PDF_VISION_ANALYSIS,
+                 hash_index: Optional[HashIndex] = None):
+        self.client = get_client("summary", api_key)
+        self.vision_client = get_client("vision", api_key)
         self.summary_model = SUMMARY_MODEL
         self.vision_model = VISION_MODEL
-
-    def process_pdf(self, pdf_path: str, output_dir: Path) -> Dict[str, Any]:
+        self.combined = combined
+        self.max_workers = max_workers
+        self.render_window = max(render_window, 1)
+        self.save_images = save_images
+        self.routing = routing
+        self.batch_images = max(batch_images, 1)
+        self.vision = vision
+        # Analyses of near-duplicates in other decks are reused through this index; None disables that
+        self.hash_index = hash_index
+
+    def process_pdf(self, pdf_path: str, output_dir: Path, reuse_pages: bool = True) -> Dict[str, Any]:
         """Process a PDF file and extract text, images, and analysis
 
+        When the deck was processed before with the same settings, pages whose
+        text and bitmap are unchanged keep their analysis, and the changed and
+        removed pages are recorded in revision.json for consolidation.
+
         Args:
             pdf_path: Path to the PDF file
             output_dir: Base output directory
+            reuse_pages: Reuse analyses of unchanged pages from the previous run
 
         Returns:
             Dict containing processing results
         """
+        return self.summarize_pdf(self.analyze_pdf_pages(pdf_path, output_dir, reuse_pages))
+
+    def analyze_pdf_pages(self, pdf_path: str, output_dir: Path, reuse_pages: bool = True) -> Dict[str, Any]:
+        """Extract the text of a PDF and render, route and analyze its pages (first half of process_pdf)
+
+        Args:
+            pdf_path: Path to the PDF file
+            output_dir: Base output directory
+            reuse_pages: Reuse analyses of unchanged pages from the previous run
+
+        Returns:
+            Dict with the extracted text and page analyses, for summarize_pdf
+        """
         pdf_path = Path(pdf_path)
         file_name = pdf_path.stem
 
@@ -36,53 +99,81 @@ class PDFProcessor:
         pdf_output_dir = output_dir / f"pdf-{file_name}"
         pdf_output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Create images directory
-        images_dir = pdf_output_dir / "images"
-        images_dir.mkdir(exist_ok=True)
+        # Create images directory (page PNGs are optional, vision requests are encoded in memory)
+        images_dir = None
+        if self.save_images:
+            images_dir = pdf_output_dir / "images"
+            images_dir.mkdir(exist_ok=True)
 
         # Create analysis directory
         analysis_dir = pdf_output_dir / "analysis"
         analysis_dir.mkdir(exist_ok=True)
 
-        # 1. Extract text from PDF
-        text_content = self.extract_text(pdf_path)
-        text_file = pdf_output_dir / "text_content.txt"
-        with open(text_file, "w", encoding="utf-8") as f:
-            f.write(text_content)
-
-        # 2. Convert PDF to images and save
-        images = self.convert_to_images(pdf_path)
-        image_paths = []
+        # Pages of the previous run of this deck (read before their files are overwritten)
+        page_settings = self.page_settings()
+        previous = load_previous_pages(pdf_output_dir, page_settings) if reuse_pages else {}
 
-        for i, image in enumerate(images):
-            image_path = images_dir / f"page_{i + 1}.png"
-            image.save(image_path, "PNG")
-            image_paths.append(image_path)
+        # The PDF is parsed once; text, structure and bitmaps all come from this document
+        text_file = pdf_output_dir / "text_content.txt"
+        with PdfDocument(pdf_path) as document:
+            # 1. Extract text and page structure, streaming text_content.txt page by page
+            try:
+                pages = self.extract_pages(document, text_file)
+                text_content = self.format_text(pages)
+            except Exception as e:
+                pages = []
+                text_content = f"Error extracting text: {str(e)}"
+                with open(text_file, "w", encoding="utf-8") as f:
+                    f.write(text_content)
+            structures = {page["page"]: page["structure"] for page in pages}
+            texts = {page["page"]: page["text"] for page in pages}
+
+            # 2-3. Render pages one window at a time, classify them and analyze the ones that need
+            # GPT Vision as soon as they are rendered (pages are independent, so they run concurrently).
+            # Text-only runs never render
+            if self.vision:
+                rendered = self.render_pages(document, images_dir, structures)
+            else:
+                rendered = (self._unrendered_page(page) for page in range(1, document.page_count + 1))
+            page_analyses = self.analyze_pages(self._fingerprint_pages(rendered, texts), analysis_dir,
+                                               source_name=pdf_path.name, previous=previous)
+        self._map_previous_duplicates(page_analyses, previous)
+        self._remove_stale_outputs(page_analyses, analysis_dir, images_dir)
 
-        # 3. Analyze images with GPT Vision
-        page_analyses = []
+        return {
+            "file_name": file_name,
+            "output_dir": pdf_output_dir,
+            "text_file": text_file,
+            "text_content": text_content,
+            "texts": texts,
+            "page_analyses": page_analyses,
+            "page_settings": page_settings,
+            "previous": previous
+        }
 
-        for i, image_path in enumerate(image_paths):
-            # Analyze image
-            analysis = self.analyze_image(image_path)
+    def summarize_pdf(self, analyzed: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract important content, summarize and save metadata (second half of process_pdf)
 
-            # Save analysis
-            analysis_file = analysis_dir / f"page_{i + 1}_analysis.txt"
-            with open(analysis_file, "w", encoding="utf-8") as f:
-                f.write(analysis)
+        Args:
+            analyzed: Result of analyze_pdf_pages
 
-            page_analyses.append({
-                "page": i + 1,
-                "analysis": analysis
-            })
+        Returns:
+            Dict containing processing results
+        """
+        file_name = analyzed["file_name"]
+        pdf_output_dir = analyzed["output_dir"]
+        text_content = analyzed["text_content"]
+        texts = analyzed["texts"]
+        page_analyses = analyzed["page_analyses"]
+        previous = analyzed["previous"]
+        image_paths = [item["image_path"] for item in page_analyses if item["image_path"]]
 
         # 4. Extract important content and summarize
-        important_content = self.extract_important_content(text_content, page_analyses)
+        important_content, summary = self.analyze_content(text_content, page_analyses)
         important_file = pdf_output_dir / "important_content.txt"
         with open(important_file, "w", encoding="utf-8") as f:
             f.write(important_content)
 
-        summary = self.summarize_content(text_content, page_analyses)
         summary_file = pdf_output_dir / "summary.txt"
         with open(summary_file, "w", encoding="utf-8") as f:
             f.write(summary)
@@ -90,10 +181,48 @@ class PDFProcessor:
         # Save metadata
         metadata = {
             "file_name": file_name,
-            "page_count": len(images),
+            "page_count": len(page_analyses),
             "has_text": bool(text_content.strip()),
-            "pages": [{"page": item["page"], "has_analysis": bool(item["analysis"])} for item in page_analyses]
+            "pages": [
+                {
+                    "page": item["page"],
+                    "route": item["route"],
+                    "has_analysis": bool(item["analysis"]),
+                    "image_bytes": item["image_bytes"],
+                    "image_tokens": item["image_tokens"],
+                    "cropped": item["cropped"],
+                    "grayscale": item["grayscale"],
+                    "duplicate_of_page": item["duplicate_of_page"],
+                    "reused_from": item["reused_from"],
+                    "text_hash": item["text_hash"],
+                    "raster_hash": item["raster_hash"],
+                    "fingerprint": item["fingerprint"],
+                    "previous_page": item["previous_page"]
+                }
+                for item in page_analyses
+            ],
+            "page_settings": analyzed["page_settings"],
+            "unchanged_pages": [item["page"] for item in page_analyses if item["previous_page"] is not None],
+            "duplicate_groups": self._duplicate_groups(page_analyses),
+            "skipped_pages": [item["page"] for item in page_analyses if item["route"] == ROUTE_BLANK],
+            "cropped_pages": [item["page"] for item in page_analyses if item["cropped"]]
         }
+        vision_pages = sum(item["route"] == ROUTE_VISION and item["previous_page"] is None for item in page_analyses)
+        print(f"Sent {vision_pages} of {len(page_analyses)} pages to the vision model: "
+              f"{sum(item['image_bytes'] for item in page_analyses) / 1024:.0f} KB, "
+              f"~{sum(item['image_tokens'] for item in page_analyses)} image tokens")
+        if previous:
+            print(f"Reused the analyses of {len(metadata['unchanged_pages'])} unchanged pages: {file_name}")
+
+        # Record what changed since the previous run for the consolidation step
+        revision = None
+        if previous:
+            revision = build_revision(previous, [
+                {"page": item["page"], "fingerprint": item["fingerprint"], "text": texts.get(item["page"], ""),
+                 "analysis": item["analysis"]}
+                for item in page_analyses
+            ])
+        save_revision(pdf_output_dir, revision)
 
         metadata_file = pdf_output_dir / "metadata.json"
         with open(metadata_file, "w", encoding="utf-8") as f:
@@ -102,14 +231,269 @@ class PDFProcessor:
         return {
             "file_name": file_name,
             "output_dir": pdf_output_dir,
-            "text_file": text_file,
+            "text_file": analyzed["text_file"],
             "image_paths": image_paths,
-            "analysis_files": [analysis_dir / f"page_{i + 1}_analysis.txt" for i in range(len(images))],
+            "analysis_files": [item["analysis_file"] for item in page_analyses if item["analysis_file"]],
             "important_file": important_file,
             "summary_file": summary_file,
             "metadata": metadata
         }
 
+    def analyze_pages(self, pages: Iterable[Dict[str, Any]], analysis_dir: Path, source_name: str = "",
+                      previous: Optional[Dict[int, Dict[str, Any]]] = None) -> List[Dict]:
+        """Analyze rendered pages concurrently with a bounded pool
+
+        pages is consumed lazily: once render_window analyses are in flight, no
+        further page is pulled (and so rendered) until one finishes. Only
+        pages routed to vision are analyzed; the others get an empty analysis.
+        Consecutive build steps of a slide (see is_build_step) are analyzed
+        once through their most complete member, and pages with the same
+        text as an image analyzed anywhere in the course, which shows
+        everything they do, reuse its analysis (see HashIndex).
+        Pages whose fingerprint matches a page of the previous run keep its
+        analysis, unless that analysis was copied from another deck or from a
+        page of this deck that changed.
+        Pages that need a new analysis are packed into multi-image requests
+        (see analyze_images). Each analysis is written to
+        analysis/page_N_analysis.txt as soon as it finishes; errors stay
+        isolated per page (see analyze_image).
+
+        Args:
+            pages: Page dicts in page order (see render_pages)
+            analysis_dir: Directory for per-page analysis files
+            source_name: PDF file name, identifies pages in the course-wide hash index
+            previous: Pages of the previous run (see load_previous_pages)
+
+        Returns:
+            List of page analysis results in page order
+        """
+        page_analyses = []
+        index = self.hash_index
+        unchanged = {
+            entry["fingerprint"]: entry for entry in (previous or {}).values()
+            if entry["route"] == ROUTE_VISION and entry["analysis"]
+            and not entry["analysis"].startswith("Error analyzing image")
+        }
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Analysis future -> groups waiting for it, as (pages, representative, source) tuples
+            pending = {}
+            # (encoded image, future) pairs waiting to be sent as one multi-image request
+            batch = []
+
+            def flush():
+                if batch:
+                    executor.submit(self._analyze_batch, list(batch), index)
+                    batch.clear()
+
+            def submit(group):
+                # Every member extends the one before it, so the last one shows all of the group's content
+                representative = group[-1]
+                source = None
+                if index is None or representative["hashes"] is None:
+                    future = Future()
+                else:
+                    future, source = index.lookup_or_reserve(representative["hashes"],
+                                                             (source_name, representative["page"]),
+                                                             representative.get("text", ""))
+                if source is None:
+                    if not batch_fits([image for image, _ in batch], representative["image"], self.batch_images):
+                        flush()
+                    batch.append((representative["image"], future))
+                    if len(batch) >= self.batch_images:
+                        flush()
+                pending.setdefault(future, []).append((group, representative, source))
+
+            def collect(return_when):
+                # Queued pages must be sent before waiting, they may be what is waited for
+                flush()
+                done, _ = wait(pending, return_when=return_when)
+                for future in done:
+                    for group, representative, source in pending.pop(future):
+                        page_analyses.extend(self._save_group_analysis(
+                            group, representative, source, future.result(), analysis_dir, source_name
+                        ))
+
+            group = []
+
+            def add(page):
+                # The group's representative is its last member; the page joins only if it extends it
+                if group and self.is_build_step(group[-1], page):
+                    group.append(page)
+                    return
+                if group:
+                    submit(list(group))
+                group[:] = [page]
+                if len(pending) >= self.render_window:
+                    collect(FIRST_COMPLETED)
+
+            # Unchanged pages whose previous analysis was copied from another page of the deck
+            copies = []
+            for page in pages:
+                if page["route"] != ROUTE_VISION:
+                    page_analyses.append(self._save_page_analysis(page, "", analysis_dir))
+                    continue
+
+                entry = unchanged.get(page.get("fingerprint"))
+                if entry is not None and entry["duplicate_of_page"] is None and entry["reused_from"] is None:
+                    page_analyses.append(self._save_unchanged_page(page, entry, analysis_dir))
+                    continue
+                if entry is not None and entry["duplicate_of_page"] is not None:
+                    # Its representative usually comes later, so this is decided once every page is seen
+                    copies.append((page, entry))
+                    continue
+                # Analyses reused from other decks are looked up again
+                add(page)
+
+            # A copy stays valid only if the page it came from kept its own analysis too
+            kept = {item["previous_page"] for item in page_analyses if item["previous_page"] is not None}
+            for page, entry in copies:
+                if entry["duplicate_of_page"] in kept:
+                    page_analyses.append(self._save_unchanged_page(page, entry, analysis_dir))
+                else:
+                    add(page)
+
+            if group:
+                submit(group)
+            if pending:
+                collect(ALL_COMPLETED)
+
+        page_analyses.sort(key=lambda item: item["page"])
+        return page_analyses
+
+    def _analyze_batch(self, batch: List[Tuple[Dict[str, Any], Future]], index: Optional[HashIndex]):
+        """Analyze a batch of encoded pages and publish each analysis to its future"""
+        try:
+            analyses = self.analyze_images([image for image, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if index is not None:
+                    index.discard(future)
+                future.set_exception(e)
+            return
+        for (_, future), analysis in zip(batch, analyses):
+            if index is not None and analysis.startswith("Error analyzing image"):
+                # Let later near-duplicates try again instead of inheriting the error
+                index.discard(future)
+            future.set_result(analysis)
+
+    def _save_group_analysis(self, group: List[Dict[str, Any]], representative: Dict[str, Any],
+                             source: Optional[Tuple], analysis: str, analysis_dir: Path,
+                             source_name: str) -> List[Dict]:
+        """Save one analysis for every page of a near-duplicate group and record where it came from"""
+        results = []
+        for page in group:
+            result = self._save_page_analysis(page, analysis, analysis_dir)
+            origin = source or (None if page is representative else (source_name, representative["page"]))
+            if origin is not None and origin[0] == source_name:
+                result["duplicate_of_page"] = origin[1]
+            elif origin is not None:
+                result["reused_from"] = origin[0] if origin[1] is None else f"{origin[0]} page {origin[1]}"
+            results.append(result)
+        return results
+
+    def _save_unchanged_page(self, page: Dict[str, Any], entry: Dict[str, Any], analysis_dir: Path) -> Dict:
+        """Save the previous run's analysis of an unchanged page (nothing is sent for it)"""
+        result = self._save_page_analysis(page, entry["analysis"], analysis_dir)
+        result.update(previous_page=entry["page"], reused_from=entry["reused_from"], image_bytes=0, image_tokens=0)
+        return result
+
+    @staticmethod
+    def is_build_step(representative: Dict[str, Any], page: Dict[str, Any]) -> bool:
+        """Whether a page is a build step of a group's representative and can share its analysis
+
+        The representative's text must be contained in the page's text, and
+        its bitmap must only gain content (see adds_content). Slides that
+        share a template but not their text are never grouped.
+
+        Args:
+            representative: Page dict of the group's most complete member so far
+            page: Page dict of the next page, with text and hashes
+
+        Returns:
+            True if the page extends the representative
+        """
+        if representative["hashes"] is None or page["hashes"] is None:
+            return False
+        return (normalize_text(representative.get("text")) in normalize_text(page.get("text"))
+                and adds_content(representative["hashes"], page["hashes"]))
+
+    @staticmethod
+    def _fingerprint_pages(pages: Iterable[Dict[str, Any]], texts: Dict[int, str]) -> Iterator[Dict[str, Any]]:
+        """Add the text, text hash, raster hash and fingerprint to page dicts (see page_fingerprint)"""
+        for page in pages:
+            page["text"] = texts.get(page["page"], "")
+            page.update(page_fingerprint(page["text"], page["raster_hash"]))
+            yield page
+
+    @staticmethod
+    def _map_previous_duplicates(page_analyses: List[Dict], previous: Dict[int, Dict[str, Any]]):
+        """Carry near-duplicate links of unchanged pages over to their new page numbers"""
+        new_pages = {item["previous_page"]: item["page"] for item in page_analyses if item["previous_page"] is not None}
+        for item in page_analyses:
+            if item["previous_page"] is not None:
+                item["duplicate_of_page"] = new_pages.get(previous[item["previous_page"]]["duplicate_of_page"])
+
+    @staticmethod
+    def _remove_stale_outputs(page_analyses: List[Dict], analysis_dir: Path, images_dir: Optional[Path]):
+        """Remove page files left over from an earlier version of the deck"""
+        analysis_files = {item["analysis_file"] for item in page_analyses if item["analysis_file"]}
+        for analysis_file in analysis_dir.glob("page_*_analysis.txt"):
+            if analysis_file not in analysis_files:
+                analysis_file.unlink()
+        if images_dir is not None:
+            for image_file in images_dir.glob("page_*.png"):
+                if int(image_file.stem[5:]) > len(page_analyses):
+                    image_file.unlink()
+
+    @staticmethod
+    def _save_page_analysis(page: Dict[str, Any], analysis: str, analysis_dir: Path) -> Dict:
+        """Write analysis/page_N_analysis.txt for analyzed pages and return the page result"""
+        analysis_file = None
+        if page["image"] is not None:
+            analysis_file = analysis_dir / f"page_{page['page']}_analysis.txt"
+            with open(analysis_file, "w", encoding="utf-8") as f:
+                f.write(analysis)
+
+        return {
+            "page": page["page"],
+            "route": page["route"],
+            "analysis": analysis,
+            "analysis_file": analysis_file,
+            "image_path": page["image_path"],
+            "image_bytes": page["image"]["bytes"] if page["image"] else 0,
+            "image_tokens": page["image"]["tokens"] if page["image"] else 0,
+            "cropped": page["image"]["cropped"] if page["image"] else None,
+            "grayscale": page["image"]["grayscale"] if page["image"] else False,
+            "duplicate_of_page": None,
+            "reused_from": None,
+            "text_hash": page.get("text_hash"),
+            "raster_hash": page.get("raster_hash"),
+            "fingerprint": page.get("fingerprint"),
+            "previous_page": None
+        }
+
+    @staticmethod
+    def _duplicate_groups(page_analyses: List[Dict]) -> List[Dict]:
+        """Near-duplicate groups of a deck: the analyzed page and the pages that reuse it"""
+        groups = {}
+        for item in page_analyses:
+            if item["duplicate_of_page"] is not None:
+                groups.setdefault(item["duplicate_of_page"], [item["duplicate_of_page"]]).append(item["page"])
+        return [{"analyzed_page": page, "pages": sorted(pages)} for page, pages in sorted(groups.items())]
+
+    @staticmethod
+    def _unrendered_page(page: int) -> Dict[str, Any]:
+        """Page dict (see encode_page) of a page that is not rendered, in text-only runs"""
+        return {"page": page, "route": ROUTE_TEXT, "image_path": None, "ink_ratio": 0.0, "raster_hash": None,
+                "hashes": None, "image": None}
+
+    def page_settings(self) -> str:
+        """Hash of the settings that determine page routing and analyses; pages are only reused under the same"""
+        return content_hash(self.vision_model, PROMPT_VERSION, self.vision and encoding_settings(),
+                            self.routing and routing_settings(), DEDUP_ENABLED and dedup_settings(), ENGINE,
+                            PDF_RENDER_DPI)
+
     def extract_text(self, pdf_path: Path) -> str:
         """Extract text from a PDF file
 
@@ -119,55 +503,86 @@ class PDFProcessor:
         Returns:
             Extracted text content
         """
-        text_content = ""
-
         try:
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    text_content += f"--- Page {page_num + 1} ---\n"
-                    text_content += page.extract_text() or "[No extractable text on this page]"
-                    text_content += "\n\n"
+            with PdfDocument(pdf_path) as document:
+                return self.format_text(self.extract_pages(document))
         except Exception as e:
-            text_content = f"Error extracting text: {str(e)}"
+            return f"Error extracting text: {str(e)}"
 
-        return text_content
+    def extract_pages(self, document: PdfDocument, text_file: Optional[Path] = None) -> List[Dict[str, Any]]:
+        """Extract the text and structural features of every page
 
-    def convert_to_images(self, pdf_path: Path) -> List[Image.Image]:
-        """Convert PDF to a list of images
+        Pages are extracted in ranges of PDF_TEXT_RANGE_PAGES across the CPU
+        pool and appended to text_file in page order as they arrive.
 
         Args:
-            pdf_path: Path to the PDF file
+            document: Open PDF
+            text_file: text_content.txt to stream to, or None
 
         Returns:
-            List of PIL Image objects
+            List of dicts with page, text and structure (see page_structure)
+        """
+        futures = [
+            submit_cpu(extract_page_range, str(document.path), first_page,
+                       min(first_page + PDF_TEXT_RANGE_PAGES - 1, document.page_count), document.page_count)
+            for first_page in range(1, document.page_count + 1, PDF_TEXT_RANGE_PAGES)
+        ]
+        records = (page for future in futures for page in future.result())
+
+        pages = []
+        with open(text_file, "w", encoding="utf-8") if text_file else nullcontext() as f:
+            for page in records:
+                pages.append(page)
+                if f is not None:
+                    f.write(self.format_page(page))
+        return pages
+
+    @classmethod
+    def format_text(cls, pages: List[Dict[str, Any]]) -> str:
+        """Format extracted page texts as text_content.txt"""
+        return "".join(cls.format_page(page) for page in pages)
+
+    @staticmethod
+    def format_page(page: Dict[str, Any]) -> str:
+        """Format one page of text_content.txt"""
+        return f"--- Page {page['page']} ---\n{page['text'] or '[No extractable text on this page]'}\n\n"
+
+    def render_pages(self, document: PdfDocument, images_dir: Optional[Path] = None,
+                     structures: Optional[Dict[int, Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+        """Render pages, classify them and encode the ones that need the vision model as soon as they are ready
+
+        Page ranges are rendered, saved and encoded in the CPU pool.
+
+        Args:
+            document: Open PDF
+            images_dir: Directory for page PNGs, or None to skip writing them
+            structures: page_structure features by page number
+
+        Yields:
+            Page dicts (page, route, image_path, image) in page order
         """
         try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=200)
-            return images
+            yield from render_pages_parallel(document, images_dir, window=self.render_window,
+                                             structures=structures, routing=self.routing)
         except Exception as e:
             print(f"Error converting PDF to images: {str(e)}")
-            return []
 
-    def analyze_image(self, image_path: Path) -> str:
+    def analyze_image(self, image: Union[Path, Image.Image, Dict[str, Any]]) -> str:
         """Analyze an image using GPT-4 Vision
 
         Args:
-            image_path: Path to the image file
+            image: Image file, PIL image or an already encoded image (see encode_image)
 
         Returns:
             Analysis text
         """
         try:
-            # Read image and encode as base64
-            with open(image_path, "rb") as image_file:
-                image_data = image_file.read()
-                base64_image = base64.b64encode(image_data).decode('utf-8')
+            # Downscale and encode in memory unless the page was already encoded
+            encoded = image if isinstance(image, dict) else encode_image(image)
 
             # Call Vision API
-            response = self.client.chat.completions.create(
+            response = chat_completion(
+                self.vision_client,
                 model=self.vision_model,
                 messages=[
                     {
@@ -175,14 +590,9 @@ class PDFProcessor:
                         "content": [
                             {
                                 "type": "text",
-                                "text": "Analyze this lecture slide or page. Identify and explain key concepts, formulas, diagrams, and their significance. If there are any important points that would be relevant for exams or assignments, highlight them."
+                                "text": f"Analyze this lecture slide or page. {ANALYSIS_INSTRUCTIONS}"
                             },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{base64_image}"
-                                }
-                            }
+                            image_content(encoded)
                         ]
                     }
                 ],
@@ -193,6 +603,86 @@ class PDFProcessor:
         except Exception as e:
             return f"Error analyzing image: {str(e)}"
 
+    def analyze_images(self, images: List[Dict[str, Any]]) -> List[str]:
+        """Analyze consecutive pages in one multi-image GPT-4 Vision request
+
+        Pages the batched response leaves out, or a whole batch whose request
+        fails, are analyzed one by one instead.
+
+        Args:
+            images: Encoded pages (see encode_image), in page order
+
+        Returns:
+            Analysis text per page, in order
+        """
+        if len(images) == 1:
+            return [self.analyze_image(images[0])]
+
+        prompt = (
+            f"The following {len(images)} images are consecutive pages of a lecture, labelled Image 1 to "
+            f"Image {len(images)}. Analyze each page separately. {ANALYSIS_INSTRUCTIONS} "
+            "Return one entry per image with its index and analysis."
+        )
+        try:
+            results = request_image_batch(self.vision_client, self.vision_model, prompt, images, ("analysis",),
+                                          max_tokens=1000 * len(images))
+        except Exception as e:
+            print(f"Batched analysis of {len(images)} pages failed, analyzing them one by one: {str(e)}")
+            results = [None] * len(images)
+
+        return [result["analysis"] if result else self.analyze_image(image)
+                for result, image in zip(results, images)]
+
+    def analyze_content(self, text_content: str, page_analyses: List[Dict]) -> Tuple[str, str]:
+        """Extract important content and summarize
+
+        In combined mode both sections come from one structured request;
+        otherwise two separate completions are made.
+
+        Args:
+            text_content: Extracted text content
+            page_analyses: List of page analysis results
+
+        Returns:
+            Tuple of (important content, summary)
+        """
+        if not self.combined:
+            return (self.extract_important_content(text_content, page_analyses),
+                    self.summarize_content(text_content, page_analyses))
+
+        combined_content = self._combine_content(text_content, page_analyses)
+
+        prompt = f"""
+        The following is content extracted from a lecture PDF, including both text and analysis of visual elements.
+        Please return two sections as JSON.
+
+        important_content: {IMPORTANT_CONTENT_INSTRUCTIONS}
+
+        summary: {SUMMARY_INSTRUCTIONS}
+
+        Content:
+        {combined_content[:25000]}  # Limit content length to avoid token limits
+        """
+
+        return request_analysis(
+            self.client, self.summary_model,
+            "You are an expert academic assistant that helps students identify the most important information from lecture materials and understand them through clear, comprehensive summaries.",
+            prompt
+        )
+
+    @staticmethod
+    def _combine_content(text_content: str, page_analyses: List[Dict]) -> str:
+        """Combine text content with page analyses"""
+        parts = [text_content, "\n\n"]
+        for page in page_analyses:
+            # Text-only and blank pages have no analysis; their content is in text_content.
+            # Near-duplicates of another page in this deck would only repeat its analysis
+            if not page['analysis'] or page.get('duplicate_of_page') is not None:
+                continue
+            parts.append(f"--- Page {page['page']} Analysis ---\n")
+            parts.append(page['analysis'] + "\n\n")
+        return "".join(parts)
+
     def extract_important_content(self, text_content: str, page_analyses: List[Dict]) -> str:
         """Extract important content from text and page analyses
 
@@ -203,28 +693,20 @@ class PDFProcessor:
         Returns:
             Important content
         """
-        # Combine text content with page analyses
-        combined_content = text_content + "\n\n"
-        for page in page_analyses:
-            combined_content += f"--- Page {page['page']} Analysis ---\n"
-            combined_content += page['analysis'] + "\n\n"
+        combined_content = self._combine_content(text_content, page_analyses)
 
         # Use OpenAI to extract important content
         prompt = f"""
         The following is content extracted from a lecture PDF, including both text and analysis of visual elements.
-        Please identify and extract the most important content, focusing on:
-
-        1. Key concepts and definitions
-        2. Important formulas and equations
-        3. Critical information for exams or assignments
-        4. Significant diagrams or visual elements and their meaning
+        Please identify and extract {IMPORTANT_CONTENT_INSTRUCTIONS}
 
         Content:
         {combined_content[:25000]}  # Limit content length to avoid token limits
         """
 
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.summary_model,
             messages=[
                 {"role": "system",
@@ -245,28 +727,20 @@ class PDFProcessor:
         Returns:
             Summary of content
         """
-        # Combine text content with page analyses
-        combined_content = text_content + "\n\n"
-        for page in page_analyses:
-            combined_content += f"--- Page {page['page']} Analysis ---\n"
-            combined_content += page['analysis'] + "\n\n"
+        combined_content = self._combine_content(text_content, page_analyses)
 
         # Use OpenAI to summarize content
         prompt = f"""
         The following is content extracted from a lecture PDF, including both text and analysis of visual elements.
-        Please provide a comprehensive summary that:
-
-        1. Outlines the main topics and concepts covered
-        2. Explains key ideas in a clear, structured manner
-        3. Preserves the logical flow of the lecture material
-        4. Includes important formulas, diagrams, and their significance
+        Please provide {SUMMARY_INSTRUCTIONS}
 
         Content:
         {combined_content[:25000]}  # Limit content length to avoid token limits
         """
 
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.summary_model,
             messages=[
                 {"role": "system",
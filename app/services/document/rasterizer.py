@@ -0,0 +1,173 @@
+"""
+Page-at-a-time PDF rasterization.
+Pages are rendered in small ranges (see engine.PdfDocument) and yielded as soon as they
+are ready, so callers can save and analyze early pages while later ones are
+still rendering, and never hold more than one range in memory.
+Ranges are rendered in the shared CPU pool (see app.utils.cpu_pool), with
+PNG saving and encoding done in the workers, so rendering uses every core
+and bitmaps never leave the process that rendered them.
+"""
+
+import hashlib
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from app.config import (
+    DEDUP_ENABLED, PAGE_BLANK_INK, PDF_RENDER_DPI, PDF_RENDER_MEMORY_MB, PDF_RENDER_PROCESSES, PDF_RENDER_WINDOW,
+    VISION_DROP_BLANK
+)
+from app.services.document.engine import PdfDocument
+from app.services.document.page_classifier import ROUTE_BLANK, ROUTE_VISION, classify_page, pixel_stats
+from app.utils.cpu_pool import cpu_workers, submit_cpu
+from app.utils.images import encode_image
+from app.utils.phash import image_hashes
+
+
+def iter_pages(document: PdfDocument, dpi: int = PDF_RENDER_DPI,
+               window: int = PDF_RENDER_WINDOW) -> Iterator[Tuple[int, Image.Image]]:
+    """Render an open PDF lazily, window pages at a time
+
+    Args:
+        document: Open PDF
+        dpi: Render resolution
+        window: Pages rendered per batch
+
+    Yields:
+        (page_number, image) tuples in page order, 1-based
+    """
+    for first_page in range(1, document.page_count + 1, window):
+        last_page = min(first_page + window - 1, document.page_count)
+        yield from document.render_range(first_page, last_page, dpi)
+
+
+def render_page_range(pdf_path: str, first_page: int, last_page: int, images_dir: Optional[str], dpi: int,
+                      structures: Optional[Dict[int, Dict[str, Any]]] = None, routing: bool = True,
+                      page_count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Render a page range, classify each page and encode it for vision requests (CPU pool worker)
+
+    Pages are also saved as images_dir/page_N.png when images_dir is given.
+
+    Returns:
+        Page dicts in page order, see encode_page
+    """
+    structures = structures or {}
+    pages = []
+    with PdfDocument(pdf_path, page_count=page_count) as document:
+        for page, image in document.render_range(first_page, last_page, dpi):
+            pages.append(encode_page(page, image, Path(images_dir) if images_dir else None,
+                                     structures.get(page), routing))
+            image.close()
+    return pages
+
+
+def encode_page(page: int, image: Image.Image, images_dir: Optional[Path] = None,
+                structure: Optional[Dict[str, Any]] = None, routing: bool = True) -> Dict[str, Any]:
+    """Classify a rendered page, encode it in memory when it needs the vision model,
+    and optionally save it as images_dir/page_N.png
+
+    Args:
+        page: Page number
+        image: Rendered page
+        images_dir: Directory for page PNGs, or None
+        structure: page_structure features of the page, if known
+        routing: Classify the page; otherwise every page but blank ones goes to the vision model
+
+    Returns:
+        Dict with page, route, image_path (None when not saved), ink_ratio, raster_hash (SHA-256 of
+        the bitmap), hashes (see image_hashes) and image (see encode_image); hashes and image are
+        None unless the page is routed to vision
+    """
+    image_path = None
+    if images_dir is not None:
+        image_path = images_dir / f"page_{page}.png"
+        image.save(image_path, "PNG")
+
+    pixels = pixel_stats(image)
+    if routing:
+        route = classify_page(structure, pixels)
+    else:
+        route = ROUTE_BLANK if VISION_DROP_BLANK and pixels["ink_ratio"] < PAGE_BLANK_INK else ROUTE_VISION
+    vision = route == ROUTE_VISION
+    return {
+        "page": page,
+        "route": route,
+        "image_path": image_path,
+        "ink_ratio": pixels["ink_ratio"],
+        "raster_hash": hashlib.sha256(image.tobytes()).hexdigest(),
+        "hashes": image_hashes(image) if vision and DEDUP_ENABLED else None,
+        "image": encode_image(image) if vision else None
+    }
+
+
+def _available_memory() -> int:
+    """Available physical memory in bytes, or 0 when unknown"""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+
+def render_workers(dpi: int = PDF_RENDER_DPI, window: int = PDF_RENDER_WINDOW) -> int:
+    """Number of page ranges rendered at once: one per CPU pool worker, capped so all windows fit in memory
+
+    Args:
+        dpi: Render resolution
+        window: Pages held in memory per worker
+
+    Returns:
+        Range count (at least 1)
+    """
+    if PDF_RENDER_PROCESSES > 0:
+        return min(PDF_RENDER_PROCESSES, cpu_workers())
+
+    workers = cpu_workers()
+    # RGB bitmap of a letter-size page, doubled for poppler's and PNG encoding buffers
+    page_bytes = int(8.5 * dpi) * int(11 * dpi) * 3 * 2
+    budget = PDF_RENDER_MEMORY_MB * 1024 * 1024 if PDF_RENDER_MEMORY_MB > 0 else _available_memory() // 2
+    if budget > 0:
+        workers = min(workers, budget // (page_bytes * window))
+    return max(1, workers)
+
+
+def render_pages_parallel(document: PdfDocument, images_dir: Optional[Path] = None, dpi: int = PDF_RENDER_DPI,
+                          window: int = PDF_RENDER_WINDOW, structures: Optional[Dict[int, Dict[str, Any]]] = None,
+                          routing: bool = True) -> Iterator[Dict[str, Any]]:
+    """Render and encode a PDF across the CPU pool
+
+    At most render_workers ranges are in flight, and pages are yielded in
+    page order as soon as their range is done.
+
+    Args:
+        document: Open PDF (workers open their own copy)
+        images_dir: Directory for page PNGs, or None to keep pages in memory only
+        dpi: Render resolution
+        window: Pages per range
+        structures: page_structure features by page number
+        routing: Classify pages (see encode_page)
+
+    Yields:
+        Page dicts in page order, see encode_page
+    """
+    workers = render_workers(dpi, window)
+    page_count = document.page_count
+    ranges = deque(
+        (first_page, min(first_page + window - 1, page_count))
+        for first_page in range(1, page_count + 1, window)
+    )
+
+    structures = structures or {}
+    in_flight = deque()
+    while ranges or in_flight:
+        while ranges and len(in_flight) < workers:
+            first_page, last_page = ranges.popleft()
+            range_structures = {page: structures[page]
+                                for page in range(first_page, last_page + 1) if page in structures}
+            in_flight.append(submit_cpu(
+                render_page_range, str(document.path), first_page, last_page,
+                str(images_dir) if images_dir else None, dpi, range_structures, routing, page_count
+            ))
+        yield from in_flight.popleft().result()
@@ -1,20 +1,84 @@
-import base64
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
-
-from openai import OpenAI
-
-from app.config import OPENAI_API_KEY, SUMMARY_MODEL, VISION_MODEL
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from app.config import (
+    COMBINED_ANALYSIS, OPENAI_API_KEY, PAGE_BLANK_INK, SUMMARY_MODEL, VISION_BATCH_MAX_IMAGES, VISION_DROP_BLANK,
+    VISION_MAX_WORKERS, VISION_MODEL
+)
+from app.utils.clients import get_client
+from app.utils.cpu_pool import run_cpu, submit_cpu
+from app.utils.images import encode_image, image_content, ink_ratio, plan_batches
+from app.utils.openai_api import chat_completion
+from app.utils.phash import HashIndex, image_hashes
+from app.utils.structured import request_analysis, request_image_batch
+
+# Bump when prompts change so the build manifest reprocesses affected inputs
+PROMPT_VERSION = "2"
+
+# Instructions shared by the single-image and batched requests
+ANALYSIS_INSTRUCTIONS = (
+    "Identify and explain key concepts, formulas, diagrams, and their significance. If there are any important "
+    "points that would be relevant for exams or assignments, highlight them."
+)
+IMPORTANT_CONTENT_INSTRUCTIONS = """the most important content, focusing on:
+1. Key concepts and definitions
+2. Important formulas and equations
+3. Critical information for exams or assignments
+4. Significant diagrams or visual elements and their meaning"""
+SUMMARY_INSTRUCTIONS = "a concise summary that captures the main points and significance of this content."
+
+
+def prepare_image_file(image_path: Path, drop_blank: bool = VISION_DROP_BLANK,
+                       dedup: bool = True) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Dict]]:
+    """Check, hash and encode an image file for analysis (CPU pool worker)
+
+    Args:
+        image_path: Path to the image file
+        drop_blank: Skip images without ink
+        dedup: Compute perceptual hashes for deduplication
+
+    Returns:
+        Tuple of (result dict, see ImageAnalyzer.analyze_image_file; encoded image or None when the image was
+        skipped or could not be read; image_hashes or None when deduplication is disabled)
+    """
+    result = {"analysis": "", "duplicate_of": None, "skipped": False, "cropped": None, "grayscale": False}
+
+    try:
+        with Image.open(image_path) as image:
+            if drop_blank and ink_ratio(image) < PAGE_BLANK_INK:
+                print(f"Skipping blank image: {image_path.name}")
+                result["skipped"] = True
+                return result, None, None
+            hashes = image_hashes(image) if dedup else None
+            encoded = encode_image(image)
+    except Exception as e:
+        result["analysis"] = f"Error analyzing image: {str(e)}"
+        return result, None, None
+
+    result["cropped"], result["grayscale"] = encoded["cropped"], encoded["grayscale"]
+    return result, encoded, hashes
 
 
 class ImageAnalyzer:
     """Class for analyzing image files"""
 
-    def __init__(self, api_key=OPENAI_API_KEY):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key=OPENAI_API_KEY, combined=COMBINED_ANALYSIS, drop_blank=VISION_DROP_BLANK,
+                 batch_images=VISION_BATCH_MAX_IMAGES, max_workers=VISION_MAX_WORKERS,
+                 hash_index: Optional[HashIndex] = None):
+        self.client = get_client("summary", api_key)
+        self.vision_client = get_client("vision", api_key)
         self.summary_model = SUMMARY_MODEL
         self.vision_model = VISION_MODEL
+        self.combined = combined
+        self.drop_blank = drop_blank
+        self.batch_images = max(batch_images, 1)
+        self.max_workers = max_workers
+        # Analyses of near-duplicates are reused through this index; None disables deduplication
+        self.hash_index = hash_index
 
     def process_image(self, image_path: str, output_dir: Path) -> Dict[str, Any]:
         """Process an image file and generate analysis
@@ -27,26 +91,111 @@ class ImageAnalyzer:
             Dict containing processing results
         """
         image_path = Path(image_path)
+
+        # 1. Analyze image with GPT Vision, reusing the analysis of a near-duplicate in the course
+        image_result = self.analyze_image_file(image_path)
+
+        # 2. Extract important content and summarize (blank images have nothing to extract)
+        analysis = image_result["analysis"]
+        important_content, summary = self.analyze_content(analysis) if analysis else ("", "")
+
+        return self._save_outputs(image_path, output_dir, image_result, important_content, summary)
+
+    def process_images(self, image_paths: List[Path], output_dir: Path) -> List[Dict[str, Any]]:
+        """Process consecutive lecture images with multi-image vision requests
+
+        Images that need a new analysis are packed into batches of up to
+        batch_images (fewer for expensive images, see plan_batches), and each
+        request returns the analysis, important content and summary of every
+        image in it: one call per batch instead of three per image. Blank
+        images and near-duplicates are handled as in process_image.
+
+        Args:
+            image_paths: Image files, in lecture order
+            output_dir: Base output directory
+
+        Returns:
+            List of processing results in order (see process_image)
+        """
+        image_paths = [Path(image_path) for image_path in image_paths]
+        if self.batch_images <= 1 or len(image_paths) <= 1:
+            return [self.process_image(image_path, output_dir) for image_path in image_paths]
+
+        index = self.hash_index
+        # Images are prepared in parallel across the CPU pool
+        prepared = [future.result() for future in [
+            submit_cpu(prepare_image_file, image_path, self.drop_blank, index is not None)
+            for image_path in image_paths
+        ]]
+
+        # Positions of images that need a new analysis, their hash index reservations,
+        # and near-duplicates of images analyzed elsewhere as position -> (future, label)
+        new, reserved, reused = [], {}, {}
+        for position, (image_result, encoded, hashes) in enumerate(prepared):
+            if encoded is None:
+                continue
+            if index is None:
+                new.append(position)
+                continue
+            future, source = index.lookup_or_reserve(hashes, (image_paths[position].name, None))
+            if source is None:
+                new.append(position)
+                reserved[position] = future
+            else:
+                reused[position] = (future, source[0] if source[1] is None else f"{source[0]} page {source[1]}")
+
+        contents = {}
+        batches = [[new[i] for i in batch] for batch in plan_batches([prepared[p][1] for p in new],
+                                                                        self.batch_images)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.analyze_images, [prepared[p][1] for p in batch]) for batch in batches]
+            for batch, future in zip(batches, futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [{"analysis": f"Error analyzing image: {str(e)}", "important_content": "",
+                                "summary": ""}] * len(batch)
+                for position, result in zip(batch, results):
+                    contents[position] = result
+                    if position in reserved:
+                        if result["analysis"].startswith("Error analyzing image"):
+                            index.discard(reserved[position])
+                        reserved[position].set_result(result["analysis"])
+
+        for position, (future, label) in reused.items():
+            print(f"Reusing analysis of near-duplicate {label} for {image_paths[position].name}")
+            analysis = future.result()
+            prepared[position][0]["duplicate_of"] = label
+            important_content, summary = self.analyze_content(analysis)
+            contents[position] = {"analysis": analysis, "important_content": important_content, "summary": summary}
+
+        results = []
+        for position, (image_result, _, _) in enumerate(prepared):
+            content = contents.get(position, {"analysis": image_result["analysis"], "important_content": "",
+                                              "summary": ""})
+            image_result["analysis"] = content["analysis"]
+            results.append(self._save_outputs(image_paths[position], output_dir, image_result,
+                                              content["important_content"], content["summary"]))
+        return results
+
+    def _save_outputs(self, image_path: Path, output_dir: Path, image_result: Dict[str, Any],
+                      important_content: str, summary: str) -> Dict[str, Any]:
+        """Write the analysis, important content, summary and metadata of an image"""
         file_name = image_path.stem
 
         # Create output directory for this image
         image_output_dir = output_dir / file_name
         image_output_dir.mkdir(parents=True, exist_ok=True)
 
-        # 1. Analyze image with GPT Vision
-        analysis = self.analyze_image(image_path)
+        analysis = image_result["analysis"]
         analysis_file = image_output_dir / "analysis.txt"
         with open(analysis_file, "w", encoding="utf-8") as f:
             f.write(analysis)
 
-        # 2. Extract important content
-        important_content = self.extract_important_content(analysis)
         important_file = image_output_dir / "important_content.txt"
         with open(important_file, "w", encoding="utf-8") as f:
             f.write(important_content)
 
-        # 3. Summarize content
-        summary = self.summarize_content(analysis)
         summary_file = image_output_dir / "summary.txt"
         with open(summary_file, "w", encoding="utf-8") as f:
             f.write(summary)
@@ -55,7 +204,11 @@ class ImageAnalyzer:
         metadata = {
             "file_name": file_name,
             "file_path": str(image_path),
-            "has_analysis": bool(analysis.strip())
+            "has_analysis": bool(analysis.strip()),
+            "duplicate_of": image_result["duplicate_of"],
+            "skipped": image_result["skipped"],
+            "cropped": image_result["cropped"],
+            "grayscale": image_result["grayscale"]
         }
 
         metadata_file = image_output_dir / "metadata.json"
@@ -71,23 +224,103 @@ class ImageAnalyzer:
             "metadata": metadata
         }
 
-    def analyze_image(self, image_path: Path) -> str:
-        """Analyze an image using GPT-4 Vision
+    def prepare_image(self, image_path: Path) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Dict]]:
+        """Check, hash and encode an image file for analysis in the CPU pool (see prepare_image_file)"""
+        return run_cpu(prepare_image_file, Path(image_path), self.drop_blank, self.hash_index is not None)
+
+    def analyze_image_file(self, image_path: Path) -> Dict[str, Any]:
+        """Preprocess and analyze an image file
+
+        Blank images are skipped, and images with a near-duplicate already
+        analyzed in this run reuse its analysis.
 
         Args:
             image_path: Path to the image file
 
+        Returns:
+            Dict with analysis, duplicate_of (label of the reused near-duplicate or None),
+            skipped, cropped (crop box or None) and grayscale
+        """
+        result, encoded, hashes = self.prepare_image(image_path)
+        if encoded is None:
+            return result
+
+        index = self.hash_index
+        if index is None:
+            result["analysis"] = self.analyze_image(encoded)
+            return result
+
+        future, source = index.lookup_or_reserve(hashes, (image_path.name, None))
+        if source is not None:
+            label = source[0] if source[1] is None else f"{source[0]} page {source[1]}"
+            print(f"Reusing analysis of near-duplicate {label} for {image_path.name}")
+            result["analysis"], result["duplicate_of"] = future.result(), label
+            return result
+
+        try:
+            analysis = self.analyze_image(encoded)
+        except Exception as e:
+            index.discard(future)
+            future.set_exception(e)
+            raise
+        if analysis.startswith("Error analyzing image"):
+            index.discard(future)
+        future.set_result(analysis)
+        result["analysis"] = analysis
+        return result
+
+    def analyze_images(self, images: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Analyze, extract and summarize consecutive images in one multi-image GPT-4 Vision request
+
+        Images the batched response leaves out, or a whole batch whose request
+        fails, are analyzed one by one instead.
+
+        Args:
+            images: Encoded images (see encode_image), in lecture order
+
+        Returns:
+            Dict with analysis, important_content and summary per image, in order
+        """
+        prompt = (
+            f"The following {len(images)} images are consecutive lecture slides, labelled Image 1 to "
+            f"Image {len(images)}. For each image separately, return:\n\n"
+            f"analysis: {ANALYSIS_INSTRUCTIONS}\n\n"
+            f"important_content: {IMPORTANT_CONTENT_INSTRUCTIONS}\n\n"
+            f"summary: {SUMMARY_INSTRUCTIONS}\n\n"
+            "Return one entry per image with its index."
+        )
+        try:
+            results = request_image_batch(self.vision_client, self.vision_model, prompt, images,
+                                          ("analysis", "important_content", "summary"),
+                                          max_tokens=1500 * len(images))
+        except Exception as e:
+            print(f"Batched analysis of {len(images)} images failed, analyzing them one by one: {str(e)}")
+            results = [None] * len(images)
+
+        for position, result in enumerate(results):
+            if result is None:
+                analysis = self.analyze_image(images[position])
+                important_content, summary = self.analyze_content(analysis)
+                results[position] = {"analysis": analysis, "important_content": important_content,
+                                     "summary": summary}
+        return results
+
+    def analyze_image(self, image: Union[Path, Image.Image, Dict[str, Any]]) -> str:
+        """Analyze an image using GPT-4 Vision
+
+        Args:
+            image: Image file, PIL image or an already encoded image (see encode_image)
+
         Returns:
             Analysis text
         """
         try:
-            # Read image and encode as base64
-            with open(image_path, "rb") as image_file:
-                image_data = image_file.read()
-                base64_image = base64.b64encode(image_data).decode('utf-8')
+            # Downscale and encode in memory unless the image was already encoded
+            encoded = image if isinstance(image, dict) else encode_image(image)
 
             # Call Vision API
-            response = self.client.chat.completions.create(
+            response = chat_completion(
+                self.vision_client,
                 model=self.vision_model,
                 messages=[
                     {
@@ -95,14 +328,9 @@ class ImageAnalyzer:
                         "content": [
                             {
                                 "type": "text",
-                                "text": "Analyze this lecture slide or image. Identify and explain key concepts, formulas, diagrams, and their significance. If there are any important points that would be relevant for exams or assignments, highlight them."
+                                "text": f"Analyze this lecture slide or image. {ANALYSIS_INSTRUCTIONS}"
                             },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{base64_image}"
-                                }
-                            }
+                            image_content(encoded)
                         ]
                     }
                 ],
@@ -113,6 +341,39 @@ class ImageAnalyzer:
         except Exception as e:
             return f"Error analyzing image: {str(e)}"
 
+    def analyze_content(self, analysis: str) -> Tuple[str, str]:
+        """Extract important content and summarize image analysis
+
+        In combined mode both sections come from one structured request;
+        otherwise two separate completions are made.
+
+        Args:
+            analysis: Image analysis text
+
+        Returns:
+            Tuple of (important content, summary)
+        """
+        if not self.combined:
+            return self.extract_important_content(analysis), self.summarize_content(analysis)
+
+        prompt = f"""
+        The following is an analysis of a lecture slide or image.
+        Please return two sections as JSON.
+
+        important_content: {IMPORTANT_CONTENT_INSTRUCTIONS}
+
+        summary: {SUMMARY_INSTRUCTIONS}
+
+        Analysis:
+        {analysis}
+        """
+
+        return request_analysis(
+            self.client, self.summary_model,
+            "You are an expert academic assistant that helps students identify the most important information from lecture materials and understand them through clear, concise summaries.",
+            prompt
+        )
+
     def extract_important_content(self, analysis: str) -> str:
         """Extract important content from image analysis
 
@@ -124,19 +385,15 @@ class ImageAnalyzer:
         """
         prompt = f"""
         The following is an analysis of a lecture slide or image.
-        Please identify and extract the most important content, focusing on:
-
-        1. Key concepts and definitions
-        2. Important formulas and equations
-        3. Critical information for exams or assignments
-        4. Significant diagrams or visual elements and their meaning
+        Please identify and extract {IMPORTANT_CONTENT_INSTRUCTIONS}
 
         Analysis:
         {analysis}
         """
 
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.summary_model,
             messages=[
                 {"role": "system",
@@ -158,14 +415,15 @@ class ImageAnalyzer:
         """
         prompt = f"""
         The following is an analysis of a lecture slide or image.
-        Please provide a concise summary that captures the main points and significance of this content.
+        Please provide {SUMMARY_INSTRUCTIONS}
 
         Analysis:
         {analysis}
         """
 
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.summary_model,
             messages=[
                 {"role": "system",
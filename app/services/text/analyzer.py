@@ -1,53 +1,149 @@
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
-from app.config import OPENAI_API_KEY, SUMMARY_MODEL
+from app.config import COMBINED_ANALYSIS, OPENAI_API_KEY, SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_WORKERS, SUMMARY_MODEL
+from app.services.text.chunking import chunk_segments, chunk_text, group_texts, parse_srt
 from app.services.text.prompts import TextPrompts
+from app.utils.clients import get_client
+from app.utils.openai_api import chat_completion
+from app.utils.structured import request_analysis
+from app.utils.tokens import estimate_tokens
+
+IMPORTANT_CONTENT_SYSTEM_PROMPT = "You are an assistant that helps students analyze lecture content. Your role is to accurately extract important information from lecture transcripts."
+SUMMARY_SYSTEM_PROMPT = "You are an expert at clearly and concisely summarizing academic content. You maintain the core of the lecture content while excluding unnecessary details."
+ANALYSIS_SYSTEM_PROMPT = "You are an assistant that helps students analyze lecture content. You accurately extract important information from lecture transcripts and summarize them clearly and concisely."
 
 
 class TextAnalyzer:
     """Text analysis class (extract important content, summarize)"""
 
-    def __init__(self, model=SUMMARY_MODEL, api_key=OPENAI_API_KEY):
+    def __init__(self, model=SUMMARY_MODEL, api_key=OPENAI_API_KEY,
+                 chunk_tokens=SUMMARY_CHUNK_TOKENS, max_workers=SUMMARY_MAX_WORKERS,
+                 combined=COMBINED_ANALYSIS):
         self.model = model
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("summary", api_key)
         self.prompts = TextPrompts()
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.combined = combined
 
-    def extract_important_content(self, text):
-        """Extract important content"""
-        print("Starting to extract important content...")
+    def analyze(self, text, srt=None):
+        """Extract important content and summarize
 
-        prompt = self.prompts.get_important_content_prompt(text)
+        In combined mode both sections come from one structured request per
+        prompt instead of two separate completions over the same input.
 
-        # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system",
-                 "content": "You are an assistant that helps students analyze lecture content. Your role is to accurately extract important information from lecture transcripts."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        Returns:
+            tuple: (important_content, summary)
+        """
+        if not self.combined:
+            return self.extract_important_content(text, srt), self.summarize_text(text, srt)
+
+        print("Starting to analyze transcript...")
+
+        if estimate_tokens(text) <= self.chunk_tokens:
+            important_content, summary = self._complete_analysis(self.prompts.get_analysis_prompt(text))
+        else:
+            result = self._map_reduce(
+                text, srt,
+                lambda prompt: dict(zip(("important_content", "summary"), self._complete_analysis(prompt))),
+                self.prompts.get_chunk_analysis_prompt,
+                self.prompts.get_merge_analysis_prompt,
+                measure=lambda part: estimate_tokens(part["important_content"] + part["summary"])
+            )
+            important_content, summary = result["important_content"], result["summary"]
+
+        print("Transcript analysis completed")
+        return important_content, summary
+
+    def extract_important_content(self, text, srt=None):
+        """Extract important content
+
+        Transcripts longer than the chunk budget are processed map-reduce style,
+        split on SRT segment boundaries when an SRT transcript is given.
+        """
+        print("Starting to extract important content...")
+
+        if estimate_tokens(text) <= self.chunk_tokens:
+            prompt = self.prompts.get_important_content_prompt(text)
+            important_content = self._complete(IMPORTANT_CONTENT_SYSTEM_PROMPT, prompt)
+        else:
+            important_content = self._map_reduce(
+                text, srt,
+                lambda prompt: self._complete(IMPORTANT_CONTENT_SYSTEM_PROMPT, prompt),
+                self.prompts.get_chunk_important_content_prompt,
+                self.prompts.get_merge_important_content_prompt
+            )
 
-        important_content = response.choices[0].message.content.strip()
         print("Important content extraction completed")
         return important_content
 
-    def summarize_text(self, text):
-        """Summarize text"""
+    def summarize_text(self, text, srt=None):
+        """Summarize text
+
+        Transcripts longer than the chunk budget are processed map-reduce style,
+        split on SRT segment boundaries when an SRT transcript is given.
+        """
         print("Starting to summarize transcript...")
 
-        prompt = self.prompts.get_summary_prompt(text)
+        if estimate_tokens(text) <= self.chunk_tokens:
+            prompt = self.prompts.get_summary_prompt(text)
+            summary = self._complete(SUMMARY_SYSTEM_PROMPT, prompt)
+        else:
+            summary = self._map_reduce(
+                text, srt,
+                lambda prompt: self._complete(SUMMARY_SYSTEM_PROMPT, prompt),
+                self.prompts.get_chunk_summary_prompt,
+                self.prompts.get_merge_summary_prompt
+            )
+
+        print("Transcript summarization completed")
+        return summary
+
+    def _map_reduce(self, text, srt, complete, chunk_prompt, merge_prompt, measure=estimate_tokens):
+        """Process chunks concurrently, then merge the partial results as a tree
+
+        Merging recurses level by level until the partial results fit into a
+        single prompt, so latency grows with the depth of the tree rather than
+        the length of the transcript.
+        """
+        segments = parse_srt(srt) if srt else []
+        chunks = chunk_segments(segments, self.chunk_tokens) if segments else chunk_text(text, self.chunk_tokens)
+        print(f"Long transcript split into {len(chunks)} chunks")
 
+        partials = self._run_concurrently(
+            complete,
+            [chunk_prompt(chunk, i, len(chunks)) for i, chunk in enumerate(chunks, start=1)]
+        )
+
+        level = 1
+        while len(partials) > 1 and sum(measure(partial) for partial in partials) > self.chunk_tokens:
+            groups = group_texts(partials, self.chunk_tokens, measure)
+            print(f"Merging {len(partials)} partial results into {len(groups)} (level {level})")
+            partials = self._run_concurrently(complete, [merge_prompt(group) for group in groups])
+            level += 1
+
+        if len(partials) == 1:
+            return partials[0]
+        return complete(merge_prompt(partials))
+
+    def _run_concurrently(self, complete, prompts):
+        """Run completions concurrently and return the results in order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(complete, prompts))
+
+    def _complete(self, system_prompt, prompt):
+        """Run one chat completion and return the stripped text"""
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.model,
             messages=[
-                {"role": "system",
-                 "content": "You are an expert at clearly and concisely summarizing academic content. You maintain the core of the lecture content while excluding unnecessary details."},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ]
         )
+        return response.choices[0].message.content.strip()
 
-        summary = response.choices[0].message.content.strip()
-        print("Transcript summarization completed")
-        return summary
+    def _complete_analysis(self, prompt):
+        """Run one structured completion returning (important_content, summary)"""
+        return request_analysis(self.client, self.model, ANALYSIS_SYSTEM_PROMPT, prompt)
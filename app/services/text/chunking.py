@@ -0,0 +1,113 @@
+import re
+
+from app.services.audio.formats import format_timestamp
+from app.utils.tokens import estimate_tokens
+
+SRT_BLOCK_PATTERN = re.compile(
+    r"\d+\s*\n(\d{2}:\d{2}:\d{2}[,.]\d{3}) --> (\d{2}:\d{2}:\d{2}[,.]\d{3})\s*\n(.*?)(?:\n\s*\n|\Z)",
+    re.DOTALL
+)
+
+
+def _parse_timestamp(timestamp):
+    """Convert an SRT timestamp to seconds"""
+    hours, minutes, seconds = timestamp.replace(",", ".").split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_srt(srt):
+    """Parse SRT subtitles into segments
+
+    Args:
+        srt (str): SRT format transcript
+
+    Returns:
+        list[dict]: Segments with "start", "end" and "text"
+    """
+    return [
+        {"start": _parse_timestamp(start), "end": _parse_timestamp(end), "text": " ".join(text.split())}
+        for start, end, text in SRT_BLOCK_PATTERN.findall(srt.strip() + "\n\n")
+    ]
+
+
+def _pack(segments, max_tokens):
+    """Greedily pack segments into lists that fit the token budget"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment["text"])
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_segments(segments, max_tokens):
+    """Pack transcript segments into chunks on segment boundaries
+
+    Each chunk is prefixed with its time range so partial results keep their
+    place in the lecture.
+
+    Args:
+        segments (list[dict]): Segments with "start", "end" and "text"
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        list[str]: Chunk texts
+    """
+    return [
+        f"[{format_timestamp(chunk[0]['start'])[:8]} - {format_timestamp(chunk[-1]['end'])[:8]}]\n"
+        + " ".join(segment["text"] for segment in chunk)
+        for chunk in _pack(segments, max_tokens)
+    ]
+
+
+def chunk_text(text, max_tokens):
+    """Pack plain text into chunks on paragraph and sentence boundaries
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Token budget per chunk
+
+    Returns:
+        list[str]: Chunk texts
+    """
+    pieces = re.split(r"(?<=[.!?])\s+|\n\s*\n", text)
+    segments = [{"text": piece.strip()} for piece in pieces if piece.strip()]
+    return [" ".join(segment["text"] for segment in chunk) for chunk in _pack(segments, max_tokens)]
+
+
+def group_texts(texts, max_tokens, measure=estimate_tokens):
+    """Group partial results for the next reduce level
+
+    Every group holds at least two texts so each level shrinks the tree.
+
+    Args:
+        texts (list): Partial results in order
+        max_tokens (int): Token budget per group
+        measure (callable): Token count of one partial result
+
+    Returns:
+        list[list]: Groups of partial results
+    """
+    groups = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = measure(text)
+        if len(current) >= 2 and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
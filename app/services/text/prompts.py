@@ -1,3 +1,7 @@
+# Bump when prompts change so the build manifest reprocesses affected inputs
+PROMPT_VERSION = "1"
+
+
 class TextPrompts:
     """Class for managing text analysis prompts"""
 
@@ -34,3 +38,133 @@ class TextPrompts:
         강의 대본:
         {text}
         """
+
+    def get_chunk_important_content_prompt(self, text, index, total):
+        """Prompt for extracting important content from one part of a long transcript"""
+        return f"""
+        다음은 긴 강의 대본의 일부입니다 ({index}/{total} 부분). 이 부분에서 다음과 같은 중요한 내용을 빠짐없이 추출해주세요:
+
+        1. 시험 관련 정보 (시험 날짜, 범위, 형식, 주의사항 등)
+        2. 과제 관련 정보 (제출 기한, 형식, 주제, 요구사항 등)
+        3. 중요한 공지사항이나 특이사항
+        4. 교수가 특별히 강조한 개념이나 내용
+        5. 수업 참여나 출석에 관한 중요 정보
+
+        해당 내용이 없는 항목은 생략하고, 원문의 표현과 시간 정보를 가능한 유지해주세요.
+
+        강의 대본 ({index}/{total}):
+        {text}
+        """
+
+    def get_chunk_summary_prompt(self, text, index, total):
+        """Prompt for summarizing one part of a long transcript"""
+        return f"""
+        다음은 긴 강의 대본의 일부입니다 ({index}/{total} 부분). 이 부분의 주요 내용을 요약해주세요.
+        핵심 개념, 이론, 사례를 빠뜨리지 말고, 중요한 용어나 개념은 그대로 유지해주세요.
+
+        강의 대본 ({index}/{total}):
+        {text}
+        """
+
+    def get_merge_important_content_prompt(self, parts):
+        """Prompt for merging important content extracted from parts of a transcript"""
+        joined = "\n\n".join(f"[부분 {i}]\n{part}" for i, part in enumerate(parts, start=1))
+        return f"""
+        다음은 하나의 강의 대본을 여러 부분으로 나누어 추출한 중요 내용입니다.
+        이를 하나로 통합하여 다음 항목별로 정리해주세요:
+
+        1. 시험 관련 정보 (시험 날짜, 범위, 형식, 주의사항 등)
+        2. 과제 관련 정보 (제출 기한, 형식, 주제, 요구사항 등)
+        3. 중요한 공지사항이나 특이사항
+        4. 교수가 특별히 강조한 개념이나 내용
+        5. 수업 참여나 출석에 관한 중요 정보
+
+        중복된 내용은 합치고, 해당 내용이 없으면 '해당 정보 없음'이라고 표시해주세요.
+        원문의 표현과 시간 정보, 구체적인 지시사항은 반드시 유지해주세요.
+
+        부분별 중요 내용:
+        {joined}
+        """
+
+    def get_merge_summary_prompt(self, parts):
+        """Prompt for merging summaries of parts of a transcript"""
+        joined = "\n\n".join(f"[부분 {i}]\n{part}" for i, part in enumerate(parts, start=1))
+        return f"""
+        다음은 하나의 강의 대본을 여러 부분으로 나누어 작성한 요약입니다.
+        강의 흐름을 유지하면서 하나의 요약으로 통합해주세요.
+        요약은 다음 형식을 따라주세요:
+
+        1. 강의 주제 및 목표
+        2. 주요 논의 내용 (핵심 개념, 이론, 사례 등)
+        3. 결론 및 핵심 메시지
+
+        중요한 용어나 개념은 그대로 유지해주세요.
+
+        부분별 요약:
+        {joined}
+        """
+
+    def get_analysis_prompt(self, text):
+        """Prompt for extracting important content and summarizing in one request"""
+        return f"""
+        다음은 강의 대본입니다. 이 대본을 분석하여 두 가지 결과를 JSON으로 작성해주세요.
+
+        important_content: 다음과 같은 중요한 내용을 추출해주세요.
+        1. 시험 관련 정보 (시험 날짜, 범위, 형식, 주의사항 등)
+        2. 과제 관련 정보 (제출 기한, 형식, 주제, 요구사항 등)
+        3. 중요한 공지사항이나 특이사항
+        4. 교수가 특별히 강조한 개념이나 내용
+        5. 수업 참여나 출석에 관한 중요 정보
+        각 항목별로 정리하고, 해당 내용이 없으면 '해당 정보 없음'이라고 표시해주세요.
+        정보를 추출할 때 가능한 원문의 표현을 유지하고, 시간 정보나 구체적인 지시사항이 있다면 반드시 포함해주세요.
+
+        summary: 대본의 주요 내용을 다음 형식으로 간결하게 요약해주세요.
+        1. 강의 주제 및 목표
+        2. 주요 논의 내용 (핵심 개념, 이론, 사례 등)
+        3. 결론 및 핵심 메시지
+        요약은 원래 내용의 10~15% 정도 분량으로 작성하고, 중요한 용어나 개념은 그대로 유지해주세요.
+
+        강의 대본:
+        {text}
+        """
+
+    def get_chunk_analysis_prompt(self, text, index, total):
+        """Prompt for analyzing one part of a long transcript in one request"""
+        return f"""
+        다음은 긴 강의 대본의 일부입니다 ({index}/{total} 부분). 이 부분을 분석하여 두 가지 결과를 JSON으로 작성해주세요.
+
+        important_content: 시험, 과제, 공지사항, 교수가 강조한 개념, 출석 관련 정보를 빠짐없이 추출해주세요.
+        해당 내용이 없는 항목은 생략하고, 원문의 표현과 시간 정보를 가능한 유지해주세요.
+
+        summary: 이 부분의 주요 내용을 요약해주세요. 핵심 개념, 이론, 사례를 빠뜨리지 말고,
+        중요한 용어나 개념은 그대로 유지해주세요.
+
+        강의 대본 ({index}/{total}):
+        {text}
+        """
+
+    def get_merge_analysis_prompt(self, parts):
+        """Prompt for merging analyses of parts of a transcript in one request"""
+        joined = "\n\n".join(
+            f"[부분 {i}]\n중요 내용:\n{part['important_content']}\n\n요약:\n{part['summary']}"
+            for i, part in enumerate(parts, start=1)
+        )
+        return f"""
+        다음은 하나의 강의 대본을 여러 부분으로 나누어 분석한 결과입니다. 이를 통합하여 두 가지 결과를 JSON으로 작성해주세요.
+
+        important_content: 부분별 중요 내용을 다음 항목별로 통합해주세요.
+        1. 시험 관련 정보 (시험 날짜, 범위, 형식, 주의사항 등)
+        2. 과제 관련 정보 (제출 기한, 형식, 주제, 요구사항 등)
+        3. 중요한 공지사항이나 특이사항
+        4. 교수가 특별히 강조한 개념이나 내용
+        5. 수업 참여나 출석에 관한 중요 정보
+        중복된 내용은 합치고, 해당 내용이 없으면 '해당 정보 없음'이라고 표시해주세요.
+
+        summary: 강의 흐름을 유지하면서 부분별 요약을 다음 형식의 하나의 요약으로 통합해주세요.
+        1. 강의 주제 및 목표
+        2. 주요 논의 내용 (핵심 개념, 이론, 사례 등)
+        3. 결론 및 핵심 메시지
+
+        부분별 분석 결과:
+        {joined}
+        """
@@ -0,0 +1,66 @@
+"""
+Process-wide OpenAI client registry.
+All services share one pooled HTTP client so keep-alive connections and TLS
+sessions are reused across stages and worker threads. Each stage
+(transcription, summary, vision) can point at its own base URL.
+"""
+
+import importlib.util
+import threading
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from app.config import (
+    HTTP2_ENABLED, HTTP_CONNECT_TIMEOUT, HTTP_KEEPALIVE_EXPIRY, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE,
+    HTTP_READ_TIMEOUT, OPENAI_API_KEY, OPENAI_BASE_URL, SUMMARY_BASE_URL, TRANSCRIBE_BASE_URL, VISION_BASE_URL
+)
+
+STAGE_BASE_URLS = {
+    "transcription": TRANSCRIBE_BASE_URL,
+    "summary": SUMMARY_BASE_URL,
+    "vision": VISION_BASE_URL,
+}
+
+_clients = {}
+_http_client = None
+_lock = threading.Lock()
+
+
+def _create_http_client():
+    """Create the shared connection pool"""
+    http2 = HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+    if HTTP2_ENABLED and not http2:
+        print("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+    return DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+
+
+def get_client(stage, api_key=OPENAI_API_KEY):
+    """Get the shared OpenAI client of a pipeline stage
+
+    Args:
+        stage: "transcription", "summary" or "vision"
+        api_key: OpenAI API key
+
+    Returns:
+        OpenAI: One client per stage base URL and API key
+    """
+    global _http_client
+
+    base_url = STAGE_BASE_URLS.get(stage) or OPENAI_BASE_URL
+    key = (base_url, api_key)
+    with _lock:
+        if key not in _clients:
+            if _http_client is None:
+                _http_client = _create_http_client()
+            # Retries are handled by the request scheduler (app.utils.rate_limiter)
+            _clients[key] = OpenAI(api_key=api_key, base_url=base_url, http_client=_http_client, max_retries=0)
+        return _clients[key]
@@ -0,0 +1,114 @@
+"""
+Process pool for CPU-bound stages.
+Page rendering, PNG saving, image encoding and hashing, and audio decoding
+run in one shared pool of worker processes sized from the core count, so
+the threads that issue API requests never queue for the GIL behind image
+or audio work. Workers take file paths and keep the bitmaps they decode
+or render, so only compact results (encoded images, hashes) are pickled
+back. The pool is started once, at startup, before any request threads.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from app.config import CPU_POOL_WORKERS
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats = {"tasks": 0, "worker_seconds": 0.0}
+
+
+def cpu_workers() -> int:
+    """Number of worker processes: CPU_POOL_WORKERS, or one per CPU"""
+    return CPU_POOL_WORKERS if CPU_POOL_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def in_worker() -> bool:
+    """Whether this is a worker process, where work runs inline instead of in a nested pool"""
+    return multiprocessing.parent_process() is not None
+
+
+def _start_method() -> str:
+    """forkserver where available, else spawn
+
+    Workers are never forked from this process: it runs HTTP pools, the
+    response cache and rate-limiter threads, and a fork could copy one of
+    their locks in a held state into the child.
+    """
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    """Get the process pool shared by every CPU-bound stage in this process
+
+    The pool always has cpu_workers() processes; callers that cap their own
+    parallelism (see rasterizer.render_workers) size against the same count.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=cpu_workers(),
+                                        mp_context=multiprocessing.get_context(_start_method()))
+        return _pool
+
+
+def start_cpu_pool() -> ProcessPoolExecutor:
+    """Create the pool and start all of its workers; called once from main()"""
+    pool = get_cpu_pool()
+    for future in [pool.submit(os.getpid) for _ in range(cpu_workers())]:
+        future.result()
+    return pool
+
+
+def _timed(func: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any]:
+    """Run a task in a worker and measure it"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def submit_cpu(func: Callable, *args, **kwargs) -> Future:
+    """Run func(*args, **kwargs) in the CPU pool
+
+    func must be a module-level function, and arguments and result picklable.
+
+    Returns:
+        Future with the result
+    """
+    future = Future()
+    if in_worker():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def done(task: Future):
+        try:
+            seconds, result = task.result()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        with _pool_lock:
+            _stats["tasks"] += 1
+            _stats["worker_seconds"] += seconds
+        future.set_result(result)
+
+    get_cpu_pool().submit(_timed, func, args, kwargs).add_done_callback(done)
+    return future
+
+
+def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """Run func(*args, **kwargs) in the CPU pool and wait for the result (see submit_cpu)"""
+    return submit_cpu(func, *args, **kwargs).result()
+
+
+def cpu_stats() -> Dict[str, Any]:
+    """Tasks run in the pool and the seconds they spent in worker processes"""
+    with _pool_lock:
+        return {"workers": cpu_workers(), **_stats}
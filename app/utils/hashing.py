@@ -0,0 +1,38 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    """Compute the SHA-256 hash of a file's content
+
+    Args:
+        file_path (Path): File to hash
+        chunk_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(Path(file_path), "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(*parts):
+    """Compute a SHA-256 hash over strings or JSON-serializable values
+
+    Args:
+        *parts: Values to hash, in order
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, ensure_ascii=False, default=str)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,240 @@
+"""
+In-memory image encoding for vision requests.
+Uniform borders are trimmed and colourless images converted to grayscale,
+then images are downscaled to the resolution the vision model actually uses
+(512 px tiles after fitting into 2048 px and a 768 px shortest side),
+encoded as JPEG or WebP and base64'd without touching disk.
+Consecutive encoded images are packed into multi-image requests within an
+image and token budget.
+"""
+
+import base64
+import io
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from app.config import (
+    VISION_BATCH_MAX_IMAGES, VISION_BATCH_MAX_TOKENS, VISION_GRAYSCALE, VISION_IMAGE_DETAIL, VISION_IMAGE_FORMAT,
+    VISION_IMAGE_MAX_SIDE, VISION_IMAGE_QUALITY, VISION_IMAGE_SHORT_SIDE, VISION_TRIM_BORDERS
+)
+
+TILE_SIZE = 512
+# Shrink a side back to a tile boundary when it spills over by at most this fraction of a tile
+TILE_SNAP = 0.15
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+# Pixels further than this from the dominant grey level count as ink
+INK_THRESHOLD = 32
+THUMBNAIL_SIZE = 512
+# Rows and columns whose grey levels vary less than this are uniform border
+BORDER_TOLERANCE = 6.0
+BORDER_PADDING = 8
+# Only crop when it removes at least this fraction of the area
+MIN_CROP_FRACTION = 0.02
+# Pixels with a channel spread above this are coloured; an image is grayscale below the fraction
+CHROMA_THRESHOLD = 24
+COLOUR_FRACTION = 0.001
+
+
+def ink_ratio(image: Image.Image) -> float:
+    """Fraction of pixels that differ from the dominant grey level, on a thumbnail"""
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    gray = np.asarray(thumbnail, dtype=np.int16)
+    background = np.bincount(gray.ravel(), minlength=256).argmax()
+    return float((np.abs(gray - background) > INK_THRESHOLD).mean())
+
+
+def _content_span(gray: np.ndarray, axis: int) -> Optional[Tuple[int, int]]:
+    """First and last non-uniform line along an axis (0 = columns, 1 = rows)"""
+    lines = np.flatnonzero(gray.std(axis=axis) > BORDER_TOLERANCE)
+    if lines.size == 0:
+        return None
+    return int(lines[0]), int(lines[-1]) + 1
+
+
+def trim_borders(image: Image.Image) -> Tuple[Image.Image, Optional[Tuple[int, int, int, int]]]:
+    """Crop uniform margins and scanner borders
+
+    Columns are trimmed before rows and then again, since a dark scanner
+    border along one side makes every row it crosses non-uniform.
+
+    Returns:
+        Tuple of (image, crop box (left, top, right, bottom) or None when nothing was cropped)
+    """
+    gray = np.asarray(image.convert("L"), dtype=np.float32)
+    height, width = gray.shape
+    left, top, right, bottom = 0, 0, width, height
+
+    for axis in (0, 1, 0):
+        span = _content_span(gray[top:bottom, left:right], axis)
+        if span is None:
+            return image, None
+        if axis == 0:
+            left, right = left + span[0], left + span[1]
+        else:
+            top, bottom = top + span[0], top + span[1]
+
+    box = (max(left - BORDER_PADDING, 0), max(top - BORDER_PADDING, 0),
+           min(right + BORDER_PADDING, width), min(bottom + BORDER_PADDING, height))
+    if (box[2] - box[0]) * (box[3] - box[1]) > (1 - MIN_CROP_FRACTION) * width * height:
+        return image, None
+    return image.crop(box), box
+
+
+def is_grayscale(image: Image.Image) -> bool:
+    """Whether an image has no meaningful colour"""
+    if image.mode in ("1", "L", "LA", "I", "F"):
+        return True
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    rgb = np.asarray(thumbnail, dtype=np.int16)
+    chroma = rgb.max(axis=2) - rgb.min(axis=2)
+    return float((chroma > CHROMA_THRESHOLD).mean()) < COLOUR_FRACTION
+
+
+def vision_size(width: int, height: int, max_side: int = VISION_IMAGE_MAX_SIDE,
+                short_side: int = VISION_IMAGE_SHORT_SIDE) -> tuple:
+    """Size an image is scaled to before it is sent (never upscales)
+
+    Fits the image into max_side, limits the shortest side to short_side,
+    then snaps sides that barely spill into another tile back to the boundary.
+    """
+    scale = min(1.0, max_side / max(width, height))
+    scale = min(scale, short_side / min(width, height))
+    width, height = width * scale, height * scale
+
+    snap = 1.0
+    for side in (width, height):
+        spill = side % TILE_SIZE
+        if side > TILE_SIZE and 0 < spill <= TILE_SIZE * TILE_SNAP:
+            snap = min(snap, (side - spill) / side)
+    return max(1, int(width * snap)), max(1, int(height * snap))
+
+
+def estimate_image_tokens(width: int, height: int, detail: str = VISION_IMAGE_DETAIL) -> int:
+    """Estimate the prompt tokens of an image of the given (sent) size"""
+    if detail == "low":
+        return BASE_TOKENS
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE)
+
+
+def encode_image(image: Union[Image.Image, str, Path], fmt: str = VISION_IMAGE_FORMAT,
+                 quality: int = VISION_IMAGE_QUALITY, trim: bool = VISION_TRIM_BORDERS,
+                 grayscale: bool = VISION_GRAYSCALE) -> Dict[str, Any]:
+    """Trim, downscale and encode an image for a vision request
+
+    Args:
+        image: PIL image or path to an image file
+        fmt: "jpeg", "webp" or "png"
+        quality: Lossy encoding quality
+        trim: Crop uniform borders
+        grayscale: Convert to grayscale when the image has no meaningful colour
+
+    Returns:
+        Dict with url (base64 data URL), bytes (encoded size), tokens (estimate), size,
+        cropped (crop box or None) and grayscale
+    """
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return encode_image(opened, fmt, quality, trim, grayscale)
+
+    cropped = None
+    if trim:
+        image, cropped = trim_borders(image)
+    converted = grayscale and image.mode != "L" and is_grayscale(image)
+    if converted:
+        image = image.convert("L")
+
+    size = vision_size(*image.size)
+    if size != image.size:
+        image = image.resize(size, Image.LANCZOS)
+
+    if fmt != "png" and image.mode not in ("RGB", "L"):
+        # Flatten transparency onto white for formats without an alpha channel
+        rgba = image.convert("RGBA")
+        flattened = Image.new("RGB", rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel("A"))
+        image = flattened
+
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, "PNG", optimize=True)
+    else:
+        image.save(buffer, fmt.upper(), quality=quality)
+    data = buffer.getvalue()
+
+    return {
+        "url": f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(data).decode('utf-8')}",
+        "bytes": len(data),
+        "tokens": estimate_image_tokens(*size),
+        "size": size,
+        "cropped": cropped,
+        "grayscale": converted
+    }
+
+
+def encoding_settings() -> Dict[str, Any]:
+    """Settings that change what the vision model sees (for build fingerprints)"""
+    return {
+        "format": VISION_IMAGE_FORMAT,
+        "quality": VISION_IMAGE_QUALITY,
+        "max_side": VISION_IMAGE_MAX_SIDE,
+        "short_side": VISION_IMAGE_SHORT_SIDE,
+        "detail": VISION_IMAGE_DETAIL,
+        "trim": VISION_TRIM_BORDERS,
+        "grayscale": VISION_GRAYSCALE,
+        "batch_images": VISION_BATCH_MAX_IMAGES,
+        "batch_tokens": VISION_BATCH_MAX_TOKENS
+    }
+
+
+def image_content(encoded: Dict[str, Any], detail: str = VISION_IMAGE_DETAIL) -> Dict[str, Any]:
+    """Build the image_url message part of an encoded image"""
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": encoded["url"],
+            "detail": detail
+        }
+    }
+
+
+def batch_fits(batch: List[Dict[str, Any]], encoded: Dict[str, Any], max_images: int = VISION_BATCH_MAX_IMAGES,
+               max_tokens: int = VISION_BATCH_MAX_TOKENS) -> bool:
+    """Whether an encoded image can join a batch without exceeding its image or token budget
+
+    A single image always fits, however many tokens it costs.
+    """
+    if not batch:
+        return True
+    return len(batch) < max_images and sum(item["tokens"] for item in batch) + encoded["tokens"] <= max_tokens
+
+
+def plan_batches(images: List[Dict[str, Any]], max_images: int = VISION_BATCH_MAX_IMAGES,
+                 max_tokens: int = VISION_BATCH_MAX_TOKENS) -> List[List[int]]:
+    """Split consecutive encoded images into vision batches
+
+    Cheap (low detail or small) images are packed more densely than
+    full-page slides, since batches are bounded by image tokens as well.
+
+    Returns:
+        Lists of indices into images, in order
+    """
+    batches = []
+    batch = []
+    for position, encoded in enumerate(images):
+        if not batch_fits([images[i] for i in batch], encoded, max_images, max_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(position)
+    if batch:
+        batches.append(batch)
+    return batches
@@ -1,22 +1,40 @@
 import re
 from pathlib import Path
-from typing import Dict, Any
-
-from openai import OpenAI
+from typing import Dict, Any, List, Optional
 
 from app.config import OPENAI_API_KEY, SUMMARY_MODEL
+from app.utils.clients import get_client
+from app.utils.openai_api import chat_completion
+from app.utils.revisions import clear_revision, is_incremental, load_revision
+from app.utils.structured import request_section_edits
+
+# Bump when prompts change so the build manifest reprocesses affected inputs
+PROMPT_VERSION = "1"
+
+# Incremental updates send the whole document and all changes; beyond these sizes the document is rewritten
+UPDATE_MAX_DOCUMENT_CHARS = 60000
+UPDATE_MAX_CHANGE_CHARS = 20000
+# Completion budget of an incremental update, which returns only the edited sections
+UPDATE_MAX_TOKENS = 4000
+
+_HEADING = re.compile(r"^#{1,6}\s")
 
 
 class ContentIntegrator:
     """Class for integrating and consolidating content from multiple sources"""
 
     def __init__(self, api_key=OPENAI_API_KEY):
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("summary", api_key)
         self.summary_model = SUMMARY_MODEL
 
     def process_pdf_directory(self, directory_path: Path, output_dir: Path) -> Dict[str, Any]:
         """Process a PDF directory and consolidate important content
 
+        When the deck was revised since its markdown was written and only a few
+        pages changed (see revision.json), the sections of the existing
+        markdown affected by the changed and removed pages are updated in
+        place; otherwise, or when the update does not fit, it is rewritten.
+
         Args:
             directory_path: Path to the PDF directory (pdf-*)
             output_dir: Output directory for consolidated content
@@ -31,6 +49,22 @@ class ContentIntegrator:
             raise ValueError(f"Not a PDF directory: {directory_path}")
 
         file_name = directory_path.name[4:]  # Remove 'pdf-' prefix
+        markdown_file = output_dir / f"{file_name}.md"
+
+        revision = load_revision(directory_path)
+        if revision is not None and markdown_file.exists() and is_incremental(revision):
+            consolidated_important = self._read_consolidated(markdown_file, file_name)
+            if revision["changed"] or revision["removed"]:
+                consolidated_important = self.update_consolidated_content(consolidated_important, revision, file_name)
+            if consolidated_important is not None:
+                self._write_consolidated(markdown_file, file_name, consolidated_important)
+                clear_revision(directory_path)
+                return {
+                    "file_name": file_name,
+                    "markdown_file": markdown_file,
+                    "content": consolidated_important,
+                    "updated_pages": [page["page"] for page in revision["changed"]]
+                }
 
         # Collect important content from all pages
         important_file = directory_path / "important_content.txt"
@@ -55,10 +89,8 @@ class ContentIntegrator:
         consolidated_important = self.consolidate_important_content(combined_important, file_name)
 
         # Save as markdown
-        markdown_file = output_dir / f"{file_name}.md"
-        with open(markdown_file, "w", encoding="utf-8") as f:
-            f.write(f"# {file_name} - Important Content\n\n")
-            f.write(consolidated_important)
+        self._write_consolidated(markdown_file, file_name, consolidated_important)
+        clear_revision(directory_path)
 
         return {
             "file_name": file_name,
@@ -126,6 +158,128 @@ class ContentIntegrator:
             "content": consolidated_important
         }
 
+    @staticmethod
+    def _write_consolidated(markdown_file: Path, title: str, content: str):
+        """Save consolidated content as markdown"""
+        with open(markdown_file, "w", encoding="utf-8") as f:
+            f.write(f"# {title} - Important Content\n\n")
+            f.write(content)
+
+    @staticmethod
+    def _read_consolidated(markdown_file: Path, title: str) -> str:
+        """Read consolidated content back from its markdown, without the title line"""
+        with open(markdown_file, "r", encoding="utf-8") as f:
+            content = f.read()
+        header = f"# {title} - Important Content\n\n"
+        return content[len(header):] if content.startswith(header) else content
+
+    @staticmethod
+    def _format_revision_pages(pages: List[Dict[str, Any]], key: str) -> str:
+        """Format the text and analysis of revised pages for a prompt"""
+        parts = []
+        for page in pages:
+            parts.append(f"--- Page {page[key]} ---\n{page['text']}\n")
+            if page["analysis"]:
+                parts.append(f"Visual analysis:\n{page['analysis']}\n")
+            parts.append("\n")
+        return "".join(parts)
+
+    @staticmethod
+    def _split_sections(content: str) -> List[str]:
+        """Split markdown at its headings; text before the first heading is a section of its own"""
+        sections, lines, fenced = [], [], False
+        for line in content.splitlines(keepends=True):
+            if line.startswith("```"):
+                fenced = not fenced
+            if not fenced and _HEADING.match(line) and lines:
+                sections.append("".join(lines))
+                lines = []
+            lines.append(line)
+        if lines:
+            sections.append("".join(lines))
+        return sections
+
+    @staticmethod
+    def _apply_section_edits(sections: List[str], edits: List[Dict[str, Any]]) -> str:
+        """Splice section edits (see request_section_edits) into the document"""
+        replaced, inserted = {}, {}
+        for edit in edits:
+            section = edit["section"]
+            if not 0 <= section <= len(sections) or (section == 0 and edit["action"] != "insert_after"):
+                raise ValueError(f"Edit refers to unknown section {section}")
+            markdown = edit["markdown"].strip() + "\n\n"
+            if edit["action"] == "insert_after":
+                inserted.setdefault(section, []).append(markdown)
+            else:
+                replaced[section] = markdown if edit["action"] == "replace" else ""
+
+        parts = inserted.get(0, [])
+        for number, section in enumerate(sections, start=1):
+            text = replaced.get(number, section)
+            # Keep a blank line between a section and whatever follows it
+            parts.append(text if not text or text.endswith("\n\n") else text.rstrip("\n") + "\n\n")
+            parts.extend(inserted.get(number, []))
+        return "".join(parts).rstrip("\n") + "\n"
+
+    def update_consolidated_content(self, content: str, revision: Dict[str, Any], title: str) -> Optional[str]:
+        """Update the sections of consolidated content affected by a revised version of the lecture
+
+        The whole document is sent split into numbered sections, and the
+        model returns only the sections to replace, delete or insert, which
+        are spliced into the document; the rest is kept byte for byte.
+
+        Args:
+            content: Current consolidated content (markdown)
+            revision: Changed and removed pages (see build_revision)
+            title: Title or name of the content
+
+        Returns:
+            Updated consolidated content in markdown format, or None when the
+            document or the changes are too large, or the update failed, and
+            the document has to be rewritten instead
+        """
+        changed = self._format_revision_pages(revision["changed"], "page") or "(none)"
+        removed = self._format_revision_pages(revision["removed"], "previous_page") or "(none)"
+        if len(content) > UPDATE_MAX_DOCUMENT_CHARS or len(changed) + len(removed) > UPDATE_MAX_CHANGE_CHARS:
+            print(f"Revision of {title} is too large to update in place, rewriting the document")
+            return None
+
+        sections = self._split_sections(content)
+        document = "\n".join(f"[Section {number}]\n{section}" for number, section in enumerate(sections, start=1))
+
+        prompt = f"""
+        The following is a consolidated document of lecture material titled "{title}", split into numbered
+        sections, followed by the changes of a revised version of the lecture: pages that are new or changed,
+        and pages that were removed or replaced.
+        Return only the edits needed so that the document reflects the revised lecture:
+
+        1. "replace" a section with its complete new markdown (including its heading) where new or changed
+           content belongs, or where points only came from removed or replaced pages
+        2. "delete" sections that only covered removed or replaced pages
+        3. "insert_after" a section (0 for the start of the document) for new topics that fit no existing section
+        4. Leave every other section out; keep the document's structure and markdown formatting
+
+        Document:
+        {document}
+
+        New or changed pages:
+        {changed}
+
+        Removed or replaced pages:
+        {removed}
+        """
+
+        try:
+            edits = request_section_edits(
+                self.client, self.summary_model,
+                "You are an expert academic assistant that helps organize and structure lecture content in a clear, comprehensive manner using markdown formatting.",
+                prompt, UPDATE_MAX_TOKENS
+            )
+            return self._apply_section_edits(sections, edits)
+        except Exception as e:
+            print(f"Could not update {title} in place, rewriting the document: {str(e)}")
+            return None
+
     def consolidate_important_content(self, content: str, title: str) -> str:
         """Consolidate important content from multiple pages
 
@@ -151,7 +305,8 @@ class ContentIntegrator:
         """
 
         # Temperature parameter is not supported with some models (like o1)
-        response = self.client.chat.completions.create(
+        response = chat_completion(
+            self.client,
             model=self.summary_model,
             messages=[
                 {"role": "system",
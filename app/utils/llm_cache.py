@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from app.config import CACHE_DIR, LLM_CACHE_ENABLED, LLM_CACHE_MAX_MB
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class LLMCache:
+    """Persistent request-level cache for API responses
+
+    Responses are stored compressed in a local SQLite database keyed by a
+    canonical request hash. When the total size exceeds the cap, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+
+    def get(self, key):
+        """Get a cached response
+
+        Args:
+            key: Request hash
+
+        Returns:
+            Cached response text, or None on a miss
+        """
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, key, value):
+        """Store a response and evict least recently used entries over the size cap
+
+        Args:
+            key: Request hash
+            value: Response text
+        """
+        data = zlib.compress(value.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+            self._db.commit()
+
+    def _evict(self, excess):
+        """Delete least recently used entries until at least excess bytes are freed"""
+        freed = 0
+        keys = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if freed >= excess:
+                break
+            keys.append((key,))
+            freed += size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", keys)
+
+    def stats(self):
+        """Get hit/miss counters and the stored size
+
+        Returns:
+            Dict with hits, misses, entries and bytes
+        """
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+def get_cache():
+    """Get the shared response cache, or None when caching is disabled
+
+    Returns:
+        LLMCache: One instance per cache path and process
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+    path = (Path(CACHE_DIR) / "llm_cache.sqlite").resolve()
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCache(path, LLM_CACHE_MAX_MB * 1024 * 1024)
+        return _caches[path]
@@ -0,0 +1,98 @@
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from app.utils.hashing import content_hash
+
+MANIFEST_FILE_NAME = ".manifest.json"
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+class BuildManifest:
+    """Content-addressed record of completed processing stages
+
+    Each entry stores, per stage and input, the input content hash, model name,
+    prompt version and output paths. A stage whose fingerprint is unchanged and
+    whose outputs still exist can be skipped.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("stages", {})
+
+    @staticmethod
+    def fingerprint(input_hash, model, prompt_version, **settings):
+        """Combine everything that determines a stage's outputs into one hash"""
+        return content_hash(input_hash, model, prompt_version, settings)
+
+    def get(self, stage, key):
+        """Get the recorded entry for a stage input, if any"""
+        return self.entries.get(stage, {}).get(str(key))
+
+    def is_current(self, stage, key, fingerprint):
+        """Check whether a stage input was already processed with the same fingerprint
+
+        Args:
+            stage: Stage name (e.g. "audio", "pdf")
+            key: Input identifier (usually the input path)
+            fingerprint: Fingerprint from BuildManifest.fingerprint
+
+        Returns:
+            True if the recorded fingerprint matches and all outputs exist
+        """
+        entry = self.get(stage, key)
+        return (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            and all(Path(output).exists() for output in entry["outputs"])
+        )
+
+    def record(self, stage, key, fingerprint, outputs, **info):
+        """Record a completed stage and save the manifest
+
+        Args:
+            stage: Stage name
+            key: Input identifier
+            fingerprint: Fingerprint from BuildManifest.fingerprint
+            outputs: Output paths produced by the stage
+            **info: Extra fields stored with the entry (input hash, model, prompt version)
+        """
+        with self._lock:
+            self.entries.setdefault(stage, {})[str(key)] = {
+                "fingerprint": fingerprint,
+                "outputs": [str(output) for output in outputs],
+                "updated_at": datetime.now().isoformat(timespec="seconds"),
+                **info
+            }
+            self._save()
+
+    def _save(self):
+        """Write the manifest atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.entries}, f, indent=2, ensure_ascii=False)
+        temp_path.replace(self.path)
+
+
+def get_manifest(output_dir):
+    """Get the shared build manifest of an output directory
+
+    Args:
+        output_dir: Output directory
+
+    Returns:
+        BuildManifest: One instance per directory and process
+    """
+    path = (Path(output_dir) / MANIFEST_FILE_NAME).resolve()
+    with _manifests_lock:
+        if path not in _manifests:
+            _manifests[path] = BuildManifest(path)
+        return _manifests[path]
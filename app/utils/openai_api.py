@@ -0,0 +1,121 @@
+"""
+Shared entry points for OpenAI API requests.
+All services send chat completions and transcriptions through these functions
+so request-level concerns (response caching, per-endpoint concurrency limits,
+per-model rate limiting and retries) are handled in one place.
+"""
+
+import threading
+from pathlib import Path
+
+from openai.types.audio import TranscriptionVerbose
+from openai.types.chat import ChatCompletion
+
+from app.config import CHAT_MAX_CONCURRENCY, TRANSCRIPTION_MAX_CONCURRENCY, VISION_MAX_CONCURRENCY
+from app.utils.hashing import content_hash, file_hash
+from app.utils.images import BASE_TOKENS
+from app.utils.llm_cache import get_cache
+from app.utils.rate_limiter import get_scheduler
+from app.utils.tokens import estimate_tokens
+
+# Rough token cost of an image part and default completion allowance, for rate-limit accounting
+IMAGE_TOKENS = 765
+COMPLETION_TOKENS = 1000
+
+# Process-wide limits on in-flight requests per endpoint, shared by every worker thread
+ENDPOINT_LIMITS = {
+    "chat": threading.BoundedSemaphore(CHAT_MAX_CONCURRENCY),
+    "vision": threading.BoundedSemaphore(VISION_MAX_CONCURRENCY),
+    "transcription": threading.BoundedSemaphore(TRANSCRIPTION_MAX_CONCURRENCY),
+}
+
+
+def _cache_key(endpoint, client, params):
+    """Canonical hash of an API request"""
+    return content_hash(endpoint, str(client.base_url), params)
+
+
+def _chat_endpoint(messages):
+    """Classify a chat request by endpoint: vision when it carries images, otherwise chat"""
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list) and any(part.get("type") == "image_url" for part in content):
+            return "vision"
+    return "chat"
+
+
+def estimate_request_tokens(params):
+    """Estimate prompt plus completion tokens of a chat request"""
+    tokens = 0
+    for message in params.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += estimate_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    tokens += BASE_TOKENS if part["image_url"].get("detail") == "low" else IMAGE_TOKENS
+                else:
+                    tokens += estimate_tokens(part.get("text", ""))
+    completion = params.get("max_completion_tokens") or params.get("max_tokens") or COMPLETION_TOKENS
+    return tokens + completion
+
+
+def chat_completion(client, **params):
+    """Create a chat completion, served from the response cache when possible
+
+    Args:
+        client (OpenAI): OpenAI client
+        **params: chat.completions.create parameters (model, messages, ...)
+
+    Returns:
+        ChatCompletion: API response
+    """
+    cache = get_cache()
+    key = _cache_key("chat.completions", client, params) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+
+    response = get_scheduler().call(
+        params["model"], estimate_request_tokens(params),
+        lambda: client.chat.completions.with_raw_response.create(**params),
+        limit=ENDPOINT_LIMITS[_chat_endpoint(params.get("messages", []))]
+    )
+
+    if cache:
+        cache.put(key, response.model_dump_json())
+    return response
+
+
+def create_transcription(client, audio_file, **params):
+    """Create a verbose_json transcription, served from the response cache when possible
+
+    Args:
+        client (OpenAI): OpenAI client
+        audio_file (Path): Audio file to upload
+        **params: audio.transcriptions.create parameters (model, ...)
+
+    Returns:
+        TranscriptionVerbose: API response
+    """
+    params = {**params, "response_format": "verbose_json"}
+    cache = get_cache()
+    key = _cache_key("audio.transcriptions", client, {**params, "file": file_hash(audio_file)}) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return TranscriptionVerbose.model_validate_json(cached)
+
+    def send():
+        # Reopened per attempt so retries upload the whole file
+        with open(Path(audio_file), "rb") as audio:
+            return client.audio.transcriptions.with_raw_response.create(file=audio, **params)
+
+    # Transcriptions count against the request budget only
+    response = get_scheduler().call(params["model"], 0, send, limit=ENDPOINT_LIMITS["transcription"])
+
+    if cache:
+        cache.put(key, response.model_dump_json())
+    return response
@@ -0,0 +1,173 @@
+"""
+Perceptual hashing for near-duplicate slide detection.
+dHash (gradient) and pHash (DCT) are computed with NumPy on small grayscale
+thumbnails and find candidates cheaply; a 128 px thumbnail then confirms
+that one image only adds content to the other, since slides that share a
+template hash alike even when their text differs. An index per run lets
+every deck and image of a course reuse the vision analysis of an earlier
+image that shows everything a new one does.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from app.config import DEDUP_DHASH_DISTANCE, DEDUP_PHASH_DISTANCE
+
+HASH_SIZE = 8
+PHASH_SIZE = 32
+# Longest side of the thumbnail compared pixel by pixel
+INK_THUMBNAIL_SIZE = 128
+# Pixels further than this from the dominant grey level count as ink
+INK_THRESHOLD = 32
+# Grey levels a pixel may lose towards the background before its ink counts as removed
+INK_TOLERANCE = 24
+# Thumbnail pixels whose ink may disappear (cursor, compression noise) in a near-duplicate
+MAX_REMOVED_PIXELS = 1
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a boolean array into an integer"""
+    return int("".join("1" if bit else "0" for bit in bits.ravel()), 2)
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 thumbnail"""
+    pixels = np.asarray(image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit perceptual hash: low DCT frequencies of a 32x32 thumbnail against their median"""
+    pixels = np.asarray(image.convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    # The DC term only encodes overall brightness
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def ink_thumbnail(image: Image.Image) -> np.ndarray:
+    """Grayscale thumbnail of at most INK_THUMBNAIL_SIZE px per side, in the image's aspect ratio"""
+    thumbnail = image.convert("L")
+    thumbnail.thumbnail((INK_THUMBNAIL_SIZE, INK_THUMBNAIL_SIZE))
+    return np.asarray(thumbnail, dtype=np.uint8)
+
+
+def image_hashes(image: Image.Image) -> Dict[str, Any]:
+    """Both hashes and the ink thumbnail of an image"""
+    return {"dhash": dhash(image), "phash": phash(image), "thumbnail": ink_thumbnail(image)}
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return bin(a ^ b).count("1")
+
+
+def hashes_match(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Whether two images are within the dHash and pHash distances (a cheap candidate check)"""
+    return (hamming(a["dhash"], b["dhash"]) <= DEDUP_DHASH_DISTANCE
+            and hamming(a["phash"], b["phash"]) <= DEDUP_PHASH_DISTANCE)
+
+
+def adds_content(earlier: Dict[str, Any], later: Dict[str, Any]) -> bool:
+    """Whether later shows everything earlier does and at most adds to it (a build step or a duplicate)
+
+    Ink of the earlier thumbnail may get darker where new content lands next
+    to it, but must not fade towards the background: replaced text, like
+    different bullets under the same title bar, removes ink.
+
+    Args:
+        earlier: image_hashes of the earlier image
+        later: image_hashes of the later image
+    """
+    if earlier["thumbnail"].shape != later["thumbnail"].shape:
+        return False
+    earlier_pixels = earlier["thumbnail"].astype(np.int16)
+    background = np.bincount(earlier_pixels.ravel(), minlength=256).argmax()
+    earlier_ink = np.abs(earlier_pixels - background)
+    later_ink = np.abs(later["thumbnail"].astype(np.int16) - background)
+    removed = (earlier_ink > INK_THRESHOLD) & (earlier_ink - later_ink > INK_TOLERANCE)
+    return int(removed.sum()) <= MAX_REMOVED_PIXELS
+
+
+def dedup_settings() -> Dict[str, Any]:
+    """Thresholds that decide which images share an analysis (for build fingerprints)"""
+    return {
+        "dhash": DEDUP_DHASH_DISTANCE,
+        "phash": DEDUP_PHASH_DISTANCE,
+        "thumbnail": INK_THUMBNAIL_SIZE,
+        "ink_tolerance": INK_TOLERANCE,
+        "removed_pixels": MAX_REMOVED_PIXELS
+    }
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so text layers compare by content"""
+    return " ".join((text or "").split())
+
+
+class HashIndex:
+    """Registry of the images analyzed in one run, keyed by page text and perceptual hash
+
+    Each entry holds a future for its analysis, so a near-duplicate that
+    arrives while the original is still being analyzed waits for it instead
+    of being analyzed again. Entries are bucketed by normalized text, so a
+    lookup only compares images with the same text layer (image files have
+    none). One index is created per DocumentProcessor and lives as long as
+    its run.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, List[Tuple[Dict[str, Any], Tuple, Future]]] = {}
+        self._lock = threading.Lock()
+
+    def lookup_or_reserve(self, hashes: Dict[str, Any], source: Tuple[str, Any],
+                          text: str = "") -> Tuple[Future, Optional[Tuple]]:
+        """Find an analyzed image that covers this one, or reserve an entry for a new analysis
+
+        An entry covers the image when both have the same text and the
+        entry's image shows everything this one does (see adds_content), so
+        its analysis leaves nothing of this image out.
+
+        Args:
+            hashes: image_hashes of the image
+            source: (file name, page number or None) identifying the image
+            text: Extracted text of a PDF page, empty for image files
+
+        Returns:
+            (future, None) for a new entry, whose result the caller must set,
+            or (future, source) of the registered image that covers it
+        """
+        key = normalize_text(text)
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            for entry_hashes, entry_source, future in entries:
+                if hashes_match(hashes, entry_hashes) and adds_content(hashes, entry_hashes):
+                    return future, entry_source
+            future = Future()
+            entries.append((hashes, source, future))
+            return future, None
+
+    def discard(self, future: Future):
+        """Remove an entry, e.g. when its analysis failed"""
+        with self._lock:
+            for key, entries in self._entries.items():
+                self._entries[key] = [entry for entry in entries if entry[2] is not future]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
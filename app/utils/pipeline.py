@@ -0,0 +1,209 @@
+"""
+Stage-level DAG scheduler.
+Work is a graph of tasks of typed stages. CPU stages (discover, transcode,
+rasterize) and I/O stages (transcribe, analyze_page, summarize, consolidate)
+run in separate worker pools, and every task starts as soon as its own
+dependencies are done, so local CPU work overlaps network waits and a
+lecture's consolidation does not wait for unrelated files. Tasks can add
+further tasks while the pipeline runs (discovery does).
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.config import PIPELINE_CPU_WORKERS, PIPELINE_IO_WORKERS
+
+STAGE_DISCOVER = "discover"
+STAGE_TRANSCODE = "transcode"
+STAGE_RASTERIZE = "rasterize"
+STAGE_TRANSCRIBE = "transcribe"
+STAGE_ANALYZE_PAGE = "analyze_page"
+STAGE_SUMMARIZE = "summarize"
+STAGE_CONSOLIDATE = "consolidate"
+
+# Stage -> worker pool; stages earlier in this order are dispatched first when several tasks are ready,
+# since they unblock the most downstream work
+STAGE_POOLS = {
+    STAGE_DISCOVER: "cpu",
+    STAGE_TRANSCODE: "cpu",
+    STAGE_RASTERIZE: "cpu",
+    STAGE_TRANSCRIBE: "io",
+    STAGE_ANALYZE_PAGE: "io",
+    STAGE_SUMMARIZE: "io",
+    STAGE_CONSOLIDATE: "io",
+}
+STAGE_ORDER = {stage: order for order, stage in enumerate(STAGE_POOLS)}
+
+
+class Task:
+    """One unit of work of a Pipeline
+
+    Arguments that are Tasks are replaced by their results when the task
+    runs, and make it depend on them; if one of them fails, the task is
+    skipped. Tasks in after only order execution.
+    """
+
+    def __init__(self, stage: str, name: str, func: Callable, args: tuple, after: Iterable["Task"] = ()):
+        if stage not in STAGE_POOLS:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        self.stage = stage
+        self.name = name
+        self.func = func
+        self.args = args
+        self.inputs = [arg for arg in args if isinstance(arg, Task)]
+        self.deps = self.inputs + [task for task in after if task not in self.inputs]
+        self.dependents = []
+        self.waiting = 0
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def pool(self) -> str:
+        return STAGE_POOLS[self.stage]
+
+    @property
+    def duration(self) -> float:
+        return (self.finished - self.started) if self.started and self.finished else 0.0
+
+    def __repr__(self):
+        return f"Task({self.stage}, {self.name}, {self.state})"
+
+
+class Pipeline:
+    """Runs a DAG of stage tasks on separate CPU and I/O worker pools"""
+
+    def __init__(self, cpu_workers: int = PIPELINE_CPU_WORKERS, io_workers: int = PIPELINE_IO_WORKERS):
+        self.workers = {"cpu": cpu_workers if cpu_workers > 0 else (os.cpu_count() or 1), "io": max(io_workers, 1)}
+        self.tasks = []
+        self._ready = {"cpu": [], "io": []}
+        self._running = {"cpu": 0, "io": 0}
+        self._order = itertools.count()
+        self._changed = threading.Condition()
+
+    def add(self, stage: str, name: str, func: Callable, *args, after: Iterable[Task] = ()) -> Task:
+        """Add a task; it runs once every task it depends on has finished
+
+        Args:
+            stage: Stage name (see STAGE_POOLS)
+            name: Label for progress output, usually the file name
+            func: Callable to run
+            *args: Arguments; Tasks among them are replaced by their results
+            after: Tasks that must finish first without passing their results
+
+        Returns:
+            The new Task
+        """
+        task = Task(stage, name, func, args, after)
+        with self._changed:
+            self.tasks.append(task)
+            for dep in task.deps:
+                if dep.state in ("pending", "running"):
+                    dep.dependents.append(task)
+                    task.waiting += 1
+                elif dep in task.inputs and dep.state != "done":
+                    task.state = "skipped"
+            if task.state == "pending" and task.waiting == 0:
+                self._push(task)
+            self._changed.notify_all()
+        return task
+
+    def _push(self, task: Task):
+        heapq.heappush(self._ready[task.pool], (STAGE_ORDER[task.stage], next(self._order), task))
+
+    def run(self) -> List[Task]:
+        """Run tasks until none are left
+
+        Returns:
+            All tasks, with state ("done", "failed" or "skipped"), result and error
+        """
+        started = time.perf_counter()
+        pools = {
+            pool: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"pipeline-{pool}")
+            for pool, workers in self.workers.items()
+        }
+        try:
+            with self._changed:
+                while True:
+                    for pool, ready in self._ready.items():
+                        while ready and self._running[pool] < self.workers[pool]:
+                            _, _, task = heapq.heappop(ready)
+                            task.state = "running"
+                            self._running[pool] += 1
+                            pools[pool].submit(self._execute, task)
+                    if not any(self._running.values()) and not any(self._ready.values()):
+                        break
+                    self._changed.wait()
+        finally:
+            for executor in pools.values():
+                executor.shutdown(wait=True)
+
+        self._report(time.perf_counter() - started)
+        return self.tasks
+
+    def _execute(self, task: Task):
+        """Run a task in a pool thread and release its dependents"""
+        task.started = time.perf_counter()
+        try:
+            args = [arg.result if isinstance(arg, Task) else arg for arg in task.args]
+            task.result = task.func(*args)
+            task.state = "done"
+            print(f"Processing completed ({task.stage}): {task.name}")
+        except Exception as e:
+            task.error = e
+            task.state = "failed"
+            print(f"Error processing ({task.stage}) {task.name}: {str(e)}")
+        task.finished = time.perf_counter()
+
+        with self._changed:
+            self._running[task.pool] -= 1
+            self._release(task)
+            self._changed.notify_all()
+
+    def _release(self, task: Task):
+        """Make dependents ready; dependents that needed a failed task's result are skipped"""
+        for dependent in task.dependents:
+            if dependent.state != "pending":
+                continue
+            if task.state != "done" and task in dependent.inputs:
+                dependent.state = "skipped"
+                print(f"Skipping ({dependent.stage}) {dependent.name}: {task.stage} of {task.name} failed")
+                self._release(dependent)
+                continue
+            dependent.waiting -= 1
+            if dependent.waiting == 0:
+                self._push(dependent)
+
+    def critical_path(self) -> float:
+        """Longest chain of task durations through the dependency graph, in seconds"""
+        path = {}
+        for task in sorted(self.tasks, key=lambda task: task.finished or 0.0):
+            path[task] = task.duration + max((path.get(dep, 0.0) for dep in task.deps), default=0.0)
+        return max(path.values(), default=0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Task counts by state and busy seconds by pool"""
+        stats = {"tasks": len(self.tasks), "cpu_seconds": 0.0, "io_seconds": 0.0}
+        for task in self.tasks:
+            stats[task.state] = stats.get(task.state, 0) + 1
+            stats[f"{task.pool}_seconds"] += task.duration
+        return stats
+
+    def _report(self, elapsed: float):
+        stats = self.stats()
+        print(f"Pipeline finished {stats.get('done', 0)} of {stats['tasks']} tasks in {elapsed:.1f}s "
+              f"(critical path {self.critical_path():.1f}s, CPU stages {stats['cpu_seconds']:.1f}s, "
+              f"I/O stages {stats['io_seconds']:.1f}s)")
+
+    def results(self, stages: Optional[Iterable[str]] = None) -> List[Any]:
+        """Results of finished tasks, optionally only of some stages, in the order tasks were added"""
+        stages = set(stages) if stages is not None else None
+        return [task.result for task in self.tasks
+                if task.state == "done" and (stages is None or task.stage in stages)]
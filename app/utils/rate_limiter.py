@@ -0,0 +1,246 @@
+"""
+Rate-limit-aware request scheduling.
+Every API request is admitted by a per-model scheduler that enforces
+requests-per-minute and tokens-per-minute budgets with token buckets, follows
+the x-ratelimit-* response headers, and adapts its concurrency AIMD-style:
+additive increase on success, multiplicative decrease on 429s and timeouts.
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from app.config import API_MAX_RETRIES, RATE_LIMIT_CONCURRENCY, RATE_LIMIT_RPM, RATE_LIMIT_TPM
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse a rate-limit reset duration such as "1s", "6m0s" or "20ms" into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = _DURATION_PATTERN.findall(value)
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in matches) if matches else None
+
+
+class TokenBucket:
+    """Token bucket that refills continuously to its per-minute capacity"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount, now):
+        """Take amount from the bucket and return how long the caller must wait"""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level * 60 / self.capacity
+
+    def refund(self, amount, now):
+        """Give back an over-estimated reservation"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit, remaining, now):
+        """Follow the limit and remaining budget reported by the API"""
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class ModelScheduler:
+    """Admission control for the requests of one model"""
+
+    def __init__(self, model, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM, max_concurrency=RATE_LIMIT_CONCURRENCY):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.paused_until = 0.0
+        self.throttle_seconds = 0.0
+        self.throttled_requests = 0
+        self.retries = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, estimated_tokens):
+        """Block until a request may be sent"""
+        started = time.monotonic()
+        with self._cond:
+            self.queued += 1
+            while self.in_flight >= max(1, int(self.concurrency)):
+                self._cond.wait()
+            self.queued -= 1
+            self.in_flight += 1
+
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(estimated_tokens, now),
+                self.paused_until - now
+            )
+        if wait > 0:
+            time.sleep(wait)
+
+        waited = time.monotonic() - started
+        if waited > 0.05:
+            with self._cond:
+                self.throttle_seconds += waited
+                self.throttled_requests += 1
+
+    def release(self, throttled=False, retry_after=None, adapt=True):
+        """Finish a request and adapt the concurrency limit (AIMD)
+
+        Args:
+            throttled: The request was rate limited or timed out
+            retry_after: Seconds the API asked to wait before the next request
+            adapt: Adjust the concurrency limit; off for failures that say nothing about load
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                if retry_after:
+                    self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            elif adapt:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / max(1.0, self.concurrency))
+            self._cond.notify_all()
+
+    def record_retry(self):
+        """Count a retried request"""
+        with self._cond:
+            self.retries += 1
+
+    def observe(self, headers, estimated_tokens, used_tokens):
+        """Update the buckets from rate-limit headers and actual token usage"""
+        now = time.monotonic()
+        with self._cond:
+            self.requests.sync(_header_int(headers, "x-ratelimit-limit-requests"),
+                               _header_int(headers, "x-ratelimit-remaining-requests"), now)
+            self.tokens.sync(_header_int(headers, "x-ratelimit-limit-tokens"),
+                             _header_int(headers, "x-ratelimit-remaining-tokens"), now)
+            if used_tokens is not None and used_tokens < estimated_tokens:
+                self.tokens.refund(estimated_tokens - used_tokens, now)
+
+    def stats(self):
+        """Current queue depth, concurrency and throttling counters"""
+        with self._cond:
+            return {
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "concurrency": round(self.concurrency, 2),
+                "throttle_seconds": round(self.throttle_seconds, 2),
+                "throttled_requests": self.throttled_requests,
+                "retries": self.retries
+            }
+
+
+def _header_int(headers, name):
+    """Read an integer header, or None"""
+    value = headers.get(name) if headers is not None else None
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(error):
+    """Seconds to wait suggested by an error response, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    return (parse_duration(headers.get("retry-after"))
+            or parse_duration(headers.get("x-ratelimit-reset-requests"))
+            or parse_duration(headers.get("x-ratelimit-reset-tokens")))
+
+
+class RequestScheduler:
+    """Process-wide registry of per-model schedulers"""
+
+    def __init__(self, max_retries=API_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def for_model(self, model):
+        """Get the scheduler of a model"""
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = ModelScheduler(model)
+            return self._models[model]
+
+    def call(self, model, estimated_tokens, send, limit=None):
+        """Send a request under the model's budgets, retrying throttled and transient failures
+
+        Args:
+            model: Model name
+            estimated_tokens: Estimated prompt plus completion tokens
+            send: Callable returning a raw API response (with_raw_response)
+            limit: Endpoint semaphore held per attempt, released while backing off
+
+        Returns:
+            Parsed API response
+        """
+        scheduler = self.for_model(model)
+        for attempt in range(self.max_retries + 1):
+            with limit or nullcontext():
+                scheduler.acquire(estimated_tokens)
+                try:
+                    raw = send()
+                except RETRYABLE_ERRORS as e:
+                    retry_after = _retry_after(e)
+                    scheduler.release(throttled=isinstance(e, (RateLimitError, APITimeoutError)),
+                                      retry_after=retry_after)
+                    if attempt == self.max_retries:
+                        raise
+                    error = e
+                except Exception:
+                    scheduler.release(adapt=False)
+                    raise
+                else:
+                    scheduler.release()
+                    response = raw.parse()
+                    usage = getattr(response, "usage", None)
+                    scheduler.observe(raw.headers, estimated_tokens, getattr(usage, "total_tokens", None))
+                    return response
+
+            # Back off without holding the endpoint slot
+            scheduler.record_retry()
+            delay = retry_after or min(60.0, 2 ** attempt + random.random())
+            print(f"Request to {model} failed ({type(error).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def stats(self):
+        """Per-model scheduler statistics"""
+        with self._lock:
+            models = dict(self._models)
+        return {model: scheduler.stats() for model, scheduler in models.items()}
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler():
+    """Get the shared request scheduler"""
+    return _scheduler
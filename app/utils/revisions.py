@@ -0,0 +1,161 @@
+"""
+Page-level change detection for revised documents.
+Every page gets a fingerprint from a hash of its text and a hash of its
+rendered bitmap. When a document comes back, pages whose fingerprint was
+seen in the previous run keep their analysis, and the pages that changed or
+disappeared are written to revision.json so consolidation can update its
+document instead of rewriting it.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.hashing import content_hash
+
+REVISION_FILE_NAME = "revision.json"
+# Above this fraction of changed and removed pages, consolidation is rewritten from scratch
+REVISION_MAX_CHANGED_FRACTION = 0.5
+
+_PAGE_HEADER = re.compile(r"^--- Page (\d+) ---\n", re.MULTILINE)
+_NO_TEXT = "[No extractable text on this page]"
+
+
+def page_fingerprint(text: str, raster_hash: Optional[str]) -> Dict[str, str]:
+    """Text hash, raster hash and combined fingerprint of a page
+
+    Args:
+        text: Extracted page text
+        raster_hash: Hash of the rendered bitmap, or None when the page was not rendered
+
+    Returns:
+        Dict with text_hash, raster_hash and fingerprint
+    """
+    text_hash = content_hash(text)
+    return {"text_hash": text_hash, "raster_hash": raster_hash, "fingerprint": content_hash(text_hash, raster_hash)}
+
+
+def split_text_content(text_content: str) -> Dict[int, str]:
+    """Split a text_content.txt back into page texts"""
+    parts = _PAGE_HEADER.split(text_content)
+    texts = {}
+    for page, text in zip(parts[1::2], parts[2::2]):
+        text = text[:-2] if text.endswith("\n\n") else text
+        texts[int(page)] = "" if text == _NO_TEXT else text
+    return texts
+
+
+def load_previous_pages(output_dir: Path, settings: str) -> Dict[int, Dict[str, Any]]:
+    """Pages of the previous run of a document, if it was processed with the same settings
+
+    Args:
+        output_dir: Output directory of the document (pdf-*)
+        settings: Hash of the settings that determine page analyses
+
+    Returns:
+        Page number -> dict with page, fingerprint, route, text, analysis,
+        duplicate_of_page and reused_from; empty when there is nothing to reuse
+    """
+    output_dir = Path(output_dir)
+    metadata_file = output_dir / "metadata.json"
+    if not metadata_file.exists():
+        return {}
+    try:
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read previous metadata {metadata_file}: {str(e)}")
+        return {}
+    # Runs before page fingerprints, or with other settings, cannot be reused
+    if metadata.get("page_settings") != settings:
+        return {}
+
+    text_file = output_dir / "text_content.txt"
+    texts = split_text_content(text_file.read_text(encoding="utf-8")) if text_file.exists() else {}
+
+    previous = {}
+    for entry in metadata.get("pages", []):
+        analysis = ""
+        analysis_file = output_dir / "analysis" / f"page_{entry['page']}_analysis.txt"
+        if entry.get("has_analysis") and analysis_file.exists():
+            analysis = analysis_file.read_text(encoding="utf-8")
+        previous[entry["page"]] = {
+            "page": entry["page"],
+            "fingerprint": entry["fingerprint"],
+            "route": entry["route"],
+            "text": texts.get(entry["page"], ""),
+            "analysis": analysis,
+            "duplicate_of_page": entry.get("duplicate_of_page"),
+            "reused_from": entry.get("reused_from")
+        }
+    return previous
+
+
+def build_revision(previous: Dict[int, Dict[str, Any]], pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Diff the pages of a document against its previous run
+
+    Pages are matched by fingerprint, so slides that only moved count as unchanged.
+
+    Args:
+        previous: Previous pages (see load_previous_pages)
+        pages: Current pages as dicts with page, fingerprint, text and analysis
+
+    Returns:
+        Dict with previous_page_count, page_count, changed (new or changed pages
+        with page, text and analysis) and removed (previous pages with
+        previous_page, text and analysis)
+    """
+    previous_fingerprints = {entry["fingerprint"] for entry in previous.values()}
+    fingerprints = {page["fingerprint"] for page in pages}
+    return {
+        "previous_page_count": len(previous),
+        "page_count": len(pages),
+        "changed": [
+            {"page": page["page"], "text": page["text"], "analysis": page["analysis"]}
+            for page in pages if page["fingerprint"] not in previous_fingerprints
+        ],
+        "removed": [
+            {"previous_page": entry["page"], "text": entry["text"], "analysis": entry["analysis"]}
+            for entry in sorted(previous.values(), key=lambda entry: entry["page"])
+            if entry["fingerprint"] not in fingerprints
+        ]
+    }
+
+
+def is_incremental(revision: Dict[str, Any]) -> bool:
+    """Whether a revision is small enough to update a consolidated document instead of rewriting it"""
+    pages = max(revision["page_count"], revision["previous_page_count"], 1)
+    return len(revision["changed"]) + len(revision["removed"]) <= REVISION_MAX_CHANGED_FRACTION * pages
+
+
+def save_revision(output_dir: Path, revision: Optional[Dict[str, Any]]):
+    """Write revision.json for the next consolidation
+
+    A revision that was never consolidated cannot be stacked with a newer one,
+    so in that case (or without a revision) the file is removed and the next
+    consolidation rewrites the document from scratch.
+    """
+    revision_file = Path(output_dir) / REVISION_FILE_NAME
+    if revision_file.exists():
+        revision_file.unlink()
+        return
+    if revision is not None:
+        with open(revision_file, "w", encoding="utf-8") as f:
+            json.dump(revision, f, indent=2, ensure_ascii=False)
+
+
+def load_revision(output_dir: Path) -> Optional[Dict[str, Any]]:
+    """Read the pending revision.json of a document, if any"""
+    revision_file = Path(output_dir) / REVISION_FILE_NAME
+    if not revision_file.exists():
+        return None
+    with open(revision_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def clear_revision(output_dir: Path):
+    """Remove revision.json once it has been consolidated"""
+    revision_file = Path(output_dir) / REVISION_FILE_NAME
+    if revision_file.exists():
+        revision_file.unlink()
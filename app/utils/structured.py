@@ -0,0 +1,185 @@
+import json
+
+from app.utils.images import image_content
+from app.utils.openai_api import chat_completion
+
+# JSON schema for one call that returns both the important content and the summary
+ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "lecture_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "important_content": {"type": "string"},
+                "summary": {"type": "string"}
+            },
+            "required": ["important_content", "summary"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def request_analysis(client, model, system_prompt, prompt):
+    """Request important content and a summary in one structured completion
+
+    Args:
+        client (OpenAI): OpenAI client
+        model (str): Model name
+        system_prompt (str): System prompt
+        prompt (str): User prompt asking for both sections
+
+    Returns:
+        tuple[str, str]: (important_content, summary)
+    """
+    # Temperature parameter is not supported with some models (like o1)
+    response = chat_completion(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        response_format=ANALYSIS_RESPONSE_FORMAT
+    )
+    result = json.loads(response.choices[0].message.content)
+    return result["important_content"].strip(), result["summary"].strip()
+
+
+def image_batch_format(fields):
+    """JSON schema for one result per image of a multi-image request
+
+    Args:
+        fields (tuple[str]): String fields returned for every image
+
+    Returns:
+        dict: response_format with an "images" list of {"index", *fields} objects
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "image_batch_analysis",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "images": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "index": {"type": "integer"},
+                                **{field: {"type": "string"} for field in fields}
+                            },
+                            "required": ["index", *fields],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["images"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def request_image_batch(client, model, prompt, images, fields, max_tokens):
+    """Analyze several images in one structured vision request
+
+    Images are labelled "Image 1" to "Image N" in the request, and the
+    response is split back into one result per image.
+
+    Args:
+        client (OpenAI): OpenAI client
+        model (str): Vision model name
+        prompt (str): Instructions, asking for the given fields for every image
+        images (list[dict]): Encoded images (see encode_image)
+        fields (tuple[str]): String fields returned for every image
+        max_tokens (int): Completion token limit for the whole batch
+
+    Returns:
+        list[dict | None]: Fields per image in order; None for images the response left out or left empty
+    """
+    content = [{"type": "text", "text": prompt}]
+    for number, encoded in enumerate(images, start=1):
+        content.append({"type": "text", "text": f"Image {number}:"})
+        content.append(image_content(encoded))
+
+    response = chat_completion(
+        client,
+        model=model,
+        messages=[{"role": "user", "content": content}],
+        max_tokens=max_tokens,
+        response_format=image_batch_format(fields)
+    )
+
+    results = [None] * len(images)
+    for item in json.loads(response.choices[0].message.content)["images"]:
+        values = {field: item[field].strip() for field in fields}
+        if 1 <= item["index"] <= len(images) and all(values.values()):
+            results[item["index"] - 1] = values
+    return results
+
+
+# JSON schema for edits to a markdown document split into numbered sections
+SECTION_EDITS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "section_edits",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "edits": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "section": {"type": "integer"},
+                            "action": {"type": "string", "enum": ["replace", "delete", "insert_after"]},
+                            "markdown": {"type": "string"}
+                        },
+                        "required": ["section", "action", "markdown"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["edits"],
+            "additionalProperties": False
+        }
+    }
+}
+
+
+def request_section_edits(client, model, system_prompt, prompt, max_tokens):
+    """Request edits to numbered sections of a document in one structured completion
+
+    Args:
+        client (OpenAI): OpenAI client
+        model (str): Model name
+        system_prompt (str): System prompt
+        prompt (str): User prompt with the numbered sections and what to change
+        max_tokens (int): Completion token limit
+
+    Returns:
+        list[dict]: Edits with section (1-based; 0 with insert_after inserts at the start),
+        action ("replace", "delete" or "insert_after") and markdown
+
+    Raises:
+        ValueError: The response was cut off at max_tokens
+    """
+    response = chat_completion(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=max_tokens,
+        response_format=SECTION_EDITS_RESPONSE_FORMAT
+    )
+    if response.choices[0].finish_reason == "length":
+        raise ValueError(f"Section edits exceeded {max_tokens} tokens")
+    return json.loads(response.choices[0].message.content)["edits"]
@@ -0,0 +1,13 @@
+def estimate_tokens(text):
+    """Roughly estimate the token count of a text
+
+    UTF-8 bytes / 3 slightly over-counts English (about 4 bytes per token) and
+    is close for Korean, so budgets based on it stay on the safe side.
+
+    Args:
+        text (str): Text to estimate
+
+    Returns:
+        int: Estimated token count
+    """
+    return len(text.encode("utf-8")) // 3 + 1
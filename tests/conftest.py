@@ -0,0 +1,23 @@
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+SLIDE_SIZE = (1600, 900)
+
+
+def draw_slide(title: str = "", bullets=(), heading: str = "") -> Image.Image:
+    """A 1600x900 slide with the same title bar template, a title and bullets, or a centred chapter heading"""
+    image = Image.new("RGB", SLIDE_SIZE, "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, SLIDE_SIZE[0], 130], fill=(30, 60, 140))
+    draw.text((60, 35), title, fill="white", font=ImageFont.load_default(size=60))
+    font = ImageFont.load_default(size=40)
+    for i, bullet in enumerate(bullets):
+        draw.text((90, 200 + i * 80), "- " + bullet, fill="black", font=font)
+    if heading:
+        draw.text((200, 400), heading, fill="black", font=ImageFont.load_default(size=80))
+    return image
+
+
+@pytest.fixture
+def slide():
+    return draw_slide
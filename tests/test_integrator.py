@@ -0,0 +1,66 @@
+import pytest
+
+from app.utils.integrator import ContentIntegrator
+
+DOCUMENT = """# Graphs
+
+Intro text.
+
+## BFS
+
+Breadth first.
+
+```python
+# not a heading
+queue = []
+```
+
+## DFS
+
+Depth first.
+"""
+
+
+def sections():
+    return ContentIntegrator._split_sections(DOCUMENT)
+
+
+def test_split_sections_at_headings_outside_code_fences():
+    parts = sections()
+    assert len(parts) == 3
+    assert parts[0].startswith("# Graphs")
+    assert parts[1].startswith("## BFS") and "# not a heading" in parts[1]
+    assert parts[2].startswith("## DFS")
+    assert "".join(parts) == DOCUMENT
+
+
+def test_no_edits_keep_the_document():
+    assert ContentIntegrator._apply_section_edits(sections(), []) == DOCUMENT
+
+
+def test_replace_only_touches_its_section():
+    updated = ContentIntegrator._apply_section_edits(
+        sections(), [{"section": 3, "action": "replace", "markdown": "## DFS\n\nDepth first, with a stack."}]
+    )
+    assert updated == DOCUMENT.replace("Depth first.", "Depth first, with a stack.")
+
+
+def test_delete_and_insert():
+    updated = ContentIntegrator._apply_section_edits(sections(), [
+        {"section": 2, "action": "delete", "markdown": ""},
+        {"section": 0, "action": "insert_after", "markdown": "Revised lecture."},
+        {"section": 3, "action": "insert_after", "markdown": "## Dijkstra\n\nShortest paths."},
+    ])
+    assert "## BFS" not in updated
+    assert updated.startswith("Revised lecture.\n\n# Graphs")
+    assert updated.endswith("## DFS\n\nDepth first.\n\n## Dijkstra\n\nShortest paths.\n")
+
+
+@pytest.mark.parametrize("edit", [
+    {"section": 4, "action": "replace", "markdown": "## New"},
+    {"section": 0, "action": "replace", "markdown": "## New"},
+    {"section": -1, "action": "delete", "markdown": ""},
+])
+def test_unknown_section_is_rejected(edit):
+    with pytest.raises(ValueError):
+        ContentIntegrator._apply_section_edits(sections(), [edit])
@@ -0,0 +1,131 @@
+from app.services.document.page_classifier import ROUTE_VISION
+from app.services.document.pdf_processor import PDFProcessor
+from app.services.document.rasterizer import encode_page
+
+BFS = ["BFS explores neighbours first", "Uses a FIFO queue", "Finds shortest paths"]
+DFS = ["DFS explores depth first", "Uses a LIFO stack", "Finds a spanning tree"]
+
+
+def make_page(number, image, text):
+    page = encode_page(number, image, routing=False)
+    page["text"] = text
+    return page
+
+
+def slide_page(slide, number, title, bullets):
+    return make_page(number, slide(title, bullets), "\n".join([title, *bullets]))
+
+
+def analyze(tmp_path, monkeypatch, pages, previous=None):
+    """Run analyze_pages with a vision model that names the page it was shown"""
+    processor = PDFProcessor(api_key="test", batch_images=1)
+    shown = {id(page["image"]): page["page"] for page in pages}
+    analyzed = []
+
+    def analyze_images(images):
+        analyzed.extend(shown[id(image)] for image in images)
+        return [f"Analysis of page {shown[id(image)]}" for image in images]
+
+    monkeypatch.setattr(processor, "analyze_images", analyze_images)
+    page_analyses = processor.analyze_pages(pages, tmp_path, source_name="deck.pdf", previous=previous)
+    processor._map_previous_duplicates(page_analyses, previous or {})
+    return page_analyses, sorted(analyzed)
+
+
+def previous_entry(page, duplicate_of_page=None, reused_from=None):
+    return {"page": page, "fingerprint": f"fingerprint {page}", "route": ROUTE_VISION, "text": "",
+            "analysis": f"Previous analysis of page {page}", "duplicate_of_page": duplicate_of_page,
+            "reused_from": reused_from}
+
+
+def revised_pages(slide, changed=()):
+    """Pages 1 to 3 of a deck whose pages 1 and 2 were build steps of page 3 in the previous run"""
+    pages = [slide_page(slide, number, "Graph search", BFS[:number]) for number in (1, 2, 3)]
+    for page in pages:
+        page["fingerprint"] = f"fingerprint {page['page']}" if page["page"] not in changed else "new"
+    return pages
+
+
+def test_build_step_extends_the_representative(slide):
+    earlier = slide_page(slide, 1, "Graph search", BFS[:1])
+    later = slide_page(slide, 2, "Graph search", BFS[:2])
+    assert earlier["route"] == ROUTE_VISION
+    assert PDFProcessor.is_build_step(earlier, later)
+    assert not PDFProcessor.is_build_step(later, earlier)
+
+
+def test_template_slides_with_other_text_are_not_build_steps(slide):
+    bfs = slide_page(slide, 1, "Graph search", BFS)
+    dfs = slide_page(slide, 2, "Graph search", DFS)
+    assert not PDFProcessor.is_build_step(bfs, dfs)
+
+
+def test_chapter_title_slides_are_not_build_steps(slide):
+    chapter_1 = make_page(1, slide(heading="Chapter 1"), "Chapter 1")
+    chapter_7 = make_page(2, slide(heading="Chapter 7: Graphs"), "Chapter 7: Graphs")
+    assert not PDFProcessor.is_build_step(chapter_1, chapter_7)
+
+
+def test_same_text_with_other_bitmap_is_not_a_build_step(slide):
+    bfs = make_page(1, slide("Graph search", BFS), "Graph search")
+    dfs = make_page(2, slide("Graph search", DFS), "Graph search")
+    assert not PDFProcessor.is_build_step(bfs, dfs)
+
+
+def test_build_slides_share_the_analysis_of_the_last_step(slide, tmp_path, monkeypatch):
+    pages = [slide_page(slide, number, "Graph search", BFS[:number]) for number in (1, 2, 3)]
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, pages)
+    assert analyzed == [3]
+    assert [item["duplicate_of_page"] for item in page_analyses] == [3, 3, None]
+    assert all(item["analysis"] == "Analysis of page 3" for item in page_analyses)
+
+
+def test_slides_sharing_a_template_are_analyzed_separately(slide, tmp_path, monkeypatch):
+    pages = [
+        slide_page(slide, 1, "Graph search", BFS),
+        slide_page(slide, 2, "Graph search", DFS),
+        make_page(3, slide(heading="Chapter 1"), "Chapter 1"),
+        make_page(4, slide(heading="Chapter 7: Graphs"), "Chapter 7: Graphs"),
+    ]
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, pages)
+    assert analyzed == [1, 2, 3, 4]
+    assert all(item["duplicate_of_page"] is None for item in page_analyses)
+
+
+def test_group_does_not_drift_away_from_its_first_page(slide, tmp_path, monkeypatch):
+    # Each page differs from the one before it by one bullet, but page 3 drops page 1's bullet
+    pages = [
+        slide_page(slide, 1, "Graph search", BFS[:1]),
+        slide_page(slide, 2, "Graph search", BFS[:2]),
+        slide_page(slide, 3, "Graph search", BFS[1:3]),
+    ]
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, pages)
+    assert analyzed == [2, 3]
+    assert [item["duplicate_of_page"] for item in page_analyses] == [2, None, None]
+
+
+def test_unchanged_build_group_keeps_its_analyses(slide, tmp_path, monkeypatch):
+    previous = {1: previous_entry(1, 3), 2: previous_entry(2, 3), 3: previous_entry(3)}
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, revised_pages(slide), previous)
+    assert analyzed == []
+    assert [item["previous_page"] for item in page_analyses] == [1, 2, 3]
+    assert [item["duplicate_of_page"] for item in page_analyses] == [3, 3, None]
+
+
+def test_copy_of_a_changed_representative_is_analyzed_again(slide, tmp_path, monkeypatch):
+    previous = {1: previous_entry(1, 3), 2: previous_entry(2, 3), 3: previous_entry(3)}
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, revised_pages(slide, changed=(3,)), previous)
+    assert analyzed == [2, 3]
+    assert [item["analysis"] for item in page_analyses] == ["Analysis of page 2", "Analysis of page 2",
+                                                            "Analysis of page 3"]
+    assert [item["previous_page"] for item in page_analyses] == [None, None, None]
+    assert [item["duplicate_of_page"] for item in page_analyses] == [2, None, None]
+
+
+def test_analysis_reused_from_another_deck_is_looked_up_again(slide, tmp_path, monkeypatch):
+    previous = {1: previous_entry(1), 2: previous_entry(2), 3: previous_entry(3, reused_from="other.pdf page 9")}
+    pages = revised_pages(slide)
+    page_analyses, analyzed = analyze(tmp_path, monkeypatch, pages, previous)
+    assert analyzed == [3]
+    assert page_analyses[2]["analysis"] == "Analysis of page 3"
+    assert [item["previous_page"] for item in page_analyses] == [1, 2, None]
@@ -0,0 +1,97 @@
+import io
+
+from PIL import Image
+
+from app.utils.phash import HashIndex, adds_content, hashes_match, image_hashes
+
+BFS = ["BFS explores neighbours first", "Uses a FIFO queue", "Finds shortest paths"]
+DFS = ["DFS explores depth first", "Uses a LIFO stack", "Finds a spanning tree"]
+
+
+def reencode(image: Image.Image) -> Image.Image:
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=70)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+
+def test_build_step_adds_content(slide):
+    earlier = image_hashes(slide("Graph search", BFS[:1]))
+    later = image_hashes(slide("Graph search", BFS[:2]))
+    assert adds_content(earlier, later)
+
+
+def test_reencoded_duplicate_adds_content(slide):
+    image = slide("Graph search", BFS)
+    assert adds_content(image_hashes(image), image_hashes(reencode(image)))
+
+
+def test_removed_bullet_is_not_a_build_step(slide):
+    earlier = image_hashes(slide("Graph search", BFS[:2]))
+    later = image_hashes(slide("Graph search", BFS[:1]))
+    assert not adds_content(earlier, later)
+
+
+def test_different_bullets_under_the_same_template(slide):
+    bfs = image_hashes(slide("Graph search", BFS))
+    dfs = image_hashes(slide("Graph search", DFS))
+    # The perceptual hashes alone cannot tell these apart
+    assert hashes_match(bfs, dfs)
+    assert not adds_content(bfs, dfs)
+    assert not adds_content(dfs, bfs)
+
+
+def test_different_chapter_titles(slide):
+    chapter_1 = image_hashes(slide(heading="Chapter 1"))
+    chapter_7 = image_hashes(slide(heading="Chapter 7: Graphs"))
+    assert not adds_content(chapter_1, chapter_7)
+    assert not adds_content(chapter_7, chapter_1)
+
+
+def test_different_aspect_ratios_are_not_compared(slide):
+    image = slide("Graph search", BFS)
+    assert not adds_content(image_hashes(image), image_hashes(image.resize((1200, 900))))
+
+
+def test_index_reuses_an_image_that_covers_the_new_one(slide):
+    index = HashIndex()
+    future, source = index.lookup_or_reserve(image_hashes(slide("Graph search", BFS)), ("a.png", None))
+    assert source is None
+    duplicate, source = index.lookup_or_reserve(image_hashes(reencode(slide("Graph search", BFS))),
+                                                ("b.png", None))
+    assert source == ("a.png", None)
+    assert duplicate is future
+
+
+def test_index_does_not_reuse_a_less_complete_image(slide):
+    index = HashIndex()
+    index.lookup_or_reserve(image_hashes(slide("Graph search", BFS[:2])), ("a.png", None))
+    _, source = index.lookup_or_reserve(image_hashes(slide("Graph search", BFS)), ("b.png", None))
+    assert source is None
+    assert len(index) == 2
+
+
+def test_index_does_not_reuse_a_slide_with_other_bullets(slide):
+    index = HashIndex()
+    index.lookup_or_reserve(image_hashes(slide("Graph search", BFS)), ("a.png", None))
+    _, source = index.lookup_or_reserve(image_hashes(slide("Graph search", DFS)), ("b.png", None))
+    assert source is None
+
+
+def test_index_only_reuses_pages_with_equal_text(slide):
+    index = HashIndex()
+    hashes = image_hashes(slide("Graph search", BFS))
+    index.lookup_or_reserve(hashes, ("a.pdf", 1), "Graph search\nBFS")
+    _, source = index.lookup_or_reserve(hashes, ("b.pdf", 1), "Graph search\nDFS")
+    assert source is None
+    _, source = index.lookup_or_reserve(hashes, ("c.pdf", 4), "  Graph search BFS ")
+    assert source == ("a.pdf", 1)
+
+
+def test_discarded_entries_are_not_reused(slide):
+    index = HashIndex()
+    hashes = image_hashes(slide("Graph search", BFS))
+    future, _ = index.lookup_or_reserve(hashes, ("a.png", None))
+    index.discard(future)
+    assert len(index) == 0
+    _, source = index.lookup_or_reserve(hashes, ("b.png", None))
+    assert source is None
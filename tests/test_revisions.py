@@ -0,0 +1,50 @@
+from app.services.document.pdf_processor import PDFProcessor
+from app.utils.revisions import build_revision, split_text_content
+
+
+def test_split_text_content_round_trips_format_text():
+    pages = [{"page": 1, "text": "Intro\nLine two"}, {"page": 2, "text": ""}, {"page": 3, "text": "Graphs"}]
+    assert split_text_content(PDFProcessor.format_text(pages)) == {1: "Intro\nLine two", 2: "", 3: "Graphs"}
+
+
+def test_split_text_content_keeps_page_markers_inside_text():
+    text_content = "--- Page 1 ---\nSee --- Page 2 --- below\n\n--- Page 2 ---\nEnd\n\n"
+    assert split_text_content(text_content) == {1: "See --- Page 2 --- below", 2: "End"}
+
+
+def test_split_text_content_of_empty_file():
+    assert split_text_content("") == {}
+
+
+def previous_page(page, fingerprint):
+    return {"page": page, "fingerprint": fingerprint, "route": "vision", "text": f"old {page}",
+            "analysis": f"analysis {page}", "duplicate_of_page": None, "reused_from": None}
+
+
+def test_build_revision_reports_changed_and_removed_pages():
+    previous = {1: previous_page(1, "a"), 2: previous_page(2, "b"), 3: previous_page(3, "c")}
+    pages = [
+        {"page": 1, "fingerprint": "a", "text": "old 1", "analysis": "analysis 1"},
+        {"page": 2, "fingerprint": "x", "text": "new 2", "analysis": "new analysis 2"},
+        {"page": 3, "fingerprint": "c", "text": "old 3", "analysis": "analysis 3"},
+        {"page": 4, "fingerprint": "y", "text": "new 4", "analysis": ""},
+    ]
+    revision = build_revision(previous, pages)
+    assert revision["previous_page_count"] == 3
+    assert revision["page_count"] == 4
+    assert revision["changed"] == [
+        {"page": 2, "text": "new 2", "analysis": "new analysis 2"},
+        {"page": 4, "text": "new 4", "analysis": ""},
+    ]
+    assert revision["removed"] == [{"previous_page": 2, "text": "old 2", "analysis": "analysis 2"}]
+
+
+def test_build_revision_treats_moved_pages_as_unchanged():
+    previous = {1: previous_page(1, "a"), 2: previous_page(2, "b")}
+    pages = [
+        {"page": 1, "fingerprint": "b", "text": "old 2", "analysis": "analysis 2"},
+        {"page": 2, "fingerprint": "a", "text": "old 1", "analysis": "analysis 1"},
+    ]
+    revision = build_revision(previous, pages)
+    assert revision["changed"] == []
+    assert revision["removed"] == []